@@ -1,15 +1,65 @@
 import json
-from flask import Flask, render_template, request, jsonify
-from nlp_model import DisasterNLP
+import logging
+import random
+import time
+from flask import Flask, Response, g, render_template, request, jsonify
+from nlp_model import DisasterNLP, ModelWarmingUp
+from config import LOG_LEVEL
+from logging_setup import configure_logging
+from metrics import (
+    CONTENT_TYPE, REGISTRY, SERIALIZE_SECONDS, HTTP_REQUESTS, HTTP_REQUEST_SECONDS, CallbackMetric,
+)
+
+configure_logging(LOG_LEVEL)
+logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
 
 # --- Initialization ---
-# Instantiate and train the NLP model when the server starts.
-# This is efficient as it's done only once.
-print("Initializing and training NLP model...")
-nlp_processor = DisasterNLP()
-print("Model training complete. Server is ready.")
+# Instantiate the NLP model when the server starts. The model and corpus embeddings
+# load in the background, so the server is reachable (and /healthz answers) right away.
+logger.info("Initializing NLP model in the background...")
+nlp_processor = DisasterNLP(load_in_background=True)
+logger.info("Server is up; commands are accepted once the model has loaded (see /readyz).")
+
+# Upper bound on the number of commands accepted by /process_commands in one request.
+MAX_BATCH_SIZE = 256
+
+# Seconds a client is told to wait before retrying a request that arrived during warm-up
+WARMING_UP_RETRY_AFTER = 5
+
+
+def warming_up_response(error):
+    """503 telling the client the model is not ready yet."""
+    response = jsonify({'error': 'warming up', 'detail': str(error), 'status': nlp_processor.status()})
+    response.headers['Retry-After'] = str(WARMING_UP_RETRY_AFTER)
+    return response, 503
+
+
+def json_response(payload):
+    """JSON response for the matching endpoints; the serialization time is recorded in /metrics."""
+    with SERIALIZE_SECONDS.time():
+        body = json.dumps(payload, ensure_ascii=False)
+    return Response(body, mimetype='application/json')
+
+
+# --- Metrics read at scrape time ---
+CallbackMetric('aura_corpus_commands', 'Commands in the corpus', lambda: len(nlp_processor.data))
+CallbackMetric('aura_model_ready', '1 once the model and corpus embeddings are loaded',
+               lambda: int(nlp_processor.ready.is_set()))
+
+
+@app.before_request
+def start_timer():
+    g.request_start = time.perf_counter()
+
+
+@app.after_request
+def record_request(response):
+    endpoint = request.endpoint or 'unmatched'
+    HTTP_REQUESTS.labels(endpoint, response.status_code).inc()
+    HTTP_REQUEST_SECONDS.labels(endpoint).observe(time.perf_counter() - g.request_start)
+    return response
 
 # --- Routes ---
 @app.route('/')
@@ -36,19 +86,76 @@ def process_command():
         if prediction is None:
             return jsonify({'error': 'Could not process empty command'}), 400
             
-        print(f"Received: '{command_text}' -> Predicted: {prediction['intent']}")
+        logger.debug("Received: '%s' -> Predicted: %s", command_text, prediction['intent'])
         
-        return jsonify(prediction)
+        return json_response(prediction)
 
+    except ModelWarmingUp as e:
+        return warming_up_response(e)
     except Exception as e:
-        print(f"Error processing command: {e}")
+        logger.exception("Error processing command: %s", e)
         return jsonify({'error': 'An internal error occurred'}), 500
 
+@app.route('/process_commands', methods=['POST'])
+def process_commands():
+    """
+    Bulk version of /process_command. Accepts a JSON array of command strings
+    (or of {"text": ...} objects) and returns an array of results in the same order.
+    """
+    try:
+        data = request.get_json()
+        if not isinstance(data, list):
+            return jsonify({'error': 'Expected a JSON array of commands'}), 400
+        if len(data) > MAX_BATCH_SIZE:
+            return jsonify({'error': f'Too many commands (maximum is {MAX_BATCH_SIZE})'}), 413
+
+        commands = [item.get('text', '') if isinstance(item, dict) else item for item in data]
+        if not all(isinstance(text, str) for text in commands):
+            return jsonify({'error': 'Every command must be a string'}), 400
+
+        predictions = nlp_processor.predict_batch(commands)
+
+        results = [
+            prediction if prediction is not None else {'error': 'Could not process empty command'}
+            for prediction in predictions
+        ]
+        logger.debug("Received batch of %d commands.", len(commands))
+        return json_response(results)
+
+    except ModelWarmingUp as e:
+        return warming_up_response(e)
+    except Exception as e:
+        logger.exception("Error processing commands: %s", e)
+        return jsonify({'error': 'An internal error occurred'}), 500
+
+@app.route('/healthz', methods=['GET'])
+def healthz():
+    """Liveness: the process is up. Reports whether the model is loaded."""
+    return jsonify({'status': 'ok', 'model': nlp_processor.status()})
+
+@app.route('/readyz', methods=['GET'])
+def readyz():
+    """Readiness: 200 once commands can be matched, 503 while the model is loading or failed."""
+    status = nlp_processor.status()
+    if status == 'ready':
+        return jsonify({'status': 'ready', 'model': status})
+    return jsonify({'status': 'warming_up' if status == 'loading' else 'degraded', 'model': status}), 503
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Prometheus metrics of this process: match count, stage latencies and corpus size."""
+    return Response(REGISTRY.render(), content_type=CONTENT_TYPE)
+
 @app.route('/get_examples', methods=['GET'])
 def get_examples():
-    """Provides example commands to the frontend."""
-    examples = nlp_processor.df['english'].sample(5).tolist()
-    return jsonify(examples)
+    """Provides a few random example commands to the frontend."""
+    try:
+        all_english_commands = [item['english'] for item in nlp_processor.data]
+        examples = random.sample(all_english_commands, min(5, len(all_english_commands)))
+        return jsonify(examples)
+    except Exception as e:
+        logger.exception("Error in get_examples: %s", e)
+        return jsonify({'error': 'Could not retrieve examples'}), 500
 
 if __name__ == '__main__':
     # Setting debug=False is better for a "production" demo, 
@@ -0,0 +1,156 @@
+"""
+Asyncio serving mode (ASGI, Starlette + uvicorn) with the same routes as app.py:
+
+    python asgi.py                        # one process on AURA_SERVE_BIND
+    AURA_SERVE_ASYNC=1 python serve.py    # pre-forked uvicorn workers (POSIX)
+
+The matching endpoints (/process_command, /process_commands) are served by the event
+loop, which never blocks: matching and serialization run on a BoundedExecutor of
+AURA_MATCH_WORKERS threads. When the executor is saturated the request is answered at
+once with 429 and a Retry-After header instead of waiting in an unbounded queue. Every
+other route is the Flask app of app.py running through a WSGI adapter.
+"""
+import json
+import logging
+import time
+
+from a2wsgi import WSGIMiddleware
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Mount, Route
+
+from app import app as flask_app, nlp_processor, MAX_BATCH_SIZE, WARMING_UP_RETRY_AFTER
+from backpressure import BoundedExecutor, Overloaded
+from config import (
+    MATCH_WORKERS, MATCH_MAX_PENDING, MATCH_QUEUE_TIMEOUT_SECONDS, OVERLOAD_RETRY_AFTER_SECONDS,
+    SERVE_BIND, SERVE_THREADS,
+)
+from metrics import HTTP_REQUESTS, HTTP_REQUEST_SECONDS, SERIALIZE_SECONDS, CallbackMetric
+from nlp_model import ModelWarmingUp
+
+logger = logging.getLogger(__name__)
+
+match_executor = BoundedExecutor(MATCH_WORKERS, MATCH_MAX_PENDING, MATCH_QUEUE_TIMEOUT_SECONDS)
+
+
+def _executor_stat(key):
+    return lambda: match_executor.stats()[key]
+
+
+CallbackMetric('aura_match_in_flight', 'Matching calls running or queued on the executor', _executor_stat('in_flight'))
+CallbackMetric('aura_match_queued', 'Matching calls waiting for an executor thread', _executor_stat('queued'))
+CallbackMetric('aura_match_rejected', 'Requests refused with 429 because the executor was full',
+               _executor_stat('rejected'), kind='counter')
+CallbackMetric('aura_match_expired', 'Requests refused with 429 after waiting longer than the queue timeout',
+               _executor_stat('expired'), kind='counter')
+
+
+def error_response(message, status, headers=None):
+    return JSONResponse({'error': message}, status_code=status, headers=headers)
+
+
+def dump_json(payload):
+    """Serializes a response body the way app.json_response does."""
+    with SERIALIZE_SECONDS.time():
+        return json.dumps(payload, ensure_ascii=False).encode('utf-8')
+
+
+def predict_body(command_text):
+    """predict() serialized to JSON bytes, or None for an empty command. Runs on the executor."""
+    prediction = nlp_processor.predict(command_text)
+    return None if prediction is None else dump_json(prediction)
+
+
+def predict_batch_body(commands):
+    """predict_batch() serialized to a JSON array. Runs on the executor."""
+    return dump_json([
+        prediction if prediction is not None else {'error': 'Could not process empty command'}
+        for prediction in nlp_processor.predict_batch(commands)
+    ])
+
+
+async def read_json(request):
+    """Parsed request body, or None when it is not valid JSON."""
+    try:
+        return json.loads(await request.body())
+    except ValueError:
+        return None
+
+
+def matching_endpoint(name):
+    """
+    Wraps an async handler that returns a Response: turns ModelWarmingUp into a 503 and
+    Overloaded into a 429, and records the same HTTP metrics as the Flask hooks.
+    """
+    def decorator(handler):
+        async def endpoint(request: Request):
+            start = time.perf_counter()
+            try:
+                response = await handler(request)
+            except Overloaded as e:
+                logger.debug("Refused %s: %s", name, e)
+                response = error_response('overloaded', 429, {'Retry-After': str(OVERLOAD_RETRY_AFTER_SECONDS)})
+            except ModelWarmingUp as e:
+                response = JSONResponse({'error': 'warming up', 'detail': str(e), 'status': nlp_processor.status()},
+                                        status_code=503, headers={'Retry-After': str(WARMING_UP_RETRY_AFTER)})
+            except Exception as e:
+                logger.exception("Error in %s: %s", name, e)
+                response = error_response('An internal error occurred', 500)
+            HTTP_REQUESTS.labels(name, response.status_code).inc()
+            HTTP_REQUEST_SECONDS.labels(name).observe(time.perf_counter() - start)
+            return response
+        endpoint.__name__ = name
+        return endpoint
+    return decorator
+
+
+@matching_endpoint('process_command')
+async def process_command(request):
+    """Async /process_command: the match runs on the bounded executor."""
+    data = await read_json(request)
+    command_text = data.get('text', '') if isinstance(data, dict) else ''
+    if not command_text or not isinstance(command_text, str):
+        return error_response('No text provided', 400)
+
+    body = await match_executor.run(predict_body, command_text)
+    if body is None:
+        return error_response('Could not process empty command', 400)
+    return Response(body, media_type='application/json')
+
+
+@matching_endpoint('process_commands')
+async def process_commands(request):
+    """Async /process_commands: the whole batch is one call on the bounded executor."""
+    data = await read_json(request)
+    if not isinstance(data, list):
+        return error_response('Expected a JSON array of commands', 400)
+    if len(data) > MAX_BATCH_SIZE:
+        return error_response(f'Too many commands (maximum is {MAX_BATCH_SIZE})', 413)
+
+    commands = [item.get('text', '') if isinstance(item, dict) else item for item in data]
+    if not all(isinstance(text, str) for text in commands):
+        return error_response('Every command must be a string', 400)
+
+    body = await match_executor.run(predict_batch_body, commands)
+    return Response(body, media_type='application/json')
+
+
+application = Starlette(routes=[
+    Route('/process_command', process_command, methods=['POST']),
+    Route('/process_commands', process_commands, methods=['POST']),
+    # Everything else is served by the Flask app
+    Mount('/', WSGIMiddleware(flask_app, workers=SERVE_THREADS)),
+])
+
+
+def main():
+    import uvicorn
+
+    host, _, port = SERVE_BIND.rpartition(':')
+    logger.info("--- Serving (asyncio) on %s with %d matching threads ---", SERVE_BIND, MATCH_WORKERS)
+    uvicorn.run(application, host=host or '0.0.0.0', port=int(port), log_level='warning')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class Overloaded(RuntimeError):
+    """Raised when a call is refused because the executor is saturated."""
+
+
+class BoundedExecutor:
+    """
+    Runs blocking calls from asyncio handlers on a fixed pool of `workers` threads and
+    admits at most `max_pending` calls waiting for a thread on top of the running ones.
+    Calls beyond that are refused immediately with Overloaded, and so is a call that is
+    still queued after `queue_timeout` seconds (its client has likely given up), so a
+    burst is shed at the door instead of piling up behind the model.
+    """
+
+    def __init__(self, workers=4, max_pending=64, queue_timeout=2.0, name='aura-match'):
+        self.workers = max(1, workers)
+        self.max_pending = max(0, max_pending)
+        self.queue_timeout = queue_timeout
+        # Threads are only started by the first call, so a process that forks after
+        # importing the app (serve.py) gets its own pool
+        self._pool = ThreadPoolExecutor(self.workers, thread_name_prefix=name)
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._running = 0
+        self._rejected = 0
+        self._expired = 0
+
+    @property
+    def capacity(self):
+        return self.workers + self.max_pending
+
+    async def run(self, function, *args):
+        """Runs function(*args) on the pool and returns its result, or raises Overloaded."""
+        with self._lock:
+            if self._in_flight >= self.capacity:
+                self._rejected += 1
+                raise Overloaded(f'{self._in_flight} calls in flight')
+            self._in_flight += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(
+                self._pool, self._call, time.perf_counter(), function, args)
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+
+    def _call(self, queued_at, function, args):
+        if self.queue_timeout and time.perf_counter() - queued_at > self.queue_timeout:
+            with self._lock:
+                self._expired += 1
+            raise Overloaded(f'queued for more than {self.queue_timeout} s')
+        with self._lock:
+            self._running += 1
+        try:
+            return function(*args)
+        finally:
+            with self._lock:
+                self._running -= 1
+
+    def stats(self):
+        """Configured limits, current load and refused-call counters."""
+        with self._lock:
+            return {
+                'workers': self.workers,
+                'max_pending': self.max_pending,
+                'queue_timeout_seconds': self.queue_timeout,
+                'in_flight': self._in_flight,
+                'running': self._running,
+                'queued': self._in_flight - self._running,
+                'rejected': self._rejected,
+                'expired': self._expired,
+            }
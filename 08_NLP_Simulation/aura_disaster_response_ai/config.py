@@ -0,0 +1,54 @@
+import os
+
+# --- Configuration ---
+# Every setting can be overridden with an environment variable of the same
+# name prefixed with AURA_, e.g. AURA_ENCODER_BACKEND=torch-int8 python app.py
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Command dataset. Records are loaded once and are read-only, so any number of request
+# threads can share them.
+DATA_PATH = os.environ.get('AURA_DATA_PATH', os.path.join(BASE_DIR, 'data', 'nlp_disaster.json'))
+
+# Sentence Transformer used to match commands.
+MODEL_NAME = os.environ.get('AURA_MODEL_NAME', 'all-MiniLM-L6-v2')
+
+# Backend used to encode queries: 'torch' (reference), 'torch-int8' (dynamic int8
+# quantization), 'onnx' (exported graph, needs onnxruntime) or 'stub' (deterministic
+# hashed bag of words for offline benchmarks; it replaces the model entirely). Corpus
+# embeddings are otherwise always computed with the reference model. At startup a sample of the corpus is encoded
+# with both and a warning is printed if any cosine similarity falls below ENCODER_MIN_COSINE.
+ENCODER_BACKEND = os.environ.get('AURA_ENCODER_BACKEND', 'torch')
+ENCODER_DRIFT_SAMPLE = int(os.environ.get('AURA_ENCODER_DRIFT_SAMPLE', '32'))
+ENCODER_MIN_COSINE = float(os.environ.get('AURA_ENCODER_MIN_COSINE', '0.98'))
+
+# Where exported ONNX graphs are kept between runs.
+ONNX_EXPORT_DIR = os.environ.get('AURA_ONNX_EXPORT_DIR', os.path.join(BASE_DIR, 'cache', 'onnx'))
+
+# The model and corpus embeddings load on a background thread so the server binds its
+# port immediately. Until they are ready a query waits up to SEMANTIC_WAIT_SECONDS and
+# then gets a "warming up" (503) response.
+SEMANTIC_WAIT_SECONDS = float(os.environ.get('AURA_SEMANTIC_WAIT_SECONDS', '2'))
+
+# Production serving (python serve.py, POSIX only): the model and corpus embeddings are
+# loaded once in the master process and SERVE_WORKERS worker processes are forked from
+# it, each with SERVE_THREADS request threads and TORCH_THREADS_PER_WORKER intra-op
+# threads (0 splits the CPU cores evenly across the workers).
+SERVE_BIND = os.environ.get('AURA_SERVE_BIND', '0.0.0.0:5000')
+SERVE_WORKERS = int(os.environ.get('AURA_SERVE_WORKERS', str(os.cpu_count() or 1)))
+SERVE_THREADS = int(os.environ.get('AURA_SERVE_THREADS', '8'))
+TORCH_THREADS_PER_WORKER = int(os.environ.get('AURA_TORCH_THREADS_PER_WORKER', '0'))
+
+# Asyncio serving (python asgi.py, or serve.py with SERVE_ASYNC=1): matching runs on
+# MATCH_WORKERS threads per process and at most MATCH_MAX_PENDING more requests wait for
+# one. Requests beyond that, or still waiting after MATCH_QUEUE_TIMEOUT_SECONDS, get a
+# 429 with Retry-After: OVERLOAD_RETRY_AFTER_SECONDS instead of queueing without bound.
+SERVE_ASYNC = os.environ.get('AURA_SERVE_ASYNC', '0').lower() in ('1', 'true', 'yes')
+MATCH_WORKERS = int(os.environ.get('AURA_MATCH_WORKERS', '4'))
+MATCH_MAX_PENDING = int(os.environ.get('AURA_MATCH_MAX_PENDING', '64'))
+MATCH_QUEUE_TIMEOUT_SECONDS = float(os.environ.get('AURA_MATCH_QUEUE_TIMEOUT_SECONDS', '2'))
+OVERLOAD_RETRY_AFTER_SECONDS = int(os.environ.get('AURA_OVERLOAD_RETRY_AFTER_SECONDS', '1'))
+
+# Logging. Records go through a queue to a background thread that writes them to stderr.
+# Per-request lines (query and matched intent) are logged at DEBUG.
+LOG_LEVEL = os.environ.get('AURA_LOG_LEVEL', 'INFO')
@@ -0,0 +1,38 @@
+import atexit
+import logging
+import logging.handlers
+import queue
+import sys
+
+_listener = None
+
+
+def configure_logging(level='INFO'):
+    """
+    Routes all log records through a queue: request threads only enqueue the record and
+    a background listener thread formats it and writes it to stderr, so logging never
+    blocks the request path on console I/O. Safe to call again, e.g. in a forked worker
+    whose listener thread did not survive the fork.
+    """
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+
+    records = queue.SimpleQueue()
+    console = logging.StreamHandler(sys.stderr)
+    console.setFormatter(logging.Formatter('%(asctime)s %(levelname)s [%(name)s] %(message)s'))
+    _listener = logging.handlers.QueueListener(records, console, respect_handler_level=True)
+    _listener.start()
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(logging.handlers.QueueHandler(records))
+    root.setLevel(level.upper() if isinstance(level, str) else level)
+
+
+@atexit.register
+def _flush_on_exit():
+    # Drain the queue so the last records are not lost on shutdown
+    if _listener is not None:
+        _listener.stop()
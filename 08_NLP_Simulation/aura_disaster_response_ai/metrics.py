@@ -0,0 +1,202 @@
+"""
+Minimal Prometheus metrics: counters, histograms and callback gauges rendered in the
+text exposition format (served at /metrics). No client library is needed.
+
+Every process keeps its own values; with serve.py each worker reports its own.
+"""
+import threading
+import time
+from contextlib import contextmanager
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Seconds; covers sub-millisecond dictionary hits up to multi-second cold encodes
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labelnames, labelvalues, extra=()):
+    pairs = list(zip(labelnames, labelvalues)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Registry:
+    """Holds metrics in registration order and renders them."""
+
+    def __init__(self):
+        self._metrics = []
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        with self._lock:
+            metrics = list(self._metrics)
+        for metric in metrics:
+            # Counters are exposed with the conventional _total suffix
+            family = f'{metric.name}_total' if metric.kind == 'counter' else metric.name
+            lines.append(f'# HELP {family} {metric.documentation}')
+            lines.append(f'# TYPE {family} {metric.kind}')
+            lines.extend(metric.samples())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+
+class _LabelledMetric:
+    def __init__(self, name, documentation, labelnames=(), registry=REGISTRY):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = threading.Lock()
+        if not self.labelnames:
+            self._children[()] = self._new_child()
+        registry.register(self)
+
+    def labels(self, *labelvalues, **labelkwargs):
+        """Returns the child for one combination of label values."""
+        if labelkwargs:
+            labelvalues = tuple(labelkwargs[name] for name in self.labelnames)
+        key = tuple(str(value) for value in labelvalues)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+
+class _CounterChild:
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+
+class Counter(_LabelledMetric):
+    """Monotonically increasing count."""
+
+    kind = 'counter'
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount=1):
+        self._children[()].inc(amount)
+
+    def samples(self):
+        for key, child in list(self._children.items()):
+            yield f'{self.name}_total{_format_labels(self.labelnames, key)} {_format_value(child.value)}'
+
+
+class _HistogramChild:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        with self._lock:
+            self.sum += value
+            self.count += 1
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    self.counts[i] += 1
+                    break
+
+    @contextmanager
+    def time(self):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+
+class Histogram(_LabelledMetric):
+    """Distribution of observed values (latencies in seconds by default) in cumulative buckets."""
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS, registry=REGISTRY):
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+        super().__init__(name, documentation, labelnames, registry)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value):
+        self._children[()].observe(value)
+
+    def time(self):
+        """Context manager observing the duration of its block."""
+        return self._children[()].time()
+
+    def samples(self):
+        for key, child in list(self._children.items()):
+            with child._lock:
+                counts, total, count = list(child.counts), child.sum, child.count
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.labelnames, key, [('le', _format_value(bound))])
+                yield f'{self.name}_bucket{labels} {cumulative}'
+            labels = _format_labels(self.labelnames, key)
+            yield f'{self.name}_sum{labels} {_format_value(total)}'
+            yield f'{self.name}_count{labels} {count}'
+
+
+class CallbackMetric:
+    """
+    A gauge or counter whose value is read when /metrics is scraped. `function` returns
+    a number, or a dict mapping label-value tuples to numbers when `labelnames` is set.
+    """
+
+    def __init__(self, name, documentation, function, kind='gauge', labelnames=(), registry=REGISTRY):
+        self.name = name
+        self.documentation = documentation
+        self.function = function
+        self.kind = kind
+        self.labelnames = tuple(labelnames)
+        registry.register(self)
+
+    def samples(self):
+        name = f'{self.name}_total' if self.kind == 'counter' else self.name
+        try:
+            values = self.function()
+        except Exception:
+            return
+        if not self.labelnames:
+            values = {(): values}
+        for key, value in values.items():
+            yield f'{name}{_format_labels(self.labelnames, key)} {_format_value(value)}'
+
+
+# --- Metrics of the matching pipeline ---
+MATCHES = Counter('aura_matches', 'Queries matched to a command')
+ENCODE_SECONDS = Histogram('aura_encode_seconds', 'Time to encode one batch of queries')
+SEARCH_SECONDS = Histogram('aura_similarity_search_seconds', 'Time of one cosine similarity search over a batch of queries')
+SERIALIZE_SECONDS = Histogram('aura_json_serialize_seconds', 'Time to serialize a JSON response body')
+HTTP_REQUESTS = Counter('aura_http_requests', 'HTTP requests handled', ['endpoint', 'status'])
+HTTP_REQUEST_SECONDS = Histogram('aura_http_request_seconds', 'HTTP request handling time', ['endpoint'])
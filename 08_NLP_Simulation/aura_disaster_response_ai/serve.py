@@ -0,0 +1,83 @@
+"""
+Production server (POSIX only). Loads the model and the corpus embeddings once in the
+master process, then forks worker processes that share them copy-on-write:
+
+    python serve.py
+    AURA_SERVE_WORKERS=16 AURA_TORCH_THREADS_PER_WORKER=1 python serve.py
+    AURA_SERVE_ASYNC=1 python serve.py     # uvicorn workers serving asgi.py
+
+Everything built before the fork is frozen out of the garbage collector, so the
+workers do not dirty (and thereby copy) the pages holding the corpus. /metrics reports
+the counters of the worker that answers the scrape.
+"""
+import gc
+import logging
+import os
+
+from gunicorn.app.base import BaseApplication
+
+from app import app, nlp_processor
+from config import (
+    SERVE_BIND, SERVE_WORKERS, SERVE_THREADS, TORCH_THREADS_PER_WORKER, LOG_LEVEL, SERVE_ASYNC, MATCH_WORKERS,
+)
+from logging_setup import configure_logging
+
+logger = logging.getLogger(__name__)
+
+
+def post_fork(server, worker):
+    """Runs in every worker right after it is forked."""
+    import torch
+
+    threads = TORCH_THREADS_PER_WORKER or max(1, (os.cpu_count() or 1) // SERVE_WORKERS)
+    torch.set_num_threads(threads)
+    # The log listener thread of the master did not survive the fork
+    configure_logging(LOG_LEVEL)
+    logger.info("Worker %d started with %d torch intra-op threads.", worker.pid, threads)
+
+
+class PreforkServer(BaseApplication):
+    """Gunicorn application serving an already-loaded WSGI app."""
+
+    def __init__(self, application, options):
+        self.application = application
+        self.options = options
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+
+    def load(self):
+        return self.application
+
+
+def main():
+    # Wait for the background loader: the workers must inherit the loaded model
+    if not nlp_processor.wait_until_ready():
+        raise SystemExit(f"FATAL ERROR: NLP model failed to load: {nlp_processor.load_error}")
+    gc.collect()
+    gc.freeze()
+
+    options = {
+        'bind': SERVE_BIND,
+        'workers': SERVE_WORKERS,
+        'worker_class': 'gthread',
+        'threads': SERVE_THREADS,
+        'post_fork': post_fork,
+        'timeout': 120,
+    }
+    application = app
+    if SERVE_ASYNC:
+        # One event loop per worker; matching runs on its bounded executor (see asgi.py)
+        from asgi import application
+        options['worker_class'] = 'uvicorn.workers.UvicornWorker'
+        logger.info("--- Serving (asyncio) on %s with %d workers x %d matching threads ---",
+                    SERVE_BIND, SERVE_WORKERS, MATCH_WORKERS)
+    else:
+        logger.info("--- Serving on %s with %d workers x %d threads ---", SERVE_BIND, SERVE_WORKERS, SERVE_THREADS)
+    PreforkServer(application, options).run()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,16 +1,121 @@
+import hmac
+import ipaddress
 import json
+import logging
 import random
-from flask import Flask, render_template, request, jsonify
-from nlp_model import DisasterNLP
+import time
+from flask import Flask, Response, g, render_template, request, jsonify, stream_with_context
+from nlp_model import DisasterNLP, ModelWarmingUp, TIER_SEMANTIC
+from config import (
+    MAX_BATCH_SIZE, CORPUS_WATCH_INTERVAL_SECONDS, ADMIN_TOKEN, STREAM_BATCH_SIZE, STREAM_MAX_LINE_BYTES,
+    LOG_LEVEL, PRIORITY_CONSOLE_TOKENS,
+)
+from logging_setup import configure_logging
+from metrics import (
+    CONTENT_TYPE, REGISTRY, HTTP_REQUESTS, HTTP_REQUEST_SECONDS, CallbackMetric,
+)
+from streaming import stream_results
+
+configure_logging(LOG_LEVEL)
+logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
 
 # --- Initialization ---
 # Instantiate the NLP model when the server starts.
-# This is efficient as it's done only once.
-print("--- Server starting up ---")
-nlp_processor = DisasterNLP()
-print("--- NLP model initialization complete. Server is ready. ---")
+# The exact/fuzzy Tamil tiers are ready right away; the transformer and the corpus
+# embeddings load in the background so the server can bind its port immediately.
+logger.info("--- Server starting up ---")
+nlp_processor = DisasterNLP(load_in_background=True)
+nlp_processor.start_corpus_watcher(CORPUS_WATCH_INTERVAL_SECONDS)
+logger.info("--- Tamil exact/fuzzy matching is ready. Semantic search is loading in the background. ---")
+
+# Seconds a client is told to wait before retrying a request that hit a cold semantic tier
+WARMING_UP_RETRY_AFTER = 5
+
+
+def warming_up_response(error):
+    """503 telling the client the semantic tier is not ready yet, with the live tiers."""
+    response = jsonify({'error': 'warming up', 'detail': str(error), 'tiers': nlp_processor.tier_status()})
+    response.headers['Retry-After'] = str(WARMING_UP_RETRY_AFTER)
+    return response, 503
+
+
+def admin_authorized():
+    """
+    /admin/* access: the X-Admin-Token header must match AURA_ADMIN_TOKEN. Without a
+    configured token only callers on the loopback interface are allowed.
+    """
+    if ADMIN_TOKEN:
+        return hmac.compare_digest(request.headers.get('X-Admin-Token', '').encode('utf-8'), ADMIN_TOKEN.encode('utf-8'))
+    try:
+        return ipaddress.ip_address(request.remote_addr or '').is_loopback
+    except ValueError:
+        return False
+
+
+# Header carrying an operator console's secret token (see AURA_PRIORITY_CONSOLE_TOKENS)
+OPERATOR_TOKEN_HEADER = 'X-Operator-Token'
+
+
+def operator_console(token):
+    """The operator console that `token` belongs to, or None. Tokens are compared in constant time."""
+    console = None
+    if token:
+        for known_token, known_console in PRIORITY_CONSOLE_TOKENS.items():
+            if hmac.compare_digest(token.encode('utf-8'), known_token.encode('utf-8')):
+                console = known_console
+    return console
+
+
+# Slot of an empty command in a /process_commands response
+EMPTY_COMMAND_ERROR = b'{"error": "Could not process empty command"}'
+
+
+# --- Metrics read at scrape time ---
+def _query_cache_stats():
+    stats = nlp_processor.query_cache.stats()
+    return {(event,): stats[event] for event in ('hits', 'misses', 'evictions', 'expirations')}
+
+
+def _batcher_stat(key):
+    return lambda: nlp_processor.semantic_batcher.stats()[key] if nlp_processor.semantic_batcher else 0
+
+
+def _semantic_queue_depths():
+    if nlp_processor.semantic_batcher is None:
+        return {}
+    return {(priority,): depth for priority, depth in nlp_processor.semantic_batcher.queue_depths().items()}
+
+
+CallbackMetric('aura_corpus_commands', 'Commands in the active corpus', lambda: len(nlp_processor.data))
+CallbackMetric('aura_corpus_vectors', 'Sentences (English and Tamil) in the semantic index',
+               lambda: len(nlp_processor.bilingual_corpus))
+CallbackMetric('aura_semantic_ready', '1 once the semantic tier is loaded',
+               lambda: int(nlp_processor.semantic_ready.is_set()))
+CallbackMetric('aura_query_cache_events', 'Query cache lookups and removals, by event', _query_cache_stats,
+               kind='counter', labelnames=['event'])
+CallbackMetric('aura_query_cache_entries', 'Entries in the query cache', lambda: nlp_processor.query_cache.stats()['size'])
+CallbackMetric('aura_semantic_batches', 'Encode calls made by the semantic micro-batcher', _batcher_stat('batches'),
+               kind='counter')
+CallbackMetric('aura_semantic_batch_items', 'Queries encoded by the semantic micro-batcher', _batcher_stat('items'),
+               kind='counter')
+CallbackMetric('aura_semantic_queue_depth', 'Queries waiting for the semantic micro-batcher, by priority class',
+               _semantic_queue_depths, labelnames=['priority'])
+
+
+@app.before_request
+def start_timer():
+    g.request_start = time.perf_counter()
+
+
+@app.after_request
+def record_request(response):
+    # For /process_stream this is the time to the first byte, not to the end of the stream
+    endpoint = request.endpoint or 'unmatched'
+    HTTP_REQUESTS.labels(endpoint, response.status_code).inc()
+    HTTP_REQUEST_SECONDS.labels(endpoint).observe(time.perf_counter() - g.request_start)
+    return response
 
 # --- Routes ---
 @app.route('/')
@@ -31,20 +136,140 @@ def process_command():
         if not command_text:
             return jsonify({'error': 'No text provided'}), 400
 
-        # Use the NLP model to predict the corresponding command
-        prediction = nlp_processor.predict(command_text)
+        # Safety-critical orders and operator consoles go ahead of routine queries for the encoder
+        priority = nlp_processor.classify_priority(command_text,
+                                                   operator_console(request.headers.get(OPERATOR_TOKEN_HEADER)))
 
-        if prediction is None:
+        # Use the NLP model to predict the corresponding command, as ready-made JSON bytes
+        body = nlp_processor.predict_json(command_text, priority)
+
+        if body is None:
             return jsonify({'error': 'Could not process empty command'}), 400
-            
-        print(f"Received: '{command_text}' -> Predicted Intent: {prediction['intent']}")
-        
+
         # Return the full structured data object
-        return jsonify(prediction)
+        return Response(body, mimetype='application/json')
+
+    except ModelWarmingUp as e:
+        return warming_up_response(e)
+    except Exception as e:
+        logger.exception("Error in process_command: %s", e)
+        return jsonify({'error': 'An internal server error occurred'}), 500
+
+@app.route('/process_commands', methods=['POST'])
+def process_commands():
+    """
+    Bulk version of /process_command. Accepts a JSON array of command strings
+    (or of {"text": ...} objects) and returns an array of results in the same order.
+    Empty commands yield an error object in their slot instead of failing the batch.
+    """
+    try:
+        data = request.get_json()
+        if not isinstance(data, list):
+            return jsonify({'error': 'Expected a JSON array of commands'}), 400
+        if len(data) > MAX_BATCH_SIZE:
+            return jsonify({'error': f'Too many commands (maximum is {MAX_BATCH_SIZE})'}), 413
+
+        commands = [item.get('text', '') if isinstance(item, dict) else item for item in data]
+        if not all(isinstance(text, str) for text in commands):
+            return jsonify({'error': 'Every command must be a string'}), 400
+
+        bodies = nlp_processor.predict_batch_json(commands)
+
+        body = b'[' + b', '.join(item if item is not None else EMPTY_COMMAND_ERROR for item in bodies) + b']'
+        logger.debug("Received batch of %d commands.", len(commands))
+        return Response(body, mimetype='application/json')
+
+    except ModelWarmingUp as e:
+        return warming_up_response(e)
+    except Exception as e:
+        logger.exception("Error in process_commands: %s", e)
+        return jsonify({'error': 'An internal server error occurred'}), 500
+
+@app.route('/process_plan', methods=['POST'])
+def process_plan():
+    """
+    Receives a chained order ({"text": ...}), splits it into clauses and returns
+    {"original_query": ..., "plan": [...]}: one /process_command result per clause, in order.
+    """
+    try:
+        data = request.get_json()
+        command_text = data.get('text', '')
+
+        if not command_text or not isinstance(command_text, str):
+            return jsonify({'error': 'No text provided'}), 400
+
+        body = nlp_processor.predict_plan_json(command_text)
 
+        if body is None:
+            return jsonify({'error': 'Could not process empty command'}), 400
+
+        return Response(body, mimetype='application/json')
+
+    except ModelWarmingUp as e:
+        return warming_up_response(e)
+    except Exception as e:
+        logger.exception("Error in process_plan: %s", e)
+        return jsonify({'error': 'An internal server error occurred'}), 500
+
+@app.route('/process_stream', methods=['POST'])
+def process_stream():
+    """
+    Streaming ingest. The (typically chunked) request body is a sequence of lines, each
+    plain text, a JSON string or a {"text": ..., "ref": ...} object. One NDJSON line is
+    streamed back per utterance as soon as it is matched:
+    {"seq": n, "ref": ..., "result": {...}} or {"seq": n, "error": "..."}.
+    """
+    results = stream_results(nlp_processor, request.stream, STREAM_BATCH_SIZE, STREAM_MAX_LINE_BYTES)
+    return Response(stream_with_context(results), mimetype='application/x-ndjson')
+
+@app.route('/healthz', methods=['GET'])
+def healthz():
+    """Liveness: the process is up and serving. Reports the state of every matching tier."""
+    return jsonify({'status': 'ok', 'tiers': nlp_processor.tier_status()})
+
+@app.route('/readyz', methods=['GET'])
+def readyz():
+    """Readiness: 200 once every tier (including semantic search) is live, 503 before."""
+    tiers = nlp_processor.tier_status()
+    if tiers[TIER_SEMANTIC] == 'ready':
+        return jsonify({'status': 'ready', 'tiers': tiers})
+    return jsonify({'status': 'warming_up' if tiers[TIER_SEMANTIC] == 'loading' else 'degraded', 'tiers': tiers}), 503
+
+@app.route('/cache_stats', methods=['GET'])
+def cache_stats():
+    """Reports hit/miss/eviction counters of the query result cache."""
+    return jsonify(nlp_processor.query_cache.stats())
+
+@app.route('/batch_stats', methods=['GET'])
+def batch_stats():
+    """Reports batch sizes and queueing delay of the semantic micro-batcher."""
+    if nlp_processor.semantic_batcher is None:
+        return jsonify({'enabled': False})
+    return jsonify({'enabled': True, **nlp_processor.semantic_batcher.stats()})
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Prometheus metrics of this process: tier counts, stage latencies, corpus and cache."""
+    return Response(REGISTRY.render(), content_type=CONTENT_TYPE)
+
+@app.route('/admin/reload', methods=['POST'])
+def reload_corpus():
+    """
+    Reloads data/nlp_disaster.json without a restart. Only new or changed sentences
+    are re-encoded and requests keep being served from the old corpus until the
+    new one is swapped in.
+    """
+    if not admin_authorized():
+        return jsonify({'error': 'Unauthorized'}), 401
+    try:
+        return jsonify(nlp_processor.reload())
+    except ModelWarmingUp as e:
+        return warming_up_response(e)
+    except (OSError, ValueError) as e:
+        logger.error("Error in reload_corpus: %s", e)
+        return jsonify({'error': f'Could not reload corpus: {e}'}), 400
     except Exception as e:
-        print(f"ERROR in process_command: {e}")
-        # In a real app, you might log the stack trace here.
+        logger.exception("Error in reload_corpus: %s", e)
         return jsonify({'error': 'An internal server error occurred'}), 500
 
 @app.route('/get_examples', methods=['GET'])
@@ -62,7 +287,7 @@ def get_examples():
         
         return jsonify(examples)
     except Exception as e:
-        print(f"ERROR in get_examples: {e}")
+        logger.exception("Error in get_examples: %s", e)
         return jsonify({'error': 'Could not retrieve examples'}), 500
 
 if __name__ == '__main__':
@@ -0,0 +1,346 @@
+"""
+Asyncio serving mode (ASGI, Starlette + uvicorn) with the same routes as app.py:
+
+    python asgi.py                        # one process on AURA_SERVE_BIND
+    AURA_SERVE_ASYNC=1 python serve.py    # pre-forked uvicorn workers (POSIX)
+
+The matching endpoints (/process_command, /process_commands, /process_plan) are served
+by the event loop, which never blocks: the DisasterNLP call runs on a BoundedExecutor
+of AURA_MATCH_WORKERS threads. When the executor is saturated the request is answered
+at once with 429 and a Retry-After header instead of waiting in an unbounded queue.
+Waiting calls are ordered by priority class: requests from operator consoles that
+present a token of AURA_PRIORITY_CONSOLE_TOKENS (X-Operator-Token header) and orders
+already known to map to a safety_critical command run before routine ones.
+Concurrent single commands that reach the semantic tier are still encoded together by
+the micro-batcher. Every other route, including /process_stream, is the Flask app of
+app.py running through a WSGI adapter.
+
+/ws is a push channel only this server has: consoles submit commands over a WebSocket
+and every console watching the same operation receives the results (see `websocket`).
+"""
+import json
+import logging
+import time
+
+from a2wsgi import WSGIMiddleware
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Mount, Route, WebSocketRoute
+from starlette.websockets import WebSocketDisconnect
+
+from app import (
+    app as flask_app, nlp_processor, operator_console, EMPTY_COMMAND_ERROR, OPERATOR_TOKEN_HEADER,
+    WARMING_UP_RETRY_AFTER,
+)
+from backpressure import BoundedExecutor, Overloaded
+from hub import CLOSE_TRY_AGAIN_LATER, OperationHub
+from config import (
+    MAX_BATCH_SIZE, MATCH_WORKERS, MATCH_MAX_PENDING, MATCH_CRITICAL_RESERVE, MATCH_QUEUE_TIMEOUT_SECONDS,
+    OVERLOAD_RETRY_AFTER_SECONDS, PRIORITY_MAX_WAIT_MS, SERVE_BIND, SERVE_THREADS, WS_MAX_CONNECTIONS,
+    WS_SEND_QUEUE_SIZE,
+)
+from metrics import HTTP_REQUESTS, HTTP_REQUEST_SECONDS, CallbackMetric
+from nlp_model import ModelWarmingUp
+
+logger = logging.getLogger(__name__)
+
+match_executor = BoundedExecutor(MATCH_WORKERS, MATCH_MAX_PENDING, MATCH_QUEUE_TIMEOUT_SECONDS,
+                                 max_wait_ms=PRIORITY_MAX_WAIT_MS, critical_reserve=MATCH_CRITICAL_RESERVE)
+
+
+def _executor_stat(key):
+    return lambda: match_executor.stats()[key]
+
+
+def _executor_stat_by_priority(key):
+    return lambda: {(priority,): stats[key] for priority, stats in match_executor.stats()['priorities'].items()}
+
+
+CallbackMetric('aura_match_in_flight', 'Matching calls running or queued on the executor', _executor_stat('in_flight'))
+CallbackMetric('aura_match_queued', 'Matching calls waiting for an executor thread', _executor_stat('queued'))
+CallbackMetric('aura_match_queue_depth', 'Matching calls waiting for an executor thread, by priority class',
+               lambda: {(priority,): depth for priority, depth in match_executor.queue_depths().items()},
+               labelnames=['priority'])
+CallbackMetric('aura_match_rejected', 'Requests refused with 429 because the executor was full, by priority class',
+               _executor_stat_by_priority('rejected'), kind='counter', labelnames=['priority'])
+CallbackMetric('aura_match_expired',
+               'Requests refused with 429 after waiting longer than the queue timeout, by priority class',
+               _executor_stat_by_priority('expired'), kind='counter', labelnames=['priority'])
+CallbackMetric('aura_match_aged', 'Queued calls served ahead of more urgent ones because they waited too long',
+               _executor_stat_by_priority('aged'), kind='counter', labelnames=['priority'])
+
+hub = OperationHub(WS_SEND_QUEUE_SIZE)
+
+
+def _hub_stat(key):
+    return lambda: hub.stats()[key]
+
+
+CallbackMetric('aura_ws_connections', 'Open push-channel (/ws) connections', _hub_stat('connections'))
+CallbackMetric('aura_ws_operations', 'Operations with at least one connected console', _hub_stat('operations'))
+CallbackMetric('aura_ws_published', 'Events published to an operation', _hub_stat('published'), kind='counter')
+CallbackMetric('aura_ws_delivered', 'Events queued for a console (one per console of the operation)',
+               _hub_stat('delivered'), kind='counter')
+CallbackMetric('aura_ws_dropped', 'Consoles disconnected for falling behind', _hub_stat('dropped'), kind='counter')
+
+
+def error_response(message, status, headers=None):
+    return JSONResponse({'error': message}, status_code=status, headers=headers)
+
+
+def json_body_response(body):
+    return Response(body, media_type='application/json')
+
+
+async def read_json(request):
+    """Parsed request body, or None when it is not valid JSON."""
+    try:
+        return json.loads(await request.body())
+    except ValueError:
+        return None
+
+
+def matching_endpoint(name):
+    """
+    Wraps an async handler that returns a Response: turns ModelWarmingUp into a 503 and
+    Overloaded into a 429, and records the same HTTP metrics as the Flask hooks.
+    """
+    def decorator(handler):
+        async def endpoint(request: Request):
+            start = time.perf_counter()
+            try:
+                response = await handler(request)
+            except Overloaded as e:
+                logger.debug("Refused %s: %s", name, e)
+                response = error_response('overloaded', 429, {'Retry-After': str(OVERLOAD_RETRY_AFTER_SECONDS)})
+            except ModelWarmingUp as e:
+                response = JSONResponse({'error': 'warming up', 'detail': str(e), 'tiers': nlp_processor.tier_status()},
+                                        status_code=503, headers={'Retry-After': str(WARMING_UP_RETRY_AFTER)})
+            except Exception as e:
+                logger.exception("Error in %s: %s", name, e)
+                response = error_response('An internal server error occurred', 500)
+            HTTP_REQUESTS.labels(name, response.status_code).inc()
+            HTTP_REQUEST_SECONDS.labels(name).observe(time.perf_counter() - start)
+            return response
+        endpoint.__name__ = name
+        return endpoint
+    return decorator
+
+
+def request_operator(request):
+    """The operator console authenticated by the request's X-Operator-Token, or None."""
+    return operator_console(request.headers.get(OPERATOR_TOKEN_HEADER))
+
+
+@matching_endpoint('process_command')
+async def process_command(request):
+    """Async /process_command: the match runs on the bounded executor, queued by priority class."""
+    data = await read_json(request)
+    command_text = data.get('text', '') if isinstance(data, dict) else ''
+    if not command_text or not isinstance(command_text, str):
+        return error_response('No text provided', 400)
+
+    priority = nlp_processor.classify_priority(command_text, request_operator(request))
+    body = await match_executor.run(nlp_processor.predict_json, command_text, priority, priority=priority)
+    if body is None:
+        return error_response('Could not process empty command', 400)
+    return json_body_response(body)
+
+
+@matching_endpoint('process_commands')
+async def process_commands(request):
+    """Async /process_commands: the whole batch is one call on the bounded executor."""
+    data = await read_json(request)
+    if not isinstance(data, list):
+        return error_response('Expected a JSON array of commands', 400)
+    if len(data) > MAX_BATCH_SIZE:
+        return error_response(f'Too many commands (maximum is {MAX_BATCH_SIZE})', 413)
+
+    commands = [item.get('text', '') if isinstance(item, dict) else item for item in data]
+    if not all(isinstance(text, str) for text in commands):
+        return error_response('Every command must be a string', 400)
+
+    priority = nlp_processor.classify_priority(None, request_operator(request))
+    bodies = await match_executor.run(nlp_processor.predict_batch_json, commands, priority=priority)
+    return json_body_response(
+        b'[' + b', '.join(item if item is not None else EMPTY_COMMAND_ERROR for item in bodies) + b']')
+
+
+@matching_endpoint('process_plan')
+async def process_plan(request):
+    """Async /process_plan: all clauses are matched in one call on the bounded executor."""
+    data = await read_json(request)
+    command_text = data.get('text', '') if isinstance(data, dict) else ''
+    if not command_text or not isinstance(command_text, str):
+        return error_response('No text provided', 400)
+
+    priority = nlp_processor.classify_priority(command_text, request_operator(request))
+    body = await match_executor.run(nlp_processor.predict_plan_json, command_text, priority=priority)
+    if body is None:
+        return error_response('Could not process empty command', 400)
+    return json_body_response(body)
+
+
+class _LineInput:
+    """
+    wsgi.input of the adapter with a `readline(limit)` that waits for the next chunk of
+    the body. The adapter's own returns b'' while its buffer is empty, which the stream
+    reader would take for the end of the upload.
+    """
+
+    def __init__(self, body):
+        self._body = body
+
+    def readline(self, limit=-1):
+        line = b''
+
+        def complete():
+            return line.endswith(b'\n') or 0 <= limit <= len(line) or not self._body.has_more
+
+        while True:
+            line += self._body.readline(-1 if limit < 0 else limit - len(line))
+            if complete():
+                return line
+            # Blocks until the next chunk arrives; the rest of it stays buffered
+            line += self._body.read(1)
+            if complete():
+                return line
+
+    def __getattr__(self, name):
+        return getattr(self._body, name)
+
+
+def _event(event_type, subscriber, ref, key=None, body=None):
+    """
+    Serializes a push-channel event once for all its recipients. `body` is JSON bytes
+    (e.g. a pre-serialized match) placed under `key` without being parsed again.
+    """
+    head = json.dumps({'type': event_type, 'operation': subscriber.operation, 'console': subscriber.console,
+                       'ref': ref}, ensure_ascii=False)
+    if body is None:
+        return head
+    return f'{head[:-1]}, "{key}": {body.decode("utf-8")}}}'
+
+
+def _error_event(subscriber, ref, error, **fields):
+    return json.dumps({'type': 'error', 'ref': ref, 'error': error, **fields}, ensure_ascii=False)
+
+
+async def _handle_ws_message(subscriber, message):
+    """
+    Handles one message from a console:
+    {"type": "command", "text": ..., "ref": ...} is matched and the result is published to
+    the operation as {"type": "result", ..., "result": {...}};
+    {"type": "execute", "id": ..., "ref": ...} (a confirmed command) is published as
+    {"type": "visualization", ..., "command": {...}} so every screen runs it. Only the
+    console that issued a confirmation-required command, and was sent its result, can
+    confirm it, once.
+    Errors go back to the sending console only.
+    """
+    ref = message.get('ref')
+    if message.get('type') == 'execute':
+        if not subscriber.take_confirmation(message.get('id')):
+            hub.send(subscriber, _error_event(subscriber, ref, 'No command of this console awaits that confirmation'))
+            return
+        command = nlp_processor.command_json(message.get('id'))
+        if command is None:
+            hub.send(subscriber, _error_event(subscriber, ref, 'Unknown command id'))
+        else:
+            hub.publish(subscriber.operation, _event('visualization', subscriber, ref, 'command', command))
+        return
+
+    text = message.get('text')
+    if message.get('type') != 'command' or not isinstance(text, str) or not text.strip():
+        hub.send(subscriber, _error_event(subscriber, ref, 'Expected {"type": "command", "text": ...}'))
+        return
+    try:
+        priority = nlp_processor.classify_priority(text, subscriber.operator)
+        body = await match_executor.run(nlp_processor.predict_json, text, priority, priority=priority)
+    except Overloaded:
+        hub.send(subscriber, _error_event(subscriber, ref, 'overloaded', retry_after=OVERLOAD_RETRY_AFTER_SECONDS))
+        return
+    except ModelWarmingUp as e:
+        hub.send(subscriber, _error_event(subscriber, ref, 'warming up', detail=str(e),
+                                          retry_after=WARMING_UP_RETRY_AFTER))
+        return
+    if body is None:
+        hub.send(subscriber, _error_event(subscriber, ref, 'Could not process empty command'))
+        return
+    recipients = hub.publish(subscriber.operation, _event('result', subscriber, ref, 'result', body))
+    result = json.loads(body)
+    if result.get('confirmation_required') and subscriber in recipients:
+        subscriber.expect_confirmation(result.get('id'))
+
+
+async def websocket(ws):
+    """
+    Push channel: /ws?operation=<id>&console=<id>[&token=<operator token>]. One
+    connection per console carries its commands and every event of its operation
+    (default operation: "default"). The console id only labels events; its commands are
+    scheduled as an operator console's only with a valid token (browsers cannot set
+    headers on a WebSocket). Messages of one console are handled in order.
+    """
+    operation = ws.query_params.get('operation') or 'default'
+    console = ws.query_params.get('console') or None
+    operator = operator_console(ws.query_params.get('token'))
+    if hub.connections >= WS_MAX_CONNECTIONS:
+        await ws.close(code=CLOSE_TRY_AGAIN_LATER)
+        return
+    await ws.accept()
+    subscriber = hub.subscribe(ws, operation, console, operator)
+    logger.debug("Console %s joined operation %s", console, operation)
+    try:
+        while True:
+            try:
+                message = json.loads(await ws.receive_text())
+            except ValueError:
+                message = None
+            if not isinstance(message, dict):
+                hub.send(subscriber, _error_event(subscriber, None, 'Messages must be JSON objects'))
+                continue
+            start = time.perf_counter()
+            try:
+                await _handle_ws_message(subscriber, message)
+            except Exception as e:
+                logger.exception("Error in websocket: %s", e)
+                hub.send(subscriber, _error_event(subscriber, message.get('ref'), 'An internal server error occurred'))
+            HTTP_REQUEST_SECONDS.labels('websocket').observe(time.perf_counter() - start)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        hub.unsubscribe(subscriber)
+        logger.debug("Console %s left operation %s", console, operation)
+
+
+def flask_wsgi(environ, start_response):
+    """
+    The Flask app behind the adapter. The body is read from the ASGI receive channel up
+    to its end, so chunked uploads without a Content-Length (streaming ingest) can be read
+    to EOF; Werkzeug only does so when told.
+    """
+    environ['wsgi.input'] = _LineInput(environ['wsgi.input'])
+    environ['wsgi.input_terminated'] = True
+    return flask_app(environ, start_response)
+
+
+application = Starlette(routes=[
+    Route('/process_command', process_command, methods=['POST']),
+    Route('/process_commands', process_commands, methods=['POST']),
+    Route('/process_plan', process_plan, methods=['POST']),
+    WebSocketRoute('/ws', websocket),
+    # Everything else, including streaming ingest, is served by the Flask app
+    Mount('/', WSGIMiddleware(flask_wsgi, workers=SERVE_THREADS)),
+])
+
+
+def main():
+    import uvicorn
+
+    host, _, port = SERVE_BIND.rpartition(':')
+    logger.info("--- Serving (asyncio) on %s with %d matching threads ---", SERVE_BIND, MATCH_WORKERS)
+    uvicorn.run(application, host=host or '0.0.0.0', port=int(port), log_level='warning')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,146 @@
+import asyncio
+import collections
+import threading
+import time
+from concurrent.futures import Future
+
+from scheduling import PRIORITIES, PRIORITY_CRITICAL, PRIORITY_ROUTINE, PriorityWorkQueue
+
+
+class Overloaded(RuntimeError):
+    """Raised when a call is refused because the executor is saturated."""
+
+
+class BoundedExecutor:
+    """
+    Runs blocking calls from asyncio handlers on a fixed pool of `workers` threads and
+    admits at most `max_pending` calls waiting for a thread on top of the running ones.
+    Calls beyond that are refused immediately with Overloaded, and so is a call that is
+    still queued after `queue_timeout` seconds (its client has likely given up), so a
+    burst is shed at the door instead of piling up behind the model.
+
+    Waiting calls are ordered by priority class (see scheduling.PriorityWorkQueue).
+    The bound is global: all classes together never exceed `capacity`, and the last
+    `critical_reserve` slots of it admit critical calls only, so a flood of routine
+    requests can neither delay nor lock out critical ones.
+    """
+
+    def __init__(self, workers=4, max_pending=64, queue_timeout=2.0, name='aura-match', max_wait_ms=200,
+                 critical_reserve=8):
+        self.workers = max(1, workers)
+        self.max_pending = max(0, max_pending)
+        # Routine calls always get at least one slot
+        self.critical_reserve = min(max(0, critical_reserve), self.capacity - 1)
+        self.queue_timeout = queue_timeout
+        self.name = name
+        self._queue = PriorityWorkQueue(max_wait_seconds=max_wait_ms / 1000)
+        self._threads = []
+        self._start_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._in_flight = collections.Counter()
+        self._running = 0
+        self._rejected = collections.Counter()
+        self._expired = collections.Counter()
+
+    @property
+    def capacity(self):
+        """Calls admitted at once across all priority classes: running plus waiting."""
+        return self.workers + self.max_pending
+
+    def _limit(self, priority):
+        """In-flight calls (all classes) beyond which a call of `priority` is refused."""
+        return self.capacity if priority == PRIORITY_CRITICAL else self.capacity - self.critical_reserve
+
+    def _ensure_started(self):
+        # Started on first use rather than in __init__, so a process that forks after
+        # importing the app (serve.py) gets its own pool
+        if len(self._threads) == self.workers and all(thread.is_alive() for thread in self._threads):
+            return
+        with self._start_lock:
+            self._threads = [thread for thread in self._threads if thread.is_alive()]
+            while len(self._threads) < self.workers:
+                thread = threading.Thread(target=self._work, name=f'{self.name}-{len(self._threads)}', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    async def run(self, function, *args, priority=PRIORITY_ROUTINE):
+        """Runs function(*args) on the pool and returns its result, or raises Overloaded."""
+        with self._lock:
+            in_flight = sum(self._in_flight.values())
+            if in_flight >= self._limit(priority):
+                self._rejected[priority] += 1
+                raise Overloaded(f'{in_flight} calls in flight ({priority} limit {self._limit(priority)})')
+            self._in_flight[priority] += 1
+        future = Future()
+        try:
+            self._ensure_started()
+            self._queue.put((future, time.perf_counter(), priority, function, args), priority)
+        except BaseException:
+            self._release(priority)
+            raise
+        # The slot is released by the worker once the call ends, not here: a cancelled
+        # handler (client gone) must not free it while a thread still runs the call
+        return await asyncio.wrap_future(future)
+
+    def _release(self, priority):
+        with self._lock:
+            self._in_flight[priority] -= 1
+
+    def _work(self):
+        while True:
+            future, queued_at, priority, function, args = self._queue.get()
+            # Skipped when the waiting handler was cancelled (client gone)
+            if not future.set_running_or_notify_cancel():
+                self._release(priority)
+                continue
+            if self.queue_timeout and time.perf_counter() - queued_at > self.queue_timeout:
+                with self._lock:
+                    self._expired[priority] += 1
+                    self._in_flight[priority] -= 1
+                future.set_exception(Overloaded(f'queued for more than {self.queue_timeout} s'))
+                continue
+            with self._lock:
+                self._running += 1
+            try:
+                result, error = function(*args), None
+            except BaseException as e:
+                result, error = None, e
+            # Settled before the caller is woken, so in_flight never drops below running
+            with self._lock:
+                self._running -= 1
+                self._in_flight[priority] -= 1
+            if error is None:
+                future.set_result(result)
+            else:
+                future.set_exception(error)
+
+    def queue_depths(self):
+        """Calls waiting for a thread, per priority class."""
+        return self._queue.depths()
+
+    def stats(self):
+        """Configured limits, current load and refused-call counters (totals and per priority class)."""
+        queues = self._queue.stats()
+        with self._lock:
+            in_flight = sum(self._in_flight.values())
+            return {
+                'workers': self.workers,
+                'max_pending': self.max_pending,
+                'capacity': self.capacity,
+                'critical_reserve': self.critical_reserve,
+                'queue_timeout_seconds': self.queue_timeout,
+                'in_flight': in_flight,
+                'running': self._running,
+                'queued': in_flight - self._running,
+                'rejected': sum(self._rejected.values()),
+                'expired': sum(self._expired.values()),
+                'priorities': {
+                    priority: {
+                        'in_flight': self._in_flight[priority],
+                        'rejected': self._rejected[priority],
+                        'expired': self._expired[priority],
+                        **queues[priority],
+                    }
+                    for priority in PRIORITIES
+                },
+            }
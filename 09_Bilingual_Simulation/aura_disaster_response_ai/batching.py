@@ -0,0 +1,135 @@
+import collections
+import threading
+import time
+from concurrent.futures import Future
+
+from scheduling import PRIORITY_ROUTINE, PriorityWorkQueue
+
+# Number of recent queueing delays kept for the percentiles in `stats()`
+_DELAY_SAMPLES = 2048
+
+
+class MicroBatcher:
+    """
+    Collects items submitted from many threads into small batches.
+
+    Everything already waiting when the worker takes the first item of a batch is
+    batched with it. A lone item is processed at once; when others were waiting too
+    (concurrent traffic) the batch stays open for `window_ms` to gather more. Up to
+    `max_batch_size` items are handed to `process_batch` in one call, on a single
+    worker thread, and items arriving while a batch is processed form the next one.
+    `process_batch(items)` must return one result per item, in order; each caller gets
+    its result through the Future returned by `submit`.
+
+    Items are queued by priority class (see scheduling.PriorityWorkQueue), so when more
+    is waiting than fits in one batch, critical items go first; an item that has waited
+    `max_wait_ms` is taken before anything newer.
+    """
+
+    def __init__(self, process_batch, window_ms=5, max_batch_size=32, name='micro-batcher', max_wait_ms=200):
+        self.process_batch = process_batch
+        self.window_seconds = window_ms / 1000
+        self.max_batch_size = max(1, max_batch_size)
+        self.name = name
+        self._queue = PriorityWorkQueue(max_wait_seconds=max_wait_ms / 1000)
+        self._worker = None
+        self._start_lock = threading.Lock()
+
+        self._stats_lock = threading.Lock()
+        self._batches = 0
+        self._items = 0
+        self._largest_batch = 0
+        self._batch_sizes = collections.Counter()
+        self._delays_ms = collections.deque(maxlen=_DELAY_SAMPLES)
+        self._total_delay_ms = 0.0
+
+    def _ensure_started(self):
+        # Started on first use rather than in __init__, so a process that forks after
+        # building the model (e.g. a pre-loading WSGI server) gets its own worker thread.
+        if self._worker is not None and self._worker.is_alive():
+            return
+        with self._start_lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._worker.start()
+
+    def submit(self, item, priority=PRIORITY_ROUTINE):
+        """Queues `item` for the next batch. Returns a Future resolving to its result."""
+        self._ensure_started()
+        future = Future()
+        self._queue.put((item, future, time.perf_counter()), priority)
+        return future
+
+    def _collect(self):
+        """
+        Blocks for the first item and takes whatever else is already queued. Only if that
+        found company does it wait for more until the window closes or the batch is full.
+        """
+        batch = [self._queue.get()]
+        while len(batch) < self.max_batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except TimeoutError:
+                break
+        if len(batch) == 1:
+            return batch
+        deadline = time.perf_counter() + self.window_seconds
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except TimeoutError:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            started = time.perf_counter()
+            self._record(len(batch), [(started - submitted) * 1000 for _, _, submitted in batch])
+            try:
+                results = self.process_batch([item for item, _, _ in batch])
+            except Exception as e:
+                for _, future, _ in batch:
+                    future.set_exception(e)
+                continue
+            for (_, future, _), result in zip(batch, results):
+                future.set_result(result)
+
+    def _record(self, batch_size, delays_ms):
+        with self._stats_lock:
+            self._batches += 1
+            self._items += batch_size
+            self._largest_batch = max(self._largest_batch, batch_size)
+            self._batch_sizes[batch_size] += 1
+            self._delays_ms.extend(delays_ms)
+            self._total_delay_ms += sum(delays_ms)
+
+    def queue_depths(self):
+        """Items waiting for a batch, per priority class."""
+        return self._queue.depths()
+
+    def stats(self):
+        """Batch-size and queueing-delay metrics since startup (delay percentiles over recent items)."""
+        with self._stats_lock:
+            delays = sorted(self._delays_ms)
+            batches, items = self._batches, self._items
+
+            def percentile(p):
+                return round(delays[min(len(delays) - 1, int(p * len(delays)))], 3) if delays else 0.0
+
+            return {
+                'window_ms': self.window_seconds * 1000,
+                'max_batch_size': self.max_batch_size,
+                'queued': self._queue.qsize(),
+                'priorities': self._queue.stats(),
+                'batches': batches,
+                'items': items,
+                'mean_batch_size': round(items / batches, 3) if batches else 0.0,
+                'largest_batch': self._largest_batch,
+                'batch_size_counts': {str(size): count for size, count in sorted(self._batch_sizes.items())},
+                'mean_queue_delay_ms': round(self._total_delay_ms / items, 3) if items else 0.0,
+                'p50_queue_delay_ms': percentile(0.50),
+                'p95_queue_delay_ms': percentile(0.95),
+                'max_queue_delay_ms': percentile(1.0),
+            }
@@ -0,0 +1,235 @@
+"""
+Latency benchmark for the paths through DisasterNLP.predict: exact and fuzzy hits
+in Tamil script and in romanized Tamil (Latin script), and the semantic fallback, on
+synthetic corpora scaled from the shipped dataset.
+
+    python benchmark.py                                  # 10^2 .. 10^4 commands
+    python benchmark.py --sizes 100 1000000 --queries 200
+    python benchmark.py --json results.json
+    python benchmark.py --save-baseline benchmark_baseline.json   # refresh the baseline
+    python benchmark.py --baseline other.json --threshold 0.25
+
+By default the deterministic stub encoder is used (no model download, runs offline)
+and the query cache and micro-batching are off, so every query pays for its tier.
+Pass --encoder torch to time the real model. Results are compared with --baseline
+(default: benchmark_baseline.json next to this script, skipped if its encoder differs):
+p50/p95 latencies that are more than --threshold and more than --min-slowdown-ms
+slower than the baseline are reported as regressions and the exit status is 1. The
+absolute floor keeps timer noise on sub-0.1 ms paths from counting as a regression.
+"""
+import argparse
+import copy
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+from logging_setup import configure_logging
+from transliteration import romanize
+
+PATHS = ('exact_tamil', 'fuzzy_tamil', 'exact_romanized', 'fuzzy_romanized', 'semantic')
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmark_baseline.json')
+# Slowdowns this small are timer noise on the sub-0.1 ms paths, whatever their ratio
+MIN_SLOWDOWN_MS = 0.05
+
+
+def generate_corpus(seed_data, size, seed=0):
+    """
+    Scales the nlp_disaster.json schema to `size` records. Each record is a copy of a
+    shipped command with a unique id and sector number appended to its English and
+    Tamil text, plus a landmark drawn from the corpus parameters.
+    """
+    rng = random.Random(seed)
+    landmarks = sorted({value for item in seed_data for value in item.get('parameters', {}).values()
+                        if isinstance(value, str)})
+    records = []
+    for i in range(size):
+        base = seed_data[i % len(seed_data)]
+        record = copy.deepcopy(base)
+        record['id'] = f'synthetic_{i:07d}'
+        variant = i // len(seed_data)
+        if variant:
+            landmark = rng.choice(landmarks)
+            record['english'] = f"{base['english'].rstrip('.')} at sector {variant} near {landmark}."
+            if base.get('tamil'):
+                record['tamil'] = f"{base['tamil'].rstrip('.')} பிரிவு {variant} {landmark}."
+        records.append(record)
+    return records
+
+
+def fuzzy_variant(text, rng):
+    """Drops one letter from the first half of `text`, so it only matches fuzzily."""
+    letters = [i for i, char in enumerate(text[:len(text) // 2]) if char.isalnum()]
+    i = rng.choice(letters)
+    return text[:i] + text[i + 1:]
+
+
+def build_queries(records, path, count, seed=0):
+    """Returns `count` queries that should be resolved by `path`."""
+    rng = random.Random(seed)
+    tamil = [record for record in records if record.get('tamil')]
+    queries = []
+    for _ in range(count):
+        if path == 'exact_tamil':
+            queries.append(rng.choice(tamil)['tamil'])
+        elif path == 'fuzzy_tamil':
+            queries.append(fuzzy_variant(rng.choice(tamil)['tamil'], rng))
+        elif path == 'exact_romanized':
+            queries.append(romanize(rng.choice(tamil)['tamil']))
+        elif path == 'fuzzy_romanized':
+            queries.append(fuzzy_variant(romanize(rng.choice(tamil)['tamil']), rng))
+        else:
+            english = rng.choice(records)['english']
+            queries.append(f"Please {english[0].lower()}{english[1:].rstrip('.')} immediately.")
+    return queries
+
+
+def percentile(sorted_values, p):
+    return sorted_values[min(len(sorted_values) - 1, int(p * len(sorted_values)))]
+
+
+def time_path(nlp, queries, warmup=5):
+    """Times nlp.predict on every query. Returns latency percentiles (ms) and throughput."""
+    for query in queries[:warmup]:
+        nlp.predict(query)
+    latencies = []
+    start = time.perf_counter()
+    for query in queries:
+        query_start = time.perf_counter()
+        nlp.predict(query)
+        latencies.append((time.perf_counter() - query_start) * 1000)
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        'p50_ms': round(percentile(latencies, 0.50), 4),
+        'p95_ms': round(percentile(latencies, 0.95), 4),
+        'p99_ms': round(percentile(latencies, 0.99), 4),
+        'mean_ms': round(statistics.mean(latencies), 4),
+        'throughput_qps': round(len(queries) / elapsed, 1),
+    }
+
+
+def tier_hit_rate(nlp, queries, path):
+    """Fraction of `queries` that the cascade actually resolves with tier `path`."""
+    matches = nlp.match_batch(queries)
+    return round(sum(1 for match in matches if match and match[1] == path) / len(queries), 4)
+
+
+def run(sizes, num_queries, work_dir):
+    from config import DATA_PATH
+    from nlp_model import DisasterNLP
+
+    with open(DATA_PATH, 'r', encoding='utf-8') as f:
+        seed_data = json.load(f)
+
+    results = []
+    for size in sizes:
+        data_path = os.path.join(work_dir, f'corpus_{size}.json')
+        with open(data_path, 'w', encoding='utf-8') as f:
+            json.dump(generate_corpus(seed_data, size), f, ensure_ascii=False)
+
+        print(f"Building DisasterNLP over {size} commands...", file=sys.stderr)
+        start = time.perf_counter()
+        nlp = DisasterNLP(data_path=data_path)
+        build_seconds = time.perf_counter() - start
+
+        records = nlp.data
+        for path in PATHS:
+            queries = build_queries(records, path, num_queries)
+            result = {'corpus_size': size, 'path': path, 'queries': num_queries,
+                      'build_seconds': round(build_seconds, 3)}
+            result['tier_hit_rate'] = tier_hit_rate(nlp, queries, path)
+            result.update(time_path(nlp, queries))
+            results.append(result)
+            print(f"{size:>8} {path:16} p50 {result['p50_ms']:8.3f} ms  p95 {result['p95_ms']:8.3f} ms  "
+                  f"p99 {result['p99_ms']:8.3f} ms  {result['throughput_qps']:>9} q/s  "
+                  f"(tier hit rate {result['tier_hit_rate']:.2f})", file=sys.stderr)
+        os.remove(data_path)
+    return results
+
+
+def compare(results, baseline, threshold, min_slowdown_ms=MIN_SLOWDOWN_MS):
+    """
+    Returns a list of regression messages for p50/p95 latencies above baseline * (1 + threshold)
+    that are also more than min_slowdown_ms slower than the baseline.
+    """
+    previous = {(row['corpus_size'], row['path']): row for row in baseline['results']}
+    regressions = []
+    for row in results:
+        old = previous.get((row['corpus_size'], row['path']))
+        if old is None:
+            continue
+        for metric in ('p50_ms', 'p95_ms'):
+            if row[metric] > max(old[metric] * (1 + threshold), old[metric] + min_slowdown_ms):
+                regressions.append(f"{row['path']} @ {row['corpus_size']}: {metric} {row[metric]} ms "
+                                   f"vs baseline {old[metric]} ms (+{row[metric] / old[metric] - 1:.0%})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1000, 10000], help='corpus sizes (commands)')
+    parser.add_argument('--queries', type=int, default=500, help='timed queries per path and size')
+    parser.add_argument('--encoder', default='stub', help='encoder backend (default: stub)')
+    parser.add_argument('--json', help='write the results to this file')
+    parser.add_argument('--baseline', default=BASELINE_PATH,
+                        help='compare against this earlier --json/--save-baseline file (default: the committed one)')
+    parser.add_argument('--no-baseline', action='store_true', help='skip the baseline comparison')
+    parser.add_argument('--threshold', type=float, default=0.2, help='allowed slowdown vs the baseline (0.2 = 20%%)')
+    parser.add_argument('--min-slowdown-ms', type=float, default=MIN_SLOWDOWN_MS,
+                        help=f'slowdowns up to this many ms are never regressions (default: {MIN_SLOWDOWN_MS})')
+    parser.add_argument('--save-baseline', help='write the results as the new baseline to this file')
+    parser.add_argument('--log-level', default='WARNING', help='log level of the app modules (default: WARNING)')
+    args = parser.parse_args()
+    configure_logging(args.log_level)
+
+    with tempfile.TemporaryDirectory(prefix='aura_benchmark_') as work_dir:
+        # Settings are read from the environment when config is first imported
+        os.environ['AURA_ENCODER_BACKEND'] = args.encoder
+        os.environ['AURA_QUERY_CACHE_SIZE'] = '0'
+        os.environ['AURA_SEMANTIC_BATCH_WINDOW_MS'] = '0'
+        os.environ['AURA_EMBEDDING_CACHE_DIR'] = os.path.join(work_dir, 'cache')
+        results = run(args.sizes, args.queries, work_dir)
+
+    report = {
+        'app': '09_Bilingual_Simulation',
+        'encoder': args.encoder,
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'cpu_count': os.cpu_count(),
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'results': results,
+    }
+    for path in (args.json, args.save_baseline):
+        if path:
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(report, f, indent=2)
+
+    if args.no_baseline or not args.baseline:
+        return
+    if args.baseline == BASELINE_PATH and not os.path.exists(BASELINE_PATH):
+        print(f"\nNo baseline at {BASELINE_PATH}; record one with --save-baseline.")
+        return
+    with open(args.baseline, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    if baseline.get('encoder') != args.encoder:
+        print(f"\nBaseline {args.baseline} was recorded with the '{baseline.get('encoder')}' encoder; "
+              f"not comparing.")
+        return
+    regressions = compare(results, baseline, args.threshold, args.min_slowdown_ms)
+    if regressions:
+        print(f"\n{len(regressions)} latency regression(s) above {args.threshold:.0%} "
+              f"and {args.min_slowdown_ms} ms:")
+        for message in regressions:
+            print(f"  {message}")
+        sys.exit(1)
+    print(f"\nNo latency regressions above {args.threshold:.0%} and {args.min_slowdown_ms} ms "
+          f"against {args.baseline}.")
+
+
+if __name__ == '__main__':
+    main()
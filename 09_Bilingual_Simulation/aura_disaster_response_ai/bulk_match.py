@@ -0,0 +1,255 @@
+"""
+Re-scores a file of logged utterances offline, without the Flask app.
+
+    python bulk_match.py utterances.csv matched.csv
+    python bulk_match.py logs.jsonl matched.parquet --text-column transcript --workers 8
+    python bulk_match.py logs.parquet matched.jsonl --data path/to/updated_corpus.json
+
+The input can be CSV, JSONL or Parquet (chosen by file extension; Parquet needs
+pyarrow). Every input row is written back with four extra columns: match_id,
+match_intent, match_tier and match_score (the fuzz ratio, 0-100, for the Tamil and
+romanized Tamil tiers and the cosine similarity for the semantic tier). Rows are read
+and written in chunks, and each worker process loads its own DisasterNLP and runs the
+tier cascade on a whole chunk at once (batched fuzzy scoring and one encode call per
+chunk), so memory use does not grow with the file.
+"""
+import argparse
+import collections
+import csv
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from config import DATA_PATH
+from nlp_model import TIER_EXACT_TAMIL, TIER_EXACT_ROMANIZED, TIER_FUZZY_TAMIL, TIER_FUZZY_ROMANIZED, TIER_SEMANTIC
+
+FORMATS = ('csv', 'jsonl', 'parquet')
+
+# The DisasterNLP instance of the current (worker) process
+_nlp = None
+
+
+def file_format(path):
+    extension = os.path.splitext(path)[1].lower().lstrip('.')
+    fmt = {'ndjson': 'jsonl', 'pq': 'parquet'}.get(extension, extension)
+    if fmt not in FORMATS:
+        raise ValueError(f"Cannot tell the format of '{path}' (expected .csv, .jsonl or .parquet).")
+    return fmt
+
+
+def read_chunks(path, chunk_size):
+    """Yields lists of row dicts from a CSV, JSONL or Parquet file."""
+    fmt = file_format(path)
+    if fmt == 'parquet':
+        import pyarrow.parquet as pq
+
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+            yield batch.to_pylist()
+        return
+
+    with open(path, newline='', encoding='utf-8') as f:
+        rows = csv.DictReader(f) if fmt == 'csv' else (json.loads(line) for line in f if line.strip())
+        chunk = []
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) == chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+
+def check_text_column(path, text_column, chunk_size):
+    """Raises ValueError unless the first chunk of the input has a `text_column` column."""
+    first_chunk = next(read_chunks(path, chunk_size), [])
+    columns = set().union(*(row.keys() for row in first_chunk))
+    if first_chunk and text_column not in columns:
+        raise ValueError(f"'{path}' has no column '{text_column}' (columns: {', '.join(sorted(columns))}); "
+                         f"pick the utterance column with --text-column.")
+
+
+def match_fields():
+    """Arrow fields of the columns match_chunk adds, declared so a chunk without any match cannot type them as null."""
+    import pyarrow as pa
+
+    return [
+        pa.field('match_id', pa.string()),
+        pa.field('match_intent', pa.string()),
+        pa.field('match_tier', pa.string()),
+        pa.field('match_score', pa.float64()),
+    ]
+
+
+def parquet_schema(rows, input_schema=None):
+    """
+    Output schema: the input columns (from the input Parquet schema if there is one,
+    otherwise inferred from `rows`, with all-null columns typed as strings) followed
+    by the match columns.
+    """
+    import pyarrow as pa
+
+    matches = match_fields()
+    names = {field.name for field in matches}
+    if input_schema is None:
+        input_schema = pa.Table.from_pylist(rows).schema
+    fields = [
+        field.with_type(pa.string()) if pa.types.is_null(field.type) else field
+        for field in input_schema if field.name not in names
+    ]
+    return pa.schema(fields + matches)
+
+
+class ChunkWriter:
+    """Writes row dicts to a CSV, JSONL or Parquet file, chunk by chunk."""
+
+    def __init__(self, path, input_schema=None):
+        self.path = path
+        self.format = file_format(path)
+        self.input_schema = input_schema
+        self._file = None
+        self._writer = None
+
+    def write(self, rows):
+        if not rows:
+            return
+        if self.format == 'parquet':
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            if self._writer is None:
+                self._writer = pq.ParquetWriter(self.path, parquet_schema(rows, self.input_schema))
+            self._writer.write_table(pa.Table.from_pylist(rows, schema=self._writer.schema))
+            return
+        if self._file is None:
+            self._file = open(self.path, 'w', newline='', encoding='utf-8')
+            if self.format == 'csv':
+                self._writer = csv.DictWriter(self._file, fieldnames=list(rows[0].keys()), extrasaction='ignore')
+                self._writer.writeheader()
+        if self.format == 'csv':
+            self._writer.writerows(rows)
+        else:
+            self._file.writelines(json.dumps(row, ensure_ascii=False, default=str) + '\n' for row in rows)
+
+    def close(self):
+        if self.format == 'parquet' and self._writer is not None:
+            self._writer.close()
+        if self._file is not None:
+            self._file.close()
+
+
+def init_worker(data_path, torch_threads):
+    """Loads the model and corpus once per worker process."""
+    global _nlp
+    import torch
+    from nlp_model import DisasterNLP
+
+    torch.set_num_threads(torch_threads)
+    _nlp = DisasterNLP(data_path=data_path)
+
+
+def match_chunk(rows, text_column):
+    """Matches one chunk of rows and returns them with the match columns added."""
+    texts = [row.get(text_column) or '' for row in rows]
+    matched = []
+    for row, match in zip(rows, _nlp.match_batch([str(text) for text in texts])):
+        record, tier, score = match if match is not None else ({}, None, None)
+        matched.append({
+            **row,
+            'match_id': record.get('id'),
+            'match_intent': record.get('intent'),
+            'match_tier': tier,
+            'match_score': None if score is None else round(score, 4),
+        })
+    return matched
+
+
+def run(args):
+    """
+    Streams the input through the workers and returns the summary dict. The elapsed
+    time includes loading the model in the workers.
+    """
+    chunks = read_chunks(args.input, args.chunk_size)
+    input_schema = None
+    if file_format(args.input) == 'parquet':
+        import pyarrow.parquet as pq
+
+        input_schema = pq.ParquetFile(args.input).schema_arrow
+    writer = ChunkWriter(args.output, input_schema)
+    tiers = collections.Counter()
+    total = 0
+    torch_threads = max(1, (os.cpu_count() or 1) // args.workers)
+
+    def record(rows):
+        nonlocal total
+        writer.write(rows)
+        total += len(rows)
+        tiers.update(row['match_tier'] or 'empty' for row in rows)
+        print(f"{total} utterances matched...", file=sys.stderr)
+
+    start = time.perf_counter()
+    try:
+        if args.workers == 1:
+            init_worker(args.data, torch_threads)
+            for chunk in chunks:
+                record(match_chunk(chunk, args.text_column))
+        else:
+            with ProcessPoolExecutor(args.workers, initializer=init_worker,
+                                     initargs=(args.data, torch_threads)) as pool:
+                # Keep only a few chunks in flight so the file is never read ahead in full
+                pending = collections.deque()
+                for chunk in chunks:
+                    pending.append(pool.submit(match_chunk, chunk, args.text_column))
+                    if len(pending) >= args.workers * 2:
+                        record(pending.popleft().result())
+                while pending:
+                    record(pending.popleft().result())
+    finally:
+        writer.close()
+
+    seconds = time.perf_counter() - start
+    return {
+        'utterances': total,
+        'seconds': round(seconds, 3),
+        'utterances_per_second': round(total / seconds, 1) if seconds > 0 else 0.0,
+        'workers': args.workers,
+        'tiers': {
+            tier: {'count': tiers[tier], 'share': round(tiers[tier] / total, 4) if total else 0.0}
+            for tier in (TIER_EXACT_TAMIL, TIER_EXACT_ROMANIZED, TIER_FUZZY_TAMIL, TIER_FUZZY_ROMANIZED,
+                         TIER_SEMANTIC, 'empty')
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('input', help='CSV, JSONL or Parquet file of utterances')
+    parser.add_argument('output', help='output file (.csv, .jsonl or .parquet)')
+    parser.add_argument('--text-column', default='text', help='column holding the utterance (default: text)')
+    parser.add_argument('--data', default=DATA_PATH, help='command corpus to match against')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='worker processes')
+    parser.add_argument('--chunk-size', type=int, default=1024, help='utterances per batch')
+    parser.add_argument('--summary-json', help='also write the throughput summary to this file')
+    args = parser.parse_args()
+    args.workers = max(1, args.workers)
+
+    try:
+        file_format(args.input)
+        file_format(args.output)
+        check_text_column(args.input, args.text_column, args.chunk_size)
+    except ValueError as e:
+        parser.error(str(e))
+
+    summary = run(args)
+    print(f"\nMatched {summary['utterances']} utterances in {summary['seconds']}s including model load "
+          f"({summary['utterances_per_second']} utterances/s, {summary['workers']} workers)")
+    for tier, counts in summary['tiers'].items():
+        print(f"  {tier:16} {counts['count']:>9}  {counts['share']:.1%}")
+    if args.summary_json:
+        with open(args.summary_json, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,137 @@
+import os
+
+# --- Configuration ---
+# Every setting can be overridden with an environment variable of the same
+# name prefixed with AURA_, e.g. AURA_MODEL_NAME=... python app.py
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Sentence Transformer used for the semantic tier. Pin MODEL_REVISION to a
+# commit hash in production so cached embeddings are tied to exact weights.
+MODEL_NAME = os.environ.get('AURA_MODEL_NAME', 'paraphrase-multilingual-MiniLM-L12-v2')
+MODEL_REVISION = os.environ.get('AURA_MODEL_REVISION') or None
+
+# Bilingual command corpus.
+DATA_PATH = os.environ.get('AURA_DATA_PATH', os.path.join(BASE_DIR, 'data', 'nlp_disaster.json'))
+
+# Directory holding the content-addressed corpus embedding cache.
+EMBEDDING_CACHE_DIR = os.environ.get('AURA_EMBEDDING_CACHE_DIR', os.path.join(BASE_DIR, 'cache'))
+# Cache entries kept on disk (most recently used first); older ones are deleted
+# after every write, so repeated corpus reloads do not fill the disk.
+EMBEDDING_CACHE_KEEP = int(os.environ.get('AURA_EMBEDDING_CACHE_KEEP', '3'))
+
+# Upper bound on the number of commands accepted by /process_commands in one request.
+MAX_BATCH_SIZE = int(os.environ.get('AURA_MAX_BATCH_SIZE', '256'))
+
+# /process_stream: lines matched per predict_batch call (at most) and the longest
+# accepted line; longer lines are skipped and reported as errors.
+STREAM_BATCH_SIZE = int(os.environ.get('AURA_STREAM_BATCH_SIZE', '32'))
+STREAM_MAX_LINE_BYTES = int(os.environ.get('AURA_STREAM_MAX_LINE_BYTES', '8192'))
+
+# /process_plan: a chained order is split into clauses at conjunctions and sequencing
+# words. A split needs at least PLAN_MIN_CLAUSE_WORDS words on both sides; clauses
+# beyond PLAN_MAX_CLAUSES are joined into the last one.
+PLAN_MIN_CLAUSE_WORDS = int(os.environ.get('AURA_PLAN_MIN_CLAUSE_WORDS', '3'))
+PLAN_MAX_CLAUSES = int(os.environ.get('AURA_PLAN_MAX_CLAUSES', '8'))
+
+# Semantic tier search strategy. Corpora with at least ANN_MIN_CORPUS_SIZE sentences
+# switch from exact brute-force search to an approximate IVF index.
+ANN_MIN_CORPUS_SIZE = int(os.environ.get('AURA_ANN_MIN_CORPUS_SIZE', '50000'))
+IVF_NLIST = int(os.environ.get('AURA_IVF_NLIST', '0'))  # 0 picks ~4*sqrt(corpus size)
+IVF_NPROBE = int(os.environ.get('AURA_IVF_NPROBE', '8'))
+# Number of synthetic queries used to report the IVF index's recall@1 at build time.
+ANN_RECALL_SAMPLE = int(os.environ.get('AURA_ANN_RECALL_SAMPLE', '256'))
+# Two-stage intent routing (0 disables it): each query is compared with the centroids of
+# every intent first and only the sentences of its INTENT_TOP_K best intents are scored.
+# Queries whose intent margin is below INTENT_MIN_MARGIN (cosine) fall back to full
+# search. Takes precedence over the IVF index. See intent_report.py for the trade-off.
+INTENT_TOP_K = int(os.environ.get('AURA_INTENT_TOP_K', '0'))
+INTENT_CENTROIDS = int(os.environ.get('AURA_INTENT_CENTROIDS', '1'))  # per intent
+INTENT_MIN_MARGIN = float(os.environ.get('AURA_INTENT_MIN_MARGIN', '0.05'))
+
+# LRU/TTL cache of fuzzy and semantic results keyed on the normalized query (0 disables it).
+QUERY_CACHE_SIZE = int(os.environ.get('AURA_QUERY_CACHE_SIZE', '4096'))
+QUERY_CACHE_TTL_SECONDS = float(os.environ.get('AURA_QUERY_CACHE_TTL_SECONDS', '3600'))
+
+# Concurrent identical queries that miss the cache (e.g. one canned order sent by many
+# consoles at once) are matched once and share the result. Set to 0 to disable.
+SINGLE_FLIGHT = os.environ.get('AURA_SINGLE_FLIGHT', '1').lower() in ('1', 'true', 'yes')
+
+# Micro-batching of the semantic tier: single queries from concurrent requests that
+# arrive within SEMANTIC_BATCH_WINDOW_MS of each other are encoded in one forward pass,
+# up to SEMANTIC_BATCH_MAX_SIZE per batch. A query that arrives alone is encoded at once,
+# without waiting for the window. 0 disables batching (each request encodes alone).
+SEMANTIC_BATCH_WINDOW_MS = float(os.environ.get('AURA_SEMANTIC_BATCH_WINDOW_MS', '5'))
+SEMANTIC_BATCH_MAX_SIZE = int(os.environ.get('AURA_SEMANTIC_BATCH_MAX_SIZE', '32'))
+
+# Hot corpus reload. POST /admin/reload always works; set a positive interval to also
+# poll the corpus file for changes. When ADMIN_TOKEN is set, /admin/* requests must
+# send it in the X-Admin-Token header; without it only loopback callers are allowed.
+CORPUS_WATCH_INTERVAL_SECONDS = float(os.environ.get('AURA_CORPUS_WATCH_INTERVAL_SECONDS', '0'))
+ADMIN_TOKEN = os.environ.get('AURA_ADMIN_TOKEN') or None
+
+# Storage of the searched corpus vectors: 'float32', 'float16' (half the memory) or
+# 'int8' (a quarter, with one scale per vector). See precision_report.py for the
+# accuracy/latency trade-off on your corpus.
+EMBEDDING_PRECISION = os.environ.get('AURA_EMBEDDING_PRECISION', 'float32')
+
+# Backend used to encode queries: 'torch' (reference), 'torch-int8' (dynamic int8
+# quantization), 'onnx' (exported graph, needs onnxruntime) or 'stub' (deterministic
+# hashed bag of words for offline benchmarks; it replaces the model entirely). Corpus
+# embeddings are otherwise always computed with the reference model. At startup a sample of the corpus is encoded
+# with both and a warning is printed if any cosine similarity falls below ENCODER_MIN_COSINE.
+ENCODER_BACKEND = os.environ.get('AURA_ENCODER_BACKEND', 'torch')
+ENCODER_DRIFT_SAMPLE = int(os.environ.get('AURA_ENCODER_DRIFT_SAMPLE', '32'))
+ENCODER_MIN_COSINE = float(os.environ.get('AURA_ENCODER_MIN_COSINE', '0.98'))
+
+# Startup. The corpus and the exact/fuzzy Tamil tiers are ready within a second; the
+# transformer and corpus embeddings load on a background thread. Until then, a query
+# that needs the semantic tier waits up to SEMANTIC_WAIT_SECONDS and then gets a
+# "warming up" (503) response.
+SEMANTIC_WAIT_SECONDS = float(os.environ.get('AURA_SEMANTIC_WAIT_SECONDS', '2'))
+
+# Production serving (python serve.py, POSIX only): the model and corpus are loaded once
+# in the master process and SERVE_WORKERS worker processes are forked from it, each with
+# SERVE_THREADS request threads and TORCH_THREADS_PER_WORKER intra-op threads
+# (0 splits the CPU cores evenly across the workers).
+SERVE_BIND = os.environ.get('AURA_SERVE_BIND', '0.0.0.0:5000')
+SERVE_WORKERS = int(os.environ.get('AURA_SERVE_WORKERS', str(os.cpu_count() or 1)))
+SERVE_THREADS = int(os.environ.get('AURA_SERVE_THREADS', '8'))
+TORCH_THREADS_PER_WORKER = int(os.environ.get('AURA_TORCH_THREADS_PER_WORKER', '0'))
+
+# Asyncio serving (python asgi.py, or serve.py with SERVE_ASYNC=1): matching runs on
+# MATCH_WORKERS threads per process and at most MATCH_MAX_PENDING more requests wait for
+# one. Requests beyond that, or still waiting after MATCH_QUEUE_TIMEOUT_SECONDS, get a
+# 429 with Retry-After: OVERLOAD_RETRY_AFTER_SECONDS instead of queueing without bound.
+# The bound covers all priority classes together; its last MATCH_CRITICAL_RESERVE slots
+# only admit critical requests.
+SERVE_ASYNC = os.environ.get('AURA_SERVE_ASYNC', '0').lower() in ('1', 'true', 'yes')
+MATCH_WORKERS = int(os.environ.get('AURA_MATCH_WORKERS', '4'))
+MATCH_MAX_PENDING = int(os.environ.get('AURA_MATCH_MAX_PENDING', '64'))
+MATCH_QUEUE_TIMEOUT_SECONDS = float(os.environ.get('AURA_MATCH_QUEUE_TIMEOUT_SECONDS', '2'))
+MATCH_CRITICAL_RESERVE = int(os.environ.get('AURA_MATCH_CRITICAL_RESERVE', '8'))
+OVERLOAD_RETRY_AFTER_SECONDS = int(os.environ.get('AURA_OVERLOAD_RETRY_AFTER_SECONDS', '1'))
+
+# Push channel (/ws, asyncio server only): consoles submit commands over a WebSocket and
+# every console of the same operation receives the results. At most WS_MAX_CONNECTIONS
+# per process; a console with WS_SEND_QUEUE_SIZE undelivered messages is disconnected.
+WS_MAX_CONNECTIONS = int(os.environ.get('AURA_WS_MAX_CONNECTIONS', '1000'))
+WS_SEND_QUEUE_SIZE = int(os.environ.get('AURA_WS_SEND_QUEUE_SIZE', '64'))
+
+# Priority scheduling: requests from operator consoles, and orders the exact tiers or the
+# query cache already map to a safety_critical command, are served before routine ones
+# by the matching threads and the semantic micro-batcher. A console proves who it is with
+# a secret token (X-Operator-Token header, or ?token= on /ws); PRIORITY_CONSOLE_TOKENS maps
+# each token to its console, from AURA_PRIORITY_CONSOLE_TOKENS="north:<token>,south:<token>".
+# Anything that has waited PRIORITY_MAX_WAIT_MS is served next regardless of its class.
+PRIORITY_CONSOLE_TOKENS = {
+    token.strip(): console.strip()
+    for console, _, token in (
+        entry.partition(':') for entry in os.environ.get('AURA_PRIORITY_CONSOLE_TOKENS', '').split(','))
+    if console.strip() and token.strip()
+}
+PRIORITY_MAX_WAIT_MS = float(os.environ.get('AURA_PRIORITY_MAX_WAIT_MS', '200'))
+
+# Logging. Records go through a queue to a background thread that writes them to stderr.
+# Per-request lines (matched tier, score and command id) are logged at DEBUG.
+LOG_LEVEL = os.environ.get('AURA_LOG_LEVEL', 'INFO')
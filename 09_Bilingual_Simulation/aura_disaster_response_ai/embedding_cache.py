@@ -0,0 +1,142 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+import tempfile
+import threading
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Bump this whenever the layout or meaning of the cached arrays changes.
+CACHE_FORMAT_VERSION = 1
+
+# Entry directories are named after a SHA-256 key; anything else in the cache
+# directory (the ONNX export, temporary directories) is never pruned.
+ENTRY_NAME = re.compile(r'[0-9a-f]{64}')
+
+
+def sha256_bytes(data: bytes) -> str:
+    """Returns the hex SHA-256 digest of a byte string."""
+    return hashlib.sha256(data).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Content-addressed on-disk cache for the bilingual corpus embeddings.
+
+    Each entry lives in its own directory named after a key derived from the
+    model name, the model revision and a hash of the dataset file, so a changed
+    corpus or model simply misses the cache. Arrays are stored as .npy files and
+    loaded memory-mapped, which makes a warm start independent of corpus size.
+
+    Only the `keep` most recently written or loaded entries are kept; older ones
+    are deleted after every save, so frequent corpus reloads do not grow the
+    cache without bound.
+    """
+
+    EMBEDDINGS_FILE = 'embeddings.npy'
+    INDEX_MAP_FILE = 'index_map.npy'
+    META_FILE = 'meta.json'
+
+    def __init__(self, cache_dir, keep=3):
+        self.cache_dir = cache_dir
+        self.keep = max(1, keep)
+        self._write_lock = threading.Lock()
+
+    def make_key(self, model_name, model_revision, data_hash):
+        """Builds the cache key for a (model, revision, dataset) combination."""
+        parts = [
+            f"v{CACHE_FORMAT_VERSION}",
+            model_name,
+            model_revision or 'default',
+            data_hash,
+        ]
+        return sha256_bytes('\n'.join(parts).encode('utf-8'))
+
+    def _entry_dir(self, key):
+        return os.path.join(self.cache_dir, key)
+
+    def load(self, key):
+        """
+        Returns (embeddings, index_map) for a cache key, or None on a miss.
+        Embeddings are mapped copy-on-write, so they are never read eagerly and
+        the file on disk is never modified.
+        """
+        entry_dir = self._entry_dir(key)
+        try:
+            embeddings = np.load(os.path.join(entry_dir, self.EMBEDDINGS_FILE), mmap_mode='c')
+            index_map = np.load(os.path.join(entry_dir, self.INDEX_MAP_FILE), mmap_mode='r')
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning("Ignoring unreadable embedding cache entry '%s': %s", entry_dir, e)
+            return None
+
+        if embeddings.ndim != 2 or embeddings.dtype != np.float32 or len(index_map) != len(embeddings):
+            logger.warning("Ignoring inconsistent embedding cache entry '%s'.", entry_dir)
+            return None
+        # Marks the entry as recently used for prune()
+        try:
+            os.utime(entry_dir)
+        except OSError:
+            pass
+        return embeddings, index_map
+
+    def save(self, key, embeddings, index_map, meta=None):
+        """
+        Writes a cache entry and prunes old ones. The entry is assembled in a
+        temporary directory and renamed into place, so readers never observe a
+        half-written entry. Returns True if the entry was written.
+        """
+        with self._write_lock:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp_dir = tempfile.mkdtemp(prefix='.tmp-', dir=self.cache_dir)
+            try:
+                np.save(os.path.join(tmp_dir, self.EMBEDDINGS_FILE),
+                        np.ascontiguousarray(embeddings, dtype=np.float32))
+                np.save(os.path.join(tmp_dir, self.INDEX_MAP_FILE), np.asarray(index_map, dtype=np.int32))
+                with open(os.path.join(tmp_dir, self.META_FILE), 'w', encoding='utf-8') as f:
+                    json.dump(meta or {}, f, indent=2)
+                os.replace(tmp_dir, self._entry_dir(key))
+            except OSError as e:
+                # Another process may have written the same entry first; either way
+                # the cache is only an optimization, so never fail the caller.
+                logger.warning("Could not write embedding cache entry: %s", e)
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+                return False
+            self.prune(key)
+            return True
+
+    def save_in_background(self, key, embeddings, index_map, meta=None):
+        """Runs save() on a daemon thread; `embeddings` must not be modified afterwards."""
+        thread = threading.Thread(target=self.save, args=(key, embeddings, index_map, meta),
+                                  name='embedding-cache-writer', daemon=True)
+        thread.start()
+        return thread
+
+    def prune(self, active_key=None):
+        """
+        Deletes all but the `keep` most recently used entries, never `active_key`.
+        Processes that still map a deleted entry keep reading it until they unmap it.
+        """
+        try:
+            names = [name for name in os.listdir(self.cache_dir) if ENTRY_NAME.fullmatch(name)]
+        except OSError:
+            return
+        entries = []
+        for name in names:
+            try:
+                entries.append((os.stat(self._entry_dir(name)).st_mtime, name))
+            except OSError:
+                continue  # deleted concurrently
+        entries.sort(reverse=True)
+        keep = {name for _, name in entries[:self.keep]}
+        keep.add(active_key)
+        for _, name in entries:
+            if name not in keep:
+                logger.info("Pruning embedding cache entry %s.", name[:12])
+                shutil.rmtree(self._entry_dir(name), ignore_errors=True)
@@ -0,0 +1,242 @@
+"""
+Pluggable CPU backends for encoding queries.
+
+    torch       eager PyTorch in full precision (the reference model)
+    torch-int8  PyTorch dynamic int8 quantization of every Linear layer
+    onnx        the transformer exported once to an ONNX graph and run with onnxruntime
+                (optional dependency: pip install onnxruntime)
+    stub        deterministic hashed bag of words, no model at all (offline benchmarks);
+                it also replaces the reference model for the corpus embeddings
+
+Every backend reuses the reference model's tokenizer and pooling and returns
+L2-normalized float32 vectors, so query embeddings stay comparable with the corpus
+embeddings, which are always computed with the reference model.
+
+Check how far a backend drifts from the reference on the whole dataset with:
+
+    python encoders.py --backend torch-int8
+"""
+import copy
+import hashlib
+import inspect
+import logging
+import os
+import re
+import zlib
+
+import numpy as np
+import torch
+
+ENCODER_BACKENDS = ('torch', 'torch-int8', 'onnx', 'stub')
+
+logger = logging.getLogger(__name__)
+
+
+def _normalize(embeddings):
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    return embeddings / np.maximum(norms, 1e-12)
+
+
+class TorchEncoder:
+    """Eager PyTorch encoder wrapping a SentenceTransformer."""
+
+    name = 'torch'
+
+    def __init__(self, model):
+        self.model = model
+
+    def get_sentence_embedding_dimension(self):
+        return self.model.get_sentence_embedding_dimension()
+
+    def encode(self, sentences, batch_size=32):
+        """Returns L2-normalized float32 embeddings, one row per sentence."""
+        return self.model.encode(
+            sentences,
+            batch_size=batch_size,
+            convert_to_numpy=True,
+            normalize_embeddings=True,
+        ).astype(np.float32)
+
+
+class TorchInt8Encoder(TorchEncoder):
+    """
+    Dynamic int8 quantization: Linear weights are stored as int8 and activations are
+    quantized on the fly, which reduces the memory and CPU time of the transformer
+    layers. The reference model is copied, so it stays available in full precision.
+    """
+
+    name = 'torch-int8'
+
+    def __init__(self, model):
+        quantized = torch.quantization.quantize_dynamic(copy.deepcopy(model).cpu(), {torch.nn.Linear}, dtype=torch.qint8)
+        super().__init__(quantized)
+
+
+class _TransformerGraph(torch.nn.Module):
+    """Exposes a Hugging Face model as a positional-input module returning token embeddings."""
+
+    def __init__(self, auto_model, input_names):
+        super().__init__()
+        self.auto_model = auto_model
+        self.input_names = input_names
+
+    def forward(self, *inputs):
+        return self.auto_model(**dict(zip(self.input_names, inputs)), return_dict=False)[0]
+
+
+class OnnxEncoder:
+    """
+    Runs the transformer as an exported ONNX graph with onnxruntime. The export happens
+    once per model and is cached in `export_dir`; tokenization and the model's own
+    pooling (and any Dense/Normalize modules) still run through sentence-transformers.
+    """
+
+    name = 'onnx'
+
+    def __init__(self, model, export_dir, model_key):
+        try:
+            import onnxruntime
+        except ImportError as e:
+            raise ImportError("The 'onnx' encoder backend needs onnxruntime: pip install onnxruntime") from e
+
+        self.model = model
+        self.transformer = model[0]
+        self.post_modules = list(model)[1:]
+        sample = self.model.tokenize(['warm up'])
+        self.input_names = list(sample.keys())
+
+        os.makedirs(export_dir, exist_ok=True)
+        graph_path = os.path.join(export_dir, hashlib.sha256(model_key.encode('utf-8')).hexdigest()[:16] + '.onnx')
+        if not os.path.exists(graph_path):
+            self._export(graph_path, sample)
+
+        options = onnxruntime.SessionOptions()
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = onnxruntime.InferenceSession(graph_path, options, providers=['CPUExecutionProvider'])
+
+    def _export(self, graph_path, sample):
+        logger.info("Exporting encoder to ONNX (%s)...", graph_path)
+        graph = _TransformerGraph(copy.deepcopy(self.transformer.auto_model).cpu().eval(), self.input_names)
+        dynamic_axes = {name: {0: 'batch', 1: 'sequence'} for name in self.input_names}
+        dynamic_axes['token_embeddings'] = {0: 'batch', 1: 'sequence'}
+        export_options = {}
+        if 'dynamo' in inspect.signature(torch.onnx.export).parameters:
+            # Newer torch defaults to the dynamo exporter; the TorchScript one has no extra dependencies
+            export_options['dynamo'] = False
+        tmp_path = graph_path + '.tmp'
+        with torch.no_grad():
+            torch.onnx.export(
+                graph,
+                tuple(sample[name] for name in self.input_names),
+                tmp_path,
+                input_names=self.input_names,
+                output_names=['token_embeddings'],
+                dynamic_axes=dynamic_axes,
+                opset_version=14,
+                **export_options,
+            )
+        os.replace(tmp_path, graph_path)
+
+    def get_sentence_embedding_dimension(self):
+        return self.model.get_sentence_embedding_dimension()
+
+    def encode(self, sentences, batch_size=32):
+        if isinstance(sentences, str):
+            sentences = [sentences]
+        chunks = []
+        for start in range(0, len(sentences), batch_size):
+            features = self.model.tokenize(sentences[start:start + batch_size])
+            inputs = {name: features[name].numpy() for name in self.input_names}
+            token_embeddings = self.session.run(['token_embeddings'], inputs)[0]
+            features = {**features, 'token_embeddings': torch.from_numpy(token_embeddings)}
+            with torch.no_grad():
+                for module in self.post_modules:
+                    features = module(features)
+            chunks.append(features['sentence_embedding'].numpy())
+        if not chunks:
+            return np.zeros((0, self.get_sentence_embedding_dimension()), dtype=np.float32)
+        return _normalize(np.concatenate(chunks))
+
+
+class StubEncoder:
+    """
+    Deterministic, model-free encoder: every word and word bigram is hashed (crc32) into
+    one of `dimension` signed buckets. Texts that share words get similar vectors, which
+    is enough to exercise and time the search path offline. Not a language model.
+    """
+
+    name = 'stub'
+
+    def __init__(self, dimension=384):
+        self.dimension = dimension
+
+    def get_sentence_embedding_dimension(self):
+        return self.dimension
+
+    def encode(self, sentences, batch_size=32, **kwargs):
+        """Returns L2-normalized float32 embeddings. Accepts (and ignores) SentenceTransformer options."""
+        if isinstance(sentences, str):
+            sentences = [sentences]
+        rows, cols, signs = [], [], []
+        for row, sentence in enumerate(sentences):
+            words = re.findall(r'\w+', sentence.casefold())
+            for feature in words + [f'{a} {b}' for a, b in zip(words, words[1:])]:
+                h = zlib.crc32(feature.encode('utf-8'))
+                rows.append(row)
+                cols.append(h % self.dimension)
+                signs.append(1.0 if h & 0x80000000 else -1.0)
+        embeddings = np.zeros((len(sentences), self.dimension), dtype=np.float32)
+        np.add.at(embeddings, (np.asarray(rows, dtype=np.int64), np.asarray(cols, dtype=np.int64)),
+                  np.asarray(signs, dtype=np.float32))
+        return _normalize(embeddings)
+
+
+def build_encoder(backend, model, export_dir=None, model_key=''):
+    """Returns the query encoder for `backend`, built around the reference SentenceTransformer."""
+    if backend == 'torch':
+        return TorchEncoder(model)
+    if backend == 'torch-int8':
+        return TorchInt8Encoder(model)
+    if backend == 'onnx':
+        return OnnxEncoder(model, export_dir, model_key)
+    if backend == 'stub':
+        return model if isinstance(model, StubEncoder) else StubEncoder()
+    raise ValueError(f"Unknown encoder backend '{backend}' (expected one of {', '.join(ENCODER_BACKENDS)}).")
+
+
+def measure_drift(encoder, reference, sentences, batch_size=32):
+    """
+    Cosine similarity between `encoder` and `reference` embeddings of the same sentences.
+    Returns {'mean': ..., 'min': ..., 'count': ...}; 1.0 means identical directions.
+    """
+    if not sentences:
+        return {'mean': 1.0, 'min': 1.0, 'count': 0}
+    cosines = np.sum(encoder.encode(sentences, batch_size) * reference.encode(sentences, batch_size), axis=1)
+    return {'mean': float(np.mean(cosines)), 'min': float(np.min(cosines)), 'count': len(sentences)}
+
+
+if __name__ == '__main__':
+    import argparse
+    import time
+
+    from nlp_model import DisasterNLP
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--backend', choices=ENCODER_BACKENDS, required=True)
+    args = parser.parse_args()
+
+    nlp = DisasterNLP()
+    sentences = list(nlp.bilingual_corpus) if hasattr(nlp, 'bilingual_corpus') else [item['english'] for item in nlp.data]
+    reference = TorchEncoder(nlp.model)
+    encoder = nlp.query_encoder if nlp.query_encoder.name == args.backend else build_encoder(
+        args.backend, nlp.model, nlp.onnx_export_dir, nlp.model_key)
+
+    drift = measure_drift(encoder, reference, sentences)
+    print(f"Cosine vs reference over {drift['count']} sentences: mean {drift['mean']:.5f}, min {drift['min']:.5f}")
+    for name, candidate in (('torch', reference), (args.backend, encoder)):
+        start = time.perf_counter()
+        for sentence in sentences[:64]:
+            candidate.encode([sentence])
+        per_query_ms = (time.perf_counter() - start) * 1000 / min(64, len(sentences))
+        print(f"{name}: {per_query_ms:.2f} ms per single-sentence encode")
@@ -0,0 +1,142 @@
+from collections import Counter
+
+import numpy as np
+from rapidfuzz import process, fuzz
+
+
+def _bigrams(text):
+    """Counts the character bigrams of a string."""
+    return Counter(text[i:i + 2] for i in range(len(text) - 1))
+
+
+class FuzzyIndex:
+    """
+    Fuzzy sentence lookup with `fuzz.ratio` that avoids scanning every choice.
+
+    `fuzz.ratio` is the normalized Indel similarity, so `score > threshold` bounds the
+    Indel distance d between query q and choice c by d < (1 - threshold/100) * (|q| + |c|).
+    Two lossless filters follow from that bound and shortlist the choices before scoring:
+
+    - Length: d >= ||q| - |c||, so only choices in a narrow length window can match.
+      Choices are kept sorted by length, which makes that window a contiguous range.
+    - Bigrams (q-gram lemma): each edit destroys at most two bigrams, so a match must
+      share at least max(|q|, |c|) - 1 - 2d bigrams with the query. A character bigram
+      inverted index counts the shared bigrams for every choice in the window at once.
+
+    Only the survivors are scored by rapidfuzz, and a choice that is filtered out could
+    never have passed the threshold, so results are identical to a full scan.
+    """
+
+    def __init__(self, choice_to_value, score_threshold=85):
+        """`choice_to_value` maps each normalized choice string to its payload (e.g. a data index)."""
+        self.score_threshold = score_threshold
+        self.max_distance_ratio = 1 - score_threshold / 100
+
+        # Sort by length but remember insertion order, which decides ties like a full scan would
+        items = list(choice_to_value.items())
+        by_length = sorted(range(len(items)), key=lambda i: len(items[i][0]))
+        self.choices = [items[i][0] for i in by_length]
+        self.values = [items[i][1] for i in by_length]
+        self.insertion_order = np.array(by_length, dtype=np.int64)
+        self.lengths = np.array([len(choice) for choice in self.choices], dtype=np.int64)
+
+        postings = {}
+        for choice_id, choice in enumerate(self.choices):
+            for gram, count in _bigrams(choice).items():
+                postings.setdefault(gram, ([], []))
+                postings[gram][0].append(choice_id)
+                postings[gram][1].append(count)
+        # Posting ids are ascending, i.e. sorted by choice length as well
+        self.postings = {
+            gram: (np.array(ids, dtype=np.int64), np.array(counts, dtype=np.int64))
+            for gram, (ids, counts) in postings.items()
+        }
+
+    def __len__(self):
+        return len(self.choices)
+
+    def _length_window(self, length):
+        """Returns the [lo, hi) range of choice ids whose length is compatible with `length`."""
+        ratio = self.max_distance_ratio
+        min_length = length * (1 - ratio) / (1 + ratio)
+        max_length = length * (1 + ratio) / (1 - ratio)
+        lo = int(np.searchsorted(self.lengths, min_length, side='left'))
+        hi = int(np.searchsorted(self.lengths, max_length, side='right'))
+        return lo, hi
+
+    def candidates(self, query):
+        """Returns the ids of the choices that could score above the threshold."""
+        query_length = len(query)
+        lo, hi = self._length_window(query_length)
+        if lo >= hi:
+            return np.empty(0, dtype=np.int64)
+
+        ids_parts, weight_parts = [], []
+        for gram, query_count in _bigrams(query).items():
+            posting = self.postings.get(gram)
+            if posting is None:
+                continue
+            ids, counts = posting
+            a, b = np.searchsorted(ids, lo), np.searchsorted(ids, hi)
+            if a < b:
+                ids_parts.append(ids[a:b] - lo)
+                weight_parts.append(np.minimum(counts[a:b], query_count))
+        if ids_parts:
+            shared = np.bincount(np.concatenate(ids_parts), weights=np.concatenate(weight_parts), minlength=hi - lo)
+        else:
+            shared = np.zeros(hi - lo)
+
+        window_lengths = self.lengths[lo:hi]
+        max_distance = np.floor(self.max_distance_ratio * (query_length + window_lengths))
+        required = np.maximum(query_length, window_lengths) - 1 - 2 * max_distance
+        survivors = lo + np.nonzero(shared >= required)[0]
+        # Score in insertion order so ties resolve exactly like a full scan
+        return survivors[np.argsort(self.insertion_order[survivors], kind='stable')]
+
+    def match(self, query):
+        """Returns (value, score) for the best choice scoring above the threshold, or None."""
+        candidate_ids = self.candidates(query)
+        if len(candidate_ids) == 0:
+            return None
+        result = process.extractOne(
+            query,
+            [self.choices[i] for i in candidate_ids],
+            scorer=fuzz.ratio,
+            score_cutoff=self.score_threshold,
+        )
+        if result is None:
+            return None
+        _, score, pos = result
+        if score > self.score_threshold:
+            return self.values[candidate_ids[pos]], score
+        return None
+
+    def match_batch(self, queries):
+        """
+        Batched `match`. The shortlists of all queries are merged and scored with one
+        multi-threaded `process.cdist` call. Returns a list aligned with `queries`.
+        """
+        shortlists = [self.candidates(query) for query in queries]
+        non_empty = [sl for sl in shortlists if len(sl)]
+        if not non_empty:
+            return [None] * len(queries)
+
+        union = np.unique(np.concatenate(non_empty))
+        union = union[np.argsort(self.insertion_order[union], kind='stable')]
+        active = [pos for pos, sl in enumerate(shortlists) if len(sl)]
+        scores = process.cdist(
+            [queries[pos] for pos in active],
+            [self.choices[i] for i in union],
+            scorer=fuzz.ratio,
+            score_cutoff=self.score_threshold,
+            workers=-1,
+        )
+
+        results = [None] * len(queries)
+        # Filtered-out choices can never pass the threshold, so scoring the whole union is safe
+        best_cols = np.argmax(scores, axis=1)
+        for row, pos in enumerate(active):
+            score = float(scores[row, best_cols[row]])
+            if score > self.score_threshold:
+                results[pos] = (self.values[union[best_cols[row]]], score)
+        return results
@@ -0,0 +1,136 @@
+"""
+Fan-out of push-channel events (/ws) to every console watching the same operation.
+Runs on the event loop of the asyncio server; each process has its own hub.
+"""
+import asyncio
+import collections
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Close code for a console that is too slow to keep up (RFC 6455 "try again later")
+CLOSE_TRY_AGAIN_LATER = 1013
+
+# Unconfirmed safety-critical results kept per console; older ones can no longer be confirmed
+MAX_PENDING_CONFIRMATIONS = 32
+
+
+class Subscriber:
+    """
+    One connected console: a bounded queue of outgoing messages and the task sending
+    them, and the confirmation-required commands it issued and may still confirm.
+    `operator` is the authenticated operator console, or None.
+    """
+
+    def __init__(self, websocket, operation, console, queue_size, operator=None):
+        self.websocket = websocket
+        self.operation = operation
+        self.console = console
+        self.operator = operator
+        self._pending_confirmations = collections.OrderedDict()
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.task = asyncio.create_task(self._send_loop())
+        self.close_task = None
+
+    def offer(self, text):
+        """Queues a message without waiting. Returns False if the console is too far behind."""
+        try:
+            self.queue.put_nowait(text)
+            return True
+        except asyncio.QueueFull:
+            return False
+
+    def expect_confirmation(self, command_id):
+        """Records that this console was sent `command_id` as a result awaiting its confirmation."""
+        self._pending_confirmations[command_id] = None
+        self._pending_confirmations.move_to_end(command_id)
+        while len(self._pending_confirmations) > MAX_PENDING_CONFIRMATIONS:
+            self._pending_confirmations.popitem(last=False)
+
+    def take_confirmation(self, command_id):
+        """True (once) if this console may confirm `command_id`, i.e. it issued it and was sent the result."""
+        try:
+            del self._pending_confirmations[command_id]
+            return True
+        except (KeyError, TypeError):
+            return False
+
+    async def _send_loop(self):
+        try:
+            while True:
+                text = await self.queue.get()
+                if text is None:
+                    break
+                await self.websocket.send_text(text)
+        except Exception as e:
+            logger.debug("Stopped sending to console %s: %s", self.console, e)
+
+
+class OperationHub:
+    """
+    Keeps the consoles subscribed to each operation. A published message is serialized
+    once by the caller and queued for every subscriber; a console whose queue is full is
+    disconnected (it reconnects and catches up) rather than slowing the others down.
+    """
+
+    def __init__(self, queue_size=64):
+        self.queue_size = queue_size
+        self._operations = collections.defaultdict(set)
+        self.published = 0
+        self.delivered = 0
+        self.dropped = 0
+
+    @property
+    def connections(self):
+        return sum(len(subscribers) for subscribers in self._operations.values())
+
+    def subscribe(self, websocket, operation, console, operator=None):
+        subscriber = Subscriber(websocket, operation, console, self.queue_size, operator)
+        self._operations[operation].add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        subscribers = self._operations.get(subscriber.operation)
+        if subscribers is not None:
+            subscribers.discard(subscriber)
+            if not subscribers:
+                del self._operations[subscriber.operation]
+        # Lets the sender finish what is already queued, then stop
+        if not subscriber.offer(None):
+            subscriber.task.cancel()
+
+    def publish(self, operation, text):
+        """
+        Queues `text` (a serialized JSON message) for every console of `operation`.
+        Returns the consoles it was queued for.
+        """
+        self.published += 1
+        recipients = []
+        for subscriber in list(self._operations.get(operation, ())):
+            if subscriber.offer(text):
+                self.delivered += 1
+                recipients.append(subscriber)
+            else:
+                self._drop(subscriber)
+        return recipients
+
+    def send(self, subscriber, text):
+        """Queues `text` for one console only (e.g. an error in reply to its own message)."""
+        if not subscriber.offer(text):
+            self._drop(subscriber)
+
+    def _drop(self, subscriber):
+        self.dropped += 1
+        logger.warning("Console %s of operation %s is too slow; disconnecting it.", subscriber.console,
+                       subscriber.operation)
+        self.unsubscribe(subscriber)
+        subscriber.close_task = asyncio.create_task(subscriber.websocket.close(code=CLOSE_TRY_AGAIN_LATER))
+
+    def stats(self):
+        return {
+            'operations': len(self._operations),
+            'connections': self.connections,
+            'published': self.published,
+            'delivered': self.delivered,
+            'dropped': self.dropped,
+        }
@@ -0,0 +1,140 @@
+"""
+Accuracy/latency trade-off of two-stage intent routing (AURA_INTENT_TOP_K) against
+exact brute-force search, on a synthetic corpus scaled from the shipped dataset so
+that every intent has many commands.
+
+    python intent_report.py                                   # 10^4 commands
+    python intent_report.py --size 100000 --top-k 1 2 4 --margins 0 0.02 0.05
+    python intent_report.py --encoder stub --json report.json
+
+For every setting it reports top-1 command and intent agreement with float32 brute
+force, the share of queries that fell back to full search, the corpus vectors scored
+per query and the search latency. Queries are derived from a sample of the commands
+(the English and Tamil sentences, a truncated and a reworded English sentence).
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+
+import numpy as np
+
+from benchmark import generate_corpus
+
+
+def evaluate(index, reference_rows, query_embeddings, index_map, intents, repeats):
+    """Scores one index against the brute-force reference rows. Returns a report row."""
+    from precision_report import time_search
+
+    _, found_rows = index.search(query_embeddings, k=1)
+    found, reference = index_map[found_rows[:, 0]], index_map[reference_rows]
+    single_ms, batch_ms = time_search(index, query_embeddings, repeats)
+    if hasattr(index, 'route'):
+        fallback_rate = float(np.mean(index.route(query_embeddings)[1]))
+        vectors_scored = float(np.mean(index.vectors_scored(query_embeddings)))
+    else:
+        fallback_rate, vectors_scored = 0.0, float(len(index))
+    return {
+        'top1_command_agreement': float(np.mean(found == reference)),
+        'top1_intent_agreement': float(np.mean(intents[found] == intents[reference])),
+        'fallback_rate': round(fallback_rate, 4),
+        'vectors_scored_per_query': round(vectors_scored, 1),
+        'single_query_ms': round(single_ms, 4),
+        'batch_ms': round(batch_ms, 4),
+    }
+
+
+def run(args, work_dir):
+    from config import DATA_PATH
+    from nlp_model import DisasterNLP
+    from precision_report import build_queries
+    from vector_index import BruteForceIndex, IntentIndex
+
+    with open(DATA_PATH, 'r', encoding='utf-8') as f:
+        seed_data = json.load(f)
+    data_path = os.path.join(work_dir, 'corpus.json')
+    with open(data_path, 'w', encoding='utf-8') as f:
+        json.dump(generate_corpus(seed_data, args.size), f, ensure_ascii=False)
+
+    print(f"Encoding a corpus of {args.size} commands...", file=sys.stderr)
+    nlp = DisasterNLP(data_path=data_path)
+    embeddings = np.asarray(nlp.corpus_embeddings, dtype=np.float32)
+    index_map = np.asarray(nlp.bilingual_index_map)
+    intents = np.asarray([item.get('intent') or '' for item in nlp.data])
+    labels = intents[index_map]
+
+    sample = random.Random(0).sample(nlp.data, min(args.queries, len(nlp.data)))
+    query_embeddings = nlp._encode_queries(build_queries(sample))
+
+    reference = BruteForceIndex(embeddings)
+    _, reference_rows = reference.search(query_embeddings, k=1)
+    reference_rows = reference_rows[:, 0]
+
+    rows = [{'mode': 'brute_force', 'top_k': None, 'centroids_per_intent': None, 'min_margin': None,
+             **evaluate(reference, reference_rows, query_embeddings, index_map, intents, args.repeats)}]
+    for top_k in args.top_k:
+        for centroids in args.centroids:
+            index = IntentIndex(embeddings, labels, top_k=top_k, centroids_per_intent=centroids)
+            for margin in args.margins:
+                index.min_margin = margin
+                rows.append({'mode': 'intent', 'top_k': index.top_k, 'centroids_per_intent': centroids,
+                             'min_margin': margin,
+                             **evaluate(index, reference_rows, query_embeddings, index_map, intents, args.repeats)})
+    return {
+        'commands': len(nlp.data),
+        'intents': len(set(intents.tolist())),
+        'corpus_vectors': len(embeddings),
+        'queries': len(query_embeddings),
+        'encoder': nlp.query_encoder.name,
+        'results': rows,
+    }
+
+
+def print_table(report):
+    print(f"\n### {report['commands']} commands, {report['intents']} intents, {report['corpus_vectors']} vectors, "
+          f"{report['queries']} queries ({report['encoder']} encoder)\n")
+    print("| mode | top-k | centroids | min margin | command agreement | intent agreement | fallback | "
+          "vectors scored | single query (ms) | batch (ms) |")
+    print("|---|---|---|---|---|---|---|---|---|---|")
+    for row in report['results']:
+        print(f"| {row['mode']} | {row['top_k'] or '-'} | {row['centroids_per_intent'] or '-'} | "
+              f"{'-' if row['min_margin'] is None else row['min_margin']} | "
+              f"{row['top1_command_agreement']:.4f} | {row['top1_intent_agreement']:.4f} | "
+              f"{row['fallback_rate']:.1%} | {row['vectors_scored_per_query']:.0f} | "
+              f"{row['single_query_ms']} | {row['batch_ms']} |")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--size', type=int, default=10000, help='commands in the synthetic corpus')
+    parser.add_argument('--queries', type=int, default=500, help='commands the queries are derived from')
+    parser.add_argument('--top-k', type=int, nargs='+', default=[1, 2, 4], help='intents searched per query')
+    parser.add_argument('--centroids', type=int, nargs='+', default=[1, 4], help='centroids per intent')
+    parser.add_argument('--margins', type=float, nargs='+', default=[0.0, 0.02, 0.05],
+                        help='minimum intent margins below which a query falls back to full search')
+    parser.add_argument('--encoder', help='encoder backend (default: AURA_ENCODER_BACKEND)')
+    parser.add_argument('--repeats', type=int, default=5, help='timing repetitions')
+    parser.add_argument('--json', help='write the report to this JSON file as well')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix='aura_intent_report_') as work_dir:
+        # Settings are read from the environment when config is first imported
+        if args.encoder:
+            os.environ['AURA_ENCODER_BACKEND'] = args.encoder
+        os.environ['AURA_INTENT_TOP_K'] = '0'
+        os.environ['AURA_ANN_MIN_CORPUS_SIZE'] = str(2**62)
+        os.environ['AURA_ANN_RECALL_SAMPLE'] = '0'
+        os.environ['AURA_EMBEDDING_CACHE_DIR'] = os.path.join(work_dir, 'cache')
+        report = run(args, work_dir)
+
+    print_table(report)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nReport written to {args.json}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,456 @@
+"""
+Open-loop load generator for the Aura HTTP API. Replays a mix of English, Tamil,
+romanized Tamil and mixed-script orders against /process_command (plus a share of
+/get_examples) at fixed arrival rates, one step per rate, and reports throughput,
+latency percentiles and error rates per match tier (read from the match_tier field of
+each response) and per utterance kind:
+
+    python loadgen.py --url http://127.0.0.1:5000 --rates 5 10 20 40 --duration 30
+    python loadgen.py --stub-server --rates 25 50 100 200       # offline, starts serve.py
+    python loadgen.py --stub-server --server-async --server-workers 4 --json load.json
+    python loadgen.py --replay orders.txt --rates 20 --url http://command-centre:5000
+    python loadgen.py --stub-server --app-dir ../../08_NLP_Simulation/aura_disaster_response_ai
+
+Requests are sent on schedule whether or not earlier ones have completed (open loop,
+Poisson arrivals by default), and latency is measured from the scheduled send time, so
+a saturated server shows up as growing latency and errors instead of a lower request
+rate. The first step whose p99 latency exceeds --knee-factor times that of the first
+step, whose error rate exceeds 1% or whose throughput falls below 90% of the offered
+rate is reported as the knee of the latency curve.
+
+A failed request has no response to read its tier from; it is counted under the tier
+the same text was answered from earlier in the run, or under 'unresolved' if it never
+was. Responses without a match_tier field (the English app) are counted as 'untiered'.
+
+--stub-server starts serve.py from --app-dir on a free local port with the stub
+encoder (no model download, runs offline on CI hardware) and stops it afterwards.
+Only the standard library is needed on the client side.
+"""
+import argparse
+import asyncio
+import collections
+import contextlib
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+from benchmark import fuzzy_variant, percentile
+from transliteration import SCRIPT_MIXED, SCRIPT_TAMIL, detect_script, romanize
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+KIND_EXAMPLES = 'examples'  # GET /get_examples
+TIER_UNTIERED = 'untiered'  # answered, but the response carries no match_tier
+TIER_UNRESOLVED = 'unresolved'  # failed before its text was ever answered
+DEFAULT_MIX = 'english=0.4,tamil=0.25,romanized=0.2,mixed=0.15'
+
+
+class StaleConnection(ConnectionError):
+    """A kept-alive connection was closed by the server before it answered."""
+
+
+class HttpClient:
+    """
+    Minimal HTTP/1.1 client on asyncio streams that reuses kept-alive connections and
+    opens new ones as needed, so the number of requests in flight is never capped.
+    """
+
+    def __init__(self, url, timeout=10.0):
+        parts = urllib.parse.urlsplit(url)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.prefix = parts.path.rstrip('/')
+        self.timeout = timeout
+        self._idle = []
+        self.connections_opened = 0
+
+    async def request(self, method, path, body=None):
+        """Returns (status, body bytes). Raises asyncio.TimeoutError or OSError."""
+        return await asyncio.wait_for(self._request(method, path, body), self.timeout)
+
+    async def _request(self, method, path, body):
+        while self._idle:
+            connection = self._idle.pop()
+            try:
+                return await self._exchange(connection, method, path, body, reused=True)
+            except StaleConnection:
+                continue
+        self.connections_opened += 1
+        connection = await asyncio.open_connection(self.host, self.port)
+        return await self._exchange(connection, method, path, body, reused=False)
+
+    async def _exchange(self, connection, method, path, body, reused):
+        reader, writer = connection
+        try:
+            head = f'{method} {self.prefix}{path} HTTP/1.1\r\nHost: {self.host}:{self.port}\r\n'
+            if body is not None:
+                head += f'Content-Type: application/json\r\nContent-Length: {len(body)}\r\n'
+            writer.write(head.encode('latin-1') + b'\r\n' + (body or b''))
+            status_line = await reader.readline()
+            if not status_line:
+                raise (StaleConnection if reused else ConnectionError)('connection closed by the server')
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b'\r\n', b'\n', b''):
+                    break
+                name, _, value = line.decode('latin-1').partition(':')
+                headers[name.strip().lower()] = value.strip().lower()
+            if 'content-length' in headers:
+                payload = await reader.readexactly(int(headers['content-length']))
+            else:
+                payload, headers['connection'] = await reader.read(), 'close'
+        except BaseException:
+            writer.close()
+            raise
+        keep_alive = headers.get('connection') != 'close' and (
+            status_line.startswith(b'HTTP/1.1') or headers.get('connection') == 'keep-alive')
+        if keep_alive:
+            self._idle.append(connection)
+        else:
+            writer.close()
+        return int(status_line.split()[1]), payload
+
+    def close(self):
+        for _, writer in self._idle:
+            writer.close()
+        self._idle.clear()
+
+
+def parse_mix(spec):
+    """'english=0.4,tamil=0.3' -> {'english': 0.4, 'tamil': 0.3}"""
+    mix = {}
+    for part in spec.split(','):
+        kind, _, weight = part.partition('=')
+        mix[kind.strip()] = float(weight)
+    return mix
+
+
+def mixed_script(tamil, rng):
+    """Code-switched order: the first words in Tamil script, the rest romanized."""
+    words = tamil.split()
+    split = rng.randint(1, max(1, len(words) - 1))
+    return ' '.join(words[:split] + romanize(' '.join(words[split:])).split())
+
+
+def synthetic_utterance(kind, records, rng, typo_rate):
+    """One utterance of `kind` drawn from the shipped corpus; a share get a typo (fuzzy tiers)."""
+    record = rng.choice(records)
+    if kind == 'english':
+        english = record['english']
+        if rng.random() < 0.5:
+            return english
+        return f"Please {english[0].lower()}{english[1:].rstrip('.')} immediately."
+    if kind == 'tamil':
+        text = record['tamil']
+    elif kind == 'romanized':
+        text = romanize(record['tamil'])
+    elif kind == 'mixed':
+        return mixed_script(record['tamil'], rng)
+    else:
+        raise ValueError(f"Unknown utterance kind '{kind}' (expected english, tamil, romanized or mixed).")
+    return fuzzy_variant(text, rng) if rng.random() < typo_rate else text
+
+
+def load_replay(path):
+    """
+    Recorded orders: a .jsonl file of {"text": ..., "kind": ...} rows (kind optional) or a
+    text file with one order per line. Missing kinds are taken from the script used.
+    """
+    utterances = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            row = json.loads(line) if path.endswith('.jsonl') else {'text': line}
+            script = detect_script(row['text'])
+            default_kind = 'tamil' if script == SCRIPT_TAMIL else 'mixed' if script == SCRIPT_MIXED else 'latin'
+            utterances.append((row.get('kind') or default_kind, row['text']))
+    if not utterances:
+        raise ValueError(f'No orders in {path}')
+    return utterances
+
+
+def workload(args, seed=0):
+    """Endless stream of (kind, text): text is None for a /get_examples request."""
+    rng = random.Random(seed)
+    if args.replay:
+        replay = load_replay(args.replay)
+    else:
+        with open(args.data, 'r', encoding='utf-8') as f:
+            records = [record for record in json.load(f) if record.get('english') and record.get('tamil')]
+        mix = parse_mix(args.mix)
+        kinds, weights = list(mix), list(mix.values())
+    position = 0
+    while True:
+        if rng.random() < args.examples_share:
+            yield KIND_EXAMPLES, None
+        elif args.replay:
+            yield replay[position % len(replay)]
+            position += 1
+        else:
+            kind = rng.choices(kinds, weights)[0]
+            yield kind, synthetic_utterance(kind, records, rng, args.typo_rate)
+
+
+def response_tier(payload):
+    """The match_tier of a /process_command response body."""
+    try:
+        tier = json.loads(payload).get('match_tier')
+    except (ValueError, AttributeError):
+        return TIER_UNTIERED
+    return tier if isinstance(tier, str) and tier else TIER_UNTIERED
+
+
+async def send(client, kind, text, scheduled_at, known_tiers):
+    """
+    One request. Returns (kind, tier, outcome, latency in seconds since its scheduled
+    send time); known_tiers maps texts to the tier they were last answered from.
+    """
+    loop = asyncio.get_running_loop()
+    tier = KIND_EXAMPLES if text is None else known_tiers.get(text, TIER_UNRESOLVED)
+    try:
+        if text is None:
+            status, _ = await client.request('GET', '/get_examples')
+        else:
+            body = json.dumps({'text': text}, ensure_ascii=False).encode('utf-8')
+            status, payload = await client.request('POST', '/process_command', body)
+            if status == 200:
+                tier = known_tiers[text] = response_tier(payload)
+        outcome = 'ok' if status == 200 else str(status)
+    except asyncio.TimeoutError:
+        outcome = 'timeout'
+    except OSError:
+        outcome = 'connection'
+    return kind, tier, outcome, loop.time() - scheduled_at
+
+
+async def run_step(client, utterances, rate, duration, arrivals, rng, known_tiers):
+    """
+    Sends requests at `rate` per second for `duration` seconds. Returns the samples and
+    the time until the last one completed.
+    """
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    offset, tasks = 0.0, []
+    while True:
+        offset += rng.expovariate(rate) if arrivals == 'poisson' else 1 / rate
+        if offset >= duration:
+            break
+        delay = start + offset - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        kind, text = next(utterances)
+        tasks.append(asyncio.ensure_future(send(client, kind, text, start + offset, known_tiers)))
+    samples = await asyncio.gather(*tasks)
+    return samples, loop.time() - start
+
+
+def summarize(samples, elapsed):
+    """Throughput, latency percentiles (ms) and errors of a set of samples."""
+    latencies = sorted(latency * 1000 for *_, outcome, latency in samples if outcome == 'ok')
+    errors = collections.Counter(outcome for *_, outcome, _ in samples if outcome != 'ok')
+    summary = {
+        'requests': len(samples),
+        'ok': len(latencies),
+        'error_rate': round(sum(errors.values()) / len(samples), 4) if samples else 0.0,
+        'errors': dict(errors),
+        'throughput_rps': round(len(latencies) / elapsed, 2),
+    }
+    if latencies:
+        summary.update({
+            'p50_ms': round(percentile(latencies, 0.50), 2),
+            'p95_ms': round(percentile(latencies, 0.95), 2),
+            'p99_ms': round(percentile(latencies, 0.99), 2),
+            'max_ms': round(latencies[-1], 2),
+        })
+    return summary
+
+
+def summarize_by(samples, elapsed, field):
+    """summarize() per distinct value of samples[field] (0 = kind, 1 = tier)."""
+    groups = collections.defaultdict(list)
+    for sample in samples:
+        groups[sample[field]].append(sample)
+    return {name: summarize(group, elapsed) for name, group in sorted(groups.items())}
+
+
+def find_knee(steps, knee_factor):
+    """The first step that is clearly saturated, or None."""
+    baseline = steps[0]['overall'].get('p99_ms')
+    for step in steps:
+        overall = step['overall']
+        if (overall['error_rate'] > 0.01 or overall['throughput_rps'] < 0.9 * step['sent_rps']
+                or (baseline and overall.get('p99_ms', float('inf')) > knee_factor * baseline)):
+            return step
+    return None
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def wait_until_ready(url, process, timeout):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f'The server exited during startup (status {process.returncode}).')
+        try:
+            with urllib.request.urlopen(f'{url}/readyz', timeout=2):
+                return
+        except (OSError, urllib.error.HTTPError):
+            time.sleep(0.5)
+    raise RuntimeError(f'The server was not ready after {timeout} s.')
+
+
+@contextlib.contextmanager
+def stub_server(args):
+    """Runs serve.py from args.app_dir with the stub encoder on a free port; yields its URL."""
+    url = f'http://127.0.0.1:{free_port()}'
+    with tempfile.TemporaryDirectory(prefix='aura_loadgen_') as work_dir:
+        env = dict(os.environ)
+        env.update({
+            'AURA_ENCODER_BACKEND': 'stub',
+            'AURA_EMBEDDING_CACHE_DIR': os.path.join(work_dir, 'cache'),
+            'AURA_SERVE_BIND': url.rpartition('/')[2],
+            'AURA_SERVE_WORKERS': str(args.server_workers),
+            'AURA_SERVE_ASYNC': '1' if args.server_async else '0',
+        })
+        env.update(item.split('=', 1) for item in args.server_env)
+        print(f"Starting serve.py in {args.app_dir} on {url} (stub encoder)...", file=sys.stderr)
+        with open(os.path.join(work_dir, 'server.log'), 'w') as log:
+            process = subprocess.Popen([sys.executable, 'serve.py'], cwd=args.app_dir, env=env,
+                                       stdout=log, stderr=subprocess.STDOUT)
+            try:
+                wait_until_ready(url, process, args.startup_timeout)
+                yield url
+            except RuntimeError:
+                log.flush()
+                with open(log.name, 'r') as f:
+                    sys.stderr.write(f.read()[-4000:])
+                raise
+            finally:
+                process.terminate()
+                try:
+                    process.wait(timeout=15)
+                except subprocess.TimeoutExpired:
+                    process.kill()
+
+
+async def run(args, url):
+    client = HttpClient(url, args.timeout)
+    utterances = workload(args, args.seed)
+    rng = random.Random(args.seed)
+    known_tiers = {}
+    steps = []
+    try:
+        if args.warmup:
+            await run_step(client, utterances, args.rates[0], args.warmup, args.arrivals, rng, known_tiers)
+        for rate in args.rates:
+            samples, elapsed = await run_step(client, utterances, rate, args.duration, args.arrivals, rng,
+                                              known_tiers)
+            step = {
+                'offered_rps': rate,
+                'sent_rps': round(len(samples) / args.duration, 2),
+                'overall': summarize(samples, elapsed),
+                'tiers': summarize_by(samples, elapsed, 1),
+                'kinds': summarize_by(samples, elapsed, 0),
+            }
+            steps.append(step)
+            print_step(step)
+    finally:
+        client.close()
+    return steps
+
+
+def print_row(name, summary):
+    errors = ', '.join(f'{outcome} x{count}' for outcome, count in sorted(summary['errors'].items()))
+    print(f"  {name:16} {summary['requests']:>6} req  {summary['throughput_rps']:>8} ok/s  "
+          f"p50 {summary.get('p50_ms', '-'):>8} ms  p95 {summary.get('p95_ms', '-'):>8} ms  "
+          f"p99 {summary.get('p99_ms', '-'):>8} ms  errors {summary['error_rate']:.2%}"
+          f"{f' ({errors})' if errors else ''}", file=sys.stderr)
+
+
+def print_step(step):
+    print(f"\n{step['offered_rps']:>8} req/s offered:", file=sys.stderr)
+    print_row('all', step['overall'])
+    print("  by match tier:", file=sys.stderr)
+    for tier, summary in step['tiers'].items():
+        print_row(tier, summary)
+    print("  by utterance kind:", file=sys.stderr)
+    for kind, summary in step['kinds'].items():
+        print_row(kind, summary)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default='http://127.0.0.1:5000', help='server to load (ignored with --stub-server)')
+    parser.add_argument('--rates', type=float, nargs='+', default=[5, 10, 20, 40, 80],
+                        help='arrival rates to step through (requests per second)')
+    parser.add_argument('--duration', type=float, default=20, help='seconds per rate step')
+    parser.add_argument('--warmup', type=float, default=3, help='seconds at the first rate before measuring')
+    parser.add_argument('--arrivals', choices=('poisson', 'uniform'), default='poisson')
+    parser.add_argument('--mix', default=DEFAULT_MIX, help=f'synthetic utterance mix (default: {DEFAULT_MIX})')
+    parser.add_argument('--examples-share', type=float, default=0.05, help='share of GET /get_examples requests')
+    parser.add_argument('--typo-rate', type=float, default=0.3, help='share of Tamil/romanized orders with a typo')
+    parser.add_argument('--replay', help='replay recorded orders (.txt, one per line, or .jsonl) instead')
+    parser.add_argument('--data', default=os.path.join(BASE_DIR, 'data', 'nlp_disaster.json'),
+                        help='corpus the synthetic orders are drawn from')
+    parser.add_argument('--timeout', type=float, default=10, help='client timeout per request (seconds)')
+    parser.add_argument('--knee-factor', type=float, default=3, help='p99 growth over the first step that marks the knee')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', help='write the results to this file')
+    parser.add_argument('--stub-server', action='store_true', help='start serve.py with the stub encoder and load it')
+    parser.add_argument('--app-dir', default=BASE_DIR, help='app whose serve.py --stub-server starts')
+    parser.add_argument('--server-workers', type=int, default=1, help='AURA_SERVE_WORKERS for --stub-server')
+    parser.add_argument('--server-async', action='store_true', help='AURA_SERVE_ASYNC=1 for --stub-server')
+    parser.add_argument('--server-env', action='append', default=[], metavar='KEY=VALUE',
+                        help='extra setting for --stub-server, e.g. AURA_QUERY_CACHE_SIZE=0 (repeatable)')
+    parser.add_argument('--startup-timeout', type=float, default=120, help='seconds to wait for --stub-server')
+    args = parser.parse_args()
+
+    with contextlib.ExitStack() as stack:
+        url = stack.enter_context(stub_server(args)) if args.stub_server else args.url.rstrip('/')
+        steps = asyncio.run(run(args, url))
+
+    knee = find_knee(steps, args.knee_factor)
+    if knee is None:
+        print(f"\nNo knee up to {steps[-1]['offered_rps']} req/s.", file=sys.stderr)
+    else:
+        overall = knee['overall']
+        print(f"\nKnee at ~{knee['offered_rps']} req/s: {overall['throughput_rps']} ok/s, "
+              f"p99 {overall.get('p99_ms', '-')} ms, errors {overall['error_rate']:.2%}.", file=sys.stderr)
+
+    if args.json:
+        report = {
+            'target': 'stub-server' if args.stub_server else args.url,
+            'app_dir': os.path.abspath(args.app_dir) if args.stub_server else None,
+            'workload': args.replay or args.mix,
+            'examples_share': args.examples_share,
+            'arrivals': args.arrivals,
+            'duration_seconds': args.duration,
+            'knee_rps': knee['offered_rps'] if knee else None,
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'cpu_count': os.cpu_count(),
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'steps': steps,
+        }
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,115 +1,916 @@
 import json
-import torch
-from sentence_transformers import SentenceTransformer, util
+import logging
+import numpy as np
 import re
-from rapidfuzz import process, fuzz
 import os
 import sys
+import threading
+import time
+
+from config import (
+    MODEL_NAME, MODEL_REVISION, DATA_PATH, EMBEDDING_CACHE_DIR, EMBEDDING_CACHE_KEEP,
+    ANN_MIN_CORPUS_SIZE, IVF_NLIST, IVF_NPROBE, ANN_RECALL_SAMPLE,
+    INTENT_TOP_K, INTENT_CENTROIDS, INTENT_MIN_MARGIN,
+    QUERY_CACHE_SIZE, QUERY_CACHE_TTL_SECONDS, EMBEDDING_PRECISION,
+    ENCODER_BACKEND, ENCODER_DRIFT_SAMPLE, ENCODER_MIN_COSINE, SEMANTIC_WAIT_SECONDS,
+    SEMANTIC_BATCH_WINDOW_MS, SEMANTIC_BATCH_MAX_SIZE, PLAN_MIN_CLAUSE_WORDS, PLAN_MAX_CLAUSES,
+    PRIORITY_MAX_WAIT_MS, SINGLE_FLIGHT,
+)
+from batching import MicroBatcher
+from embedding_cache import EmbeddingCache, sha256_bytes
+from fuzzy_index import FuzzyIndex
+from scheduling import PRIORITY_CRITICAL, PRIORITY_ROUTINE
+from segmentation import split_clauses
+from singleflight import SingleFlight
+from transliteration import SCRIPT_LATIN, SCRIPT_MIXED, detect_script, romanized_key
+from metrics import (
+    COALESCED_REQUESTS, ENCODE_SECONDS, FUZZY_SCAN_SECONDS, MATCHES, PLAN_CLAUSES, PRIORITY_REQUESTS, SEARCH_SECONDS, SERIALIZE_SECONDS,
+)
+from query_cache import QueryResultCache
+from vector_index import BruteForceIndex, build_vector_index, recall_at_1
+
+# Names of the matching tiers, in cascade order
+TIER_EXACT_TAMIL = 'exact_tamil'
+TIER_EXACT_ROMANIZED = 'exact_romanized'
+TIER_FUZZY_TAMIL = 'fuzzy_tamil'
+TIER_FUZZY_ROMANIZED = 'fuzzy_romanized'
+TIER_SEMANTIC = 'semantic'
+
+# Fields added to the matched command in every response
+RESPONSE_FIELDS = ('original_query', 'match_tier', 'match_score')
+
+logger = logging.getLogger(__name__)
+
+
+class ModelWarmingUp(RuntimeError):
+    """Raised when a query needs the semantic tier before the model has finished loading."""
+
+
+class CorpusState:
+    """
+    Snapshot of everything derived from the corpus file: the records, the Tamil and
+    romanized Tamil lookup indexes, the bilingual corpus with its embeddings and the
+    vector index.
+    A snapshot is never modified after it is built. Reloading builds a new one and
+    swaps the reference, so a request that grabbed a snapshot sees consistent data.
+    """
+
+    __slots__ = (
+        'data', 'data_hash', 'tamil_to_index', 'tamil_fuzzy_index',
+        'romanized_to_index', 'romanized_fuzzy_index', 'serialized_records',
+        'bilingual_corpus', 'bilingual_index_map', 'corpus_embeddings', 'vector_index',
+    )
+
+    def __init__(self, data, data_hash, tamil_to_index, tamil_fuzzy_index,
+                 romanized_to_index, romanized_fuzzy_index, serialized_records,
+                 bilingual_corpus, bilingual_index_map, corpus_embeddings, vector_index):
+        self.data = data
+        self.data_hash = data_hash
+        self.tamil_to_index = tamil_to_index
+        self.tamil_fuzzy_index = tamil_fuzzy_index
+        self.romanized_to_index = romanized_to_index
+        self.romanized_fuzzy_index = romanized_fuzzy_index
+        self.serialized_records = serialized_records
+        self.bilingual_corpus = bilingual_corpus
+        self.bilingual_index_map = bilingual_index_map
+        self.corpus_embeddings = corpus_embeddings
+        self.vector_index = vector_index
+
+
+def serialize_record(item):
+    """
+    Pre-serializes a command for responses: its UTF-8 JSON without the closing brace,
+    so the per-request fields can be appended (see DisasterNLP._build_response_json).
+    """
+    record = {key: value for key, value in item.items() if key not in RESPONSE_FIELDS}
+    return json.dumps(record, ensure_ascii=False)[:-1].encode('utf-8')
+
+
+def diff_records(old_data, new_data):
+    """Compares two corpora by command `id` and content. Returns added/changed/removed id lists."""
+    def by_id(data):
+        return {item['id']: json.dumps(item, sort_keys=True, ensure_ascii=False) for item in data}
+
+    old_items, new_items = by_id(old_data), by_id(new_data)
+    return {
+        'added': [i for i in new_items if i not in old_items],
+        'changed': [i for i in new_items if i in old_items and new_items[i] != old_items[i]],
+        'removed': [i for i in old_items if i not in new_items],
+    }
+
 
 class DisasterNLP:
-    def __init__(self):
+    def __init__(self, data_path=DATA_PATH, load_in_background=False):
         """
         Initializes the NLP model using Sentence Transformers.
         This model finds the most semantically similar command from the dataset,
         supporting both English and Tamil.
+
+        The corpus and the exact/fuzzy Tamil tiers are built first. With
+        `load_in_background`, the transformer and the corpus embeddings are then loaded
+        on a daemon thread and the constructor returns immediately; `semantic_ready`
+        is set once the semantic tier can serve queries.
         """
-        print("Initializing Sentence Transformer model (paraphrase-multilingual-MiniLM-L12-v2)...")
-        self.model = SentenceTransformer('paraphrase-multilingual-MiniLM-L12-v2')
-        print("Model loaded. Loading and pre-processing disaster data...")
-        self.data = self._load_data()
+        self.model = None
+        self.query_encoder = None
+        self.model_key = f"{MODEL_NAME}@{MODEL_REVISION or 'default'}"
+        # (name, revision) of the model that encodes the corpus; part of the cache key
+        self.corpus_model = (MODEL_NAME, MODEL_REVISION)
+        self.onnx_export_dir = os.path.join(EMBEDDING_CACHE_DIR, 'onnx')
+        self.semantic_ready = threading.Event()
+        self.semantic_error = None
+        self.data_path = data_path
+        self.embedding_cache = EmbeddingCache(EMBEDDING_CACHE_DIR, keep=EMBEDDING_CACHE_KEEP)
+        # Repeated orders skip the fuzzy and semantic tiers. Keys include the corpus hash,
+        # so results computed against an older corpus can never be served after a reload.
+        self.query_cache = QueryResultCache(max_size=QUERY_CACHE_SIZE, ttl_seconds=QUERY_CACHE_TTL_SECONDS)
+        # Concurrent identical queries that miss the cache share one fuzzy/semantic computation
+        self.single_flight = SingleFlight() if SINGLE_FLIGHT else None
+        self._reload_lock = threading.Lock()
+        self._watcher = None
+        # Single semantic queries from concurrent requests are encoded together
+        self.semantic_batcher = None
+        if SEMANTIC_BATCH_WINDOW_MS > 0:
+            self.semantic_batcher = MicroBatcher(
+                self._semantic_search_batched,
+                window_ms=SEMANTIC_BATCH_WINDOW_MS,
+                max_batch_size=SEMANTIC_BATCH_MAX_SIZE,
+                name='semantic-batcher',
+                max_wait_ms=PRIORITY_MAX_WAIT_MS,
+            )
+
+        logger.info("Loading and pre-processing disaster data...")
+        data, data_hash = self._load_data()
+        self._state = self._build_lexical_state(data, data_hash)
+        logger.info("Exact and fuzzy Tamil tiers ready (%d commands).", len(data))
+
+        if load_in_background:
+            threading.Thread(target=self._load_semantic_tier, name='semantic-loader', daemon=True).start()
+        else:
+            self._load_semantic_tier()
+            if self.semantic_error is not None:
+                raise self.semantic_error
+
+    def _load_semantic_tier(self):
+        """
+        Loads the transformer and the query encoder, computes (or loads cached) corpus
+        embeddings and swaps in the complete snapshot. Failures are kept in
+        `semantic_error` so the lexical tiers keep serving.
+        """
+        try:
+            # Imported here: torch and sentence-transformers take seconds to import
+            from encoders import StubEncoder, build_encoder
+
+            if ENCODER_BACKEND == 'stub':
+                # Offline benchmarks: the stub encodes the corpus as well, no model is loaded
+                self.model = StubEncoder()
+                self.model_key = StubEncoder.name
+                self.corpus_model = (StubEncoder.name, None)
+            else:
+                from sentence_transformers import SentenceTransformer
+
+                logger.info("Initializing Sentence Transformer model (%s)...", MODEL_NAME)
+                self.model = SentenceTransformer(MODEL_NAME, revision=MODEL_REVISION)
+            # The reference model encodes the corpus; queries go through the configured backend
+            self.query_encoder = build_encoder(ENCODER_BACKEND, self.model, self.onnx_export_dir, self.model_key)
+            logger.info("Model loaded (query encoder backend: %s). Encoding corpus...", self.query_encoder.name)
+            with self._reload_lock:
+                self._state = self._with_semantic(self._state)
+            self._check_encoder_drift()
+        except Exception as e:
+            self.semantic_error = e
+            logger.exception("Semantic tier failed to load; only exact/fuzzy Tamil matching is available: %s", e)
+            return
+        self.semantic_ready.set()
+        logger.info("Corpus embeddings ready. NLP system is ready.")
+
+    def wait_until_ready(self, timeout=None):
+        """Blocks until the semantic tier is live. Returns False on timeout or load failure."""
+        return self.semantic_ready.wait(timeout) and self.semantic_error is None
+
+    def tier_status(self):
+        """Maps every matching tier to 'ready', 'loading' or 'failed'."""
+        if self.semantic_ready.is_set():
+            semantic = 'ready'
+        else:
+            semantic = 'failed' if self.semantic_error is not None else 'loading'
+        return {
+            TIER_EXACT_TAMIL: 'ready', TIER_EXACT_ROMANIZED: 'ready',
+            TIER_FUZZY_TAMIL: 'ready', TIER_FUZZY_ROMANIZED: 'ready',
+            TIER_SEMANTIC: semantic,
+        }
+
+    def _semantic_state(self):
+        """
+        Returns a snapshot with a vector index, waiting up to SEMANTIC_WAIT_SECONDS for
+        the semantic tier to finish loading. Raises ModelWarmingUp otherwise.
+        """
+        if self.semantic_error is not None:
+            raise ModelWarmingUp(f"Semantic tier failed to load: {self.semantic_error}")
+        if not self.semantic_ready.wait(SEMANTIC_WAIT_SECONDS):
+            raise ModelWarmingUp("Semantic tier is still warming up")
+        return self._state
+
+    # --- Read-only views of the current corpus snapshot ---
+    @property
+    def data(self):
+        return self._state.data
+
+    @property
+    def data_hash(self):
+        return self._state.data_hash
+
+    @property
+    def tamil_to_index(self):
+        return self._state.tamil_to_index
+
+    @property
+    def tamil_fuzzy_index(self):
+        return self._state.tamil_fuzzy_index
+
+    @property
+    def bilingual_corpus(self):
+        return self._state.bilingual_corpus
+
+    @property
+    def bilingual_index_map(self):
+        return self._state.bilingual_index_map
+
+    @property
+    def corpus_embeddings(self):
+        return self._state.corpus_embeddings
 
+    @property
+    def vector_index(self):
+        return self._state.vector_index
+
+    def _read_corpus(self, data_path):
+        """
+        Reads and validates the corpus file. Returns (records, SHA-256 of the raw bytes).
+        The hash lets the embedding cache and reloads tell when the corpus changed.
+        Raises OSError or ValueError (including json.JSONDecodeError) on bad input.
+        """
+        with open(data_path, 'rb') as f:
+            raw = f.read()
+        data = json.loads(raw.decode('utf-8'))
+        if not isinstance(data, list):
+            raise ValueError("The corpus must be a JSON array of commands.")
+        seen_ids = set()
+        for item in data:
+            if not isinstance(item, dict) or not item.get('id') or not item.get('english'):
+                raise ValueError(f"Every command needs an 'id' and an 'english' sentence: {item!r:.100}")
+            if item['id'] in seen_ids:
+                raise ValueError(f"Duplicate command id '{item['id']}'.")
+            seen_ids.add(item['id'])
+        return data, sha256_bytes(raw)
+
+    def _load_data(self):
+        """Loads the consolidated bilingual JSON data from the 'data' directory."""
+        data_path = self.data_path
+        try:
+            data, data_hash = self._read_corpus(data_path)
+            logger.info("Successfully loaded data from %s", data_path)
+            return data, data_hash
+        except FileNotFoundError:
+            logger.critical("Data file not found at '%s'. Please ensure 'nlp_disaster.json' is located "
+                            "inside a 'data' folder in your project root.", data_path)
+            sys.exit(1) # Exit because the application cannot run without data.
+        except ValueError as e:
+            logger.critical("Could not parse '%s': %s", data_path, e)
+            sys.exit(1)
+
+    def _build_state(self, data, data_hash, previous=None):
+        """
+        Builds a new corpus snapshot. With a `previous` snapshot (reload), embeddings
+        of sentences that did not change are reused and only new text is encoded.
+        """
+        return self._with_semantic(self._build_lexical_state(data, data_hash), previous)
+
+    def _build_lexical_state(self, data, data_hash):
+        """
+        Builds a snapshot with the Tamil lookup indexes and the bilingual corpus but
+        without embeddings. It needs no model, so the exact and fuzzy tiers can serve
+        while the semantic tier is loading.
+        """
         # Build a normalized Tamil-to-index map for fast exact and fuzzy lookup
-        self.tamil_to_index = {}
-        for idx, item in enumerate(self.data):
+        tamil_to_index = {}
+        for idx, item in enumerate(data):
             if 'tamil' in item and item['tamil']:
                 norm_tamil = self.normalize_text(item['tamil'])
-                self.tamil_to_index[norm_tamil] = idx
+                tamil_to_index[norm_tamil] = idx
+        # Length-sorted choices plus a bigram inverted index, built once for the fuzzy tier.
+        # We use a high threshold (85) to avoid incorrect matches for short/dissimilar queries.
+        tamil_fuzzy_index = FuzzyIndex(tamil_to_index, score_threshold=85)
+
+        # The same sentences transliterated to Latin script and phonetically folded, for
+        # Tamil typed on Latin keyboards ("Tanglish")
+        romanized_to_index = {}
+        for idx, item in enumerate(data):
+            if 'tamil' in item and item['tamil']:
+                romanized_to_index[romanized_key(item['tamil'])] = idx
+        romanized_fuzzy_index = FuzzyIndex(romanized_to_index, score_threshold=85)
 
         # Build bilingual corpus: both English and Tamil for each command for semantic search
-        self.bilingual_corpus = []
-        self.bilingual_index_map = []  # Maps each entry in bilingual_corpus to the original self.data index
-        for idx, item in enumerate(self.data):
+        bilingual_corpus = []
+        bilingual_index_map = []  # Maps each entry in bilingual_corpus to the original data index
+        for idx, item in enumerate(data):
             # Add English sentence
-            self.bilingual_corpus.append(item['english'])
-            self.bilingual_index_map.append(idx)
+            bilingual_corpus.append(item['english'])
+            bilingual_index_map.append(idx)
             # Add Tamil sentence if it exists
             if 'tamil' in item and item['tamil']:
-                self.bilingual_corpus.append(item['tamil'])
-                self.bilingual_index_map.append(idx)
+                bilingual_corpus.append(item['tamil'])
+                bilingual_index_map.append(idx)
 
-        print("Computing embeddings for the bilingual corpus...")
-        self.corpus_embeddings = self.model.encode(self.bilingual_corpus, convert_to_tensor=True, show_progress_bar=True)
-        print("Corpus embeddings computed. NLP system is ready.")
+        return CorpusState(
+            data=data,
+            data_hash=data_hash,
+            tamil_to_index=tamil_to_index,
+            tamil_fuzzy_index=tamil_fuzzy_index,
+            romanized_to_index=romanized_to_index,
+            romanized_fuzzy_index=romanized_fuzzy_index,
+            serialized_records=[serialize_record(item) for item in data],
+            bilingual_corpus=bilingual_corpus,
+            bilingual_index_map=np.asarray(bilingual_index_map, dtype=np.int32),
+            corpus_embeddings=None,
+            vector_index=None,
+        )
 
-    def _load_data(self):
-        """Loads the consolidated bilingual JSON data from the 'data' directory."""
-        # This path is relative to the project root, where app.py is executed.
-        data_path = 'data/nlp_disaster.json'
-        try:
-            with open(data_path, 'r', encoding='utf-8') as f:
-                print(f"Successfully loaded data from {data_path}")
-                return json.load(f)
-        except FileNotFoundError:
-            print(f"FATAL ERROR: Data file not found at '{data_path}'.")
-            print("Please ensure 'nlp_disaster.json' is located inside a 'data' folder in your project root.")
-            sys.exit(1) # Exit because the application cannot run without data.
-        except json.JSONDecodeError:
-            print(f"FATAL ERROR: Could not parse '{data_path}'. Please ensure it is a valid JSON file.")
-            sys.exit(1)
+    def _with_semantic(self, lexical, previous=None):
+        """Returns a copy of the `lexical` snapshot with corpus embeddings and a vector index."""
+        corpus_embeddings, bilingual_index_map = self._load_corpus_embeddings(
+            lexical.bilingual_corpus, lexical.bilingual_index_map, lexical.data_hash, previous)
+        # Exact search for small corpora, an approximate index above ANN_MIN_CORPUS_SIZE,
+        # or intent routing when INTENT_TOP_K is set
+        intent_labels = [lexical.data[idx].get('intent') or '' for idx in bilingual_index_map] if INTENT_TOP_K else None
+        vector_index = build_vector_index(
+            corpus_embeddings,
+            min_ann_size=ANN_MIN_CORPUS_SIZE,
+            nlist=IVF_NLIST,
+            nprobe=IVF_NPROBE,
+            recall_sample=ANN_RECALL_SAMPLE,
+            previous_index=previous.vector_index if previous is not None else None,
+            precision=EMBEDDING_PRECISION,
+            intent_labels=intent_labels,
+            intent_top_k=INTENT_TOP_K,
+            intent_centroids=INTENT_CENTROIDS,
+            intent_min_margin=INTENT_MIN_MARGIN,
+        )
+        return CorpusState(
+            data=lexical.data,
+            data_hash=lexical.data_hash,
+            tamil_to_index=lexical.tamil_to_index,
+            tamil_fuzzy_index=lexical.tamil_fuzzy_index,
+            romanized_to_index=lexical.romanized_to_index,
+            romanized_fuzzy_index=lexical.romanized_fuzzy_index,
+            serialized_records=lexical.serialized_records,
+            bilingual_corpus=lexical.bilingual_corpus,
+            bilingual_index_map=bilingual_index_map,
+            corpus_embeddings=corpus_embeddings,
+            vector_index=vector_index,
+        )
+
+    def _load_corpus_embeddings(self, bilingual_corpus, bilingual_index_map, data_hash, previous=None):
+        """
+        Returns (L2-normalized embeddings, index map) for the bilingual corpus.
+        They are served from the on-disk cache when the model and dataset are unchanged;
+        on a miss only sentences without an embedding in `previous` are encoded.
+        At startup both arrays are memory-mapped from the cache whenever possible, so
+        pre-forked workers share one copy through the page cache. On a reload the new
+        entry is written on a background thread instead, so the reload lock is not held
+        for a full-corpus write, and the arrays are served from memory.
+        """
+        cache_key = self.embedding_cache.make_key(*self.corpus_model, data_hash)
+        cached = self.embedding_cache.load(cache_key)
+        if cached is not None:
+            embeddings, index_map = cached
+            if np.array_equal(index_map, bilingual_index_map):
+                logger.info("Loaded %d corpus embeddings from cache (%s).", len(embeddings), cache_key[:12])
+                return embeddings, index_map
+            logger.warning("Cached index map does not match the corpus. Re-encoding.")
+
+        # Reuse rows of the previous snapshot for sentences whose text is unchanged
+        previous_rows = {}
+        if previous is not None:
+            previous_rows = {sentence: row for row, sentence in enumerate(previous.bilingual_corpus)}
+        reuse_rows = np.array([previous_rows.get(sentence, -1) for sentence in bilingual_corpus], dtype=np.int64)
+        to_encode = np.nonzero(reuse_rows < 0)[0]
+
+        embedding_dim = self.model.get_sentence_embedding_dimension()
+        embeddings = np.empty((len(bilingual_corpus), embedding_dim), dtype=np.float32)
+        reused = np.nonzero(reuse_rows >= 0)[0]
+        if len(reused):
+            embeddings[reused] = previous.corpus_embeddings[reuse_rows[reused]]
+        if len(to_encode):
+            logger.info("Computing embeddings for %d of %d corpus sentences...", len(to_encode), len(bilingual_corpus))
+            embeddings[to_encode] = self.model.encode(
+                [bilingual_corpus[i] for i in to_encode],
+                convert_to_numpy=True,
+                normalize_embeddings=True,
+                show_progress_bar=True,
+            ).astype(np.float32)
+
+        meta = {
+            'model_name': self.corpus_model[0],
+            'model_revision': self.corpus_model[1],
+            'data_hash': data_hash,
+            'num_sentences': len(bilingual_corpus),
+        }
+        if previous is not None:
+            self.embedding_cache.save_in_background(cache_key, embeddings, bilingual_index_map, meta)
+            return embeddings, bilingual_index_map
+        self.embedding_cache.save(cache_key, embeddings, bilingual_index_map, meta)
+        # Serve from the memory-mapped copy when it was written successfully
+        cached = self.embedding_cache.load(cache_key)
+        return cached if cached is not None else (embeddings, bilingual_index_map)
+
+    def reload(self):
+        """
+        Re-reads the corpus file and, if it changed, builds a new snapshot (encoding only
+        new or changed sentences) and swaps it in atomically. In-flight requests finish on
+        the snapshot they started with. Returns a summary of the change.
+        Raises OSError/ValueError if the file cannot be read; the old corpus stays active.
+        Raises ModelWarmingUp while the semantic tier is still loading.
+        """
+        if not self.semantic_ready.is_set():
+            raise ModelWarmingUp("Cannot reload the corpus while the semantic tier is loading")
+        with self._reload_lock:
+            start = time.perf_counter()
+            data, data_hash = self._read_corpus(self.data_path)
+            previous = self._state
+            if data_hash == previous.data_hash:
+                return {'changed': False, 'num_commands': len(previous.data)}
+
+            changes = diff_records(previous.data, data)
+            self._state = self._build_state(data, data_hash, previous)
+            # Entries of the old corpus can no longer be hit; drop them to free memory
+            self.query_cache.clear()
+
+            summary = {
+                'changed': True,
+                'num_commands': len(data),
+                'added': len(changes['added']),
+                'changed_commands': len(changes['changed']),
+                'removed': len(changes['removed']),
+                'seconds': round(time.perf_counter() - start, 3),
+            }
+            logger.info("Corpus reloaded: %s", summary)
+            return summary
+
+    def start_corpus_watcher(self, interval_seconds):
+        """Polls the corpus file every `interval_seconds` and reloads it when it changes."""
+        if self._watcher is not None or interval_seconds <= 0:
+            return
 
+        def file_signature():
+            try:
+                stat = os.stat(self.data_path)
+                return stat.st_mtime_ns, stat.st_size
+            except OSError:
+                return None
+
+        def watch():
+            last_signature = file_signature()
+            while True:
+                time.sleep(interval_seconds)
+                signature = file_signature()
+                if signature is None or signature == last_signature:
+                    continue
+                if not self.semantic_ready.is_set():
+                    continue  # picked up on a later poll, once the model has loaded
+                last_signature = signature
+                try:
+                    self.reload()
+                except (OSError, ValueError) as e:
+                    logger.error("Corpus reload failed, keeping the current corpus: %s", e)
+
+        self._watcher = threading.Thread(target=watch, name='corpus-watcher', daemon=True)
+        self._watcher.start()
+        logger.info("Watching '%s' for changes every %ss.", self.data_path, interval_seconds)
+
+    def _check_encoder_drift(self):
+        """Warns when the query encoder backend drifts too far from the reference model."""
+        if self.query_encoder.name in ('torch', 'stub') or ENCODER_DRIFT_SAMPLE <= 0:
+            return
+        from encoders import TorchEncoder, measure_drift
+        sentences = self._state.bilingual_corpus[:ENCODER_DRIFT_SAMPLE]
+        drift = measure_drift(self.query_encoder, TorchEncoder(self.model), sentences)
+        logger.info("Encoder '%s' vs reference on %d corpus sentences: mean cosine %.4f, min %.4f",
+                    self.query_encoder.name, drift['count'], drift['mean'], drift['min'])
+        if drift['min'] < ENCODER_MIN_COSINE:
+            logger.warning("Encoder '%s' drifts below the minimum cosine %s; semantic matches may differ "
+                           "from the reference model.", self.query_encoder.name, ENCODER_MIN_COSINE)
 
     def normalize_text(self, text):
         """Removes spaces, punctuation, and lowercases text for robust matching."""
         return re.sub(r'[\s\W_]+', '', text).casefold()
 
-    def predict(self, query: str):
+    def _build_response(self, state, match, query):
+        """Returns a copy of the matched command annotated with the original query and the match."""
+        idx, tier, score = match
+        best_match_command = state.data[idx].copy()
+        best_match_command['original_query'] = query
+        best_match_command['match_tier'] = tier
+        best_match_command['match_score'] = round(score, 4)
+        return best_match_command
+
+    def _build_response_json(self, state, match, query):
+        """`_build_response` as JSON bytes, appending the per-request fields to the pre-serialized record."""
+        idx, tier, score = match
+        head = state.serialized_records[idx]
+        tail = (f'"original_query": {json.dumps(query, ensure_ascii=False)}, '
+                f'"match_tier": "{tier}", "match_score": {round(score, 4)}}}')
+        return b''.join((head, b', ' if len(head) > 1 else b'', tail.encode('utf-8')))
+
+    def command_json(self, command_id):
+        """
+        UTF-8 JSON of the command with `command_id` in the active corpus, or None.
+        A linear scan: it serves human-paced confirmations, not queries.
+        """
+        state = self._state
+        for idx, item in enumerate(state.data):
+            if item.get('id') == command_id:
+                return state.serialized_records[idx] + b'}'
+        return None
+
+    def _match_exact_tamil(self, state, clean_query):
+        """Tier 1: direct normalized Tamil lookup. Returns the data index or None."""
+        return state.tamil_to_index.get(clean_query)
+
+    def _match_fuzzy_tamil(self, state, clean_query):
+        """
+        Tier 2: fuzzy Tamil lookup with `fuzz.ratio`. Returns (data index, score) or None.
+        Only choices that can still beat the threshold (by length and shared bigrams) are scored.
+        """
+        with FUZZY_SCAN_SECONDS.time():
+            return state.tamil_fuzzy_index.match(clean_query)
+
+    def _match_exact_romanized(self, state, romanized_query):
+        """Tier 1 for Tamil typed in Latin script: lookup of the folded romanized key."""
+        return state.romanized_to_index.get(romanized_query)
+
+    def _match_fuzzy_romanized(self, state, romanized_query):
+        """Tier 2 for Tamil typed in Latin script: fuzzy lookup of the folded romanized key."""
+        with FUZZY_SCAN_SECONDS.time():
+            return state.romanized_fuzzy_index.match(romanized_query)
+
+    def _match_lexical(self, state, query):
+        """
+        Exact and fuzzy tiers only (no cache, no metrics), picked by script as in `_match`.
+        Returns (data index, tier, score) or None.
+        """
+        clean_query = self.normalize_text(query)
+        script = detect_script(query)
+        romanized_query = romanized_key(query) if script in (SCRIPT_LATIN, SCRIPT_MIXED) else None
+        if script != SCRIPT_LATIN:
+            idx = self._match_exact_tamil(state, clean_query)
+            if idx is not None:
+                return idx, TIER_EXACT_TAMIL, 100.0
+        if romanized_query:
+            idx = self._match_exact_romanized(state, romanized_query)
+            if idx is not None:
+                return idx, TIER_EXACT_ROMANIZED, 100.0
+        if script != SCRIPT_LATIN:
+            fuzzy_match = self._match_fuzzy_tamil(state, clean_query)
+            if fuzzy_match is not None:
+                return fuzzy_match[0], TIER_FUZZY_TAMIL, fuzzy_match[1]
+        if romanized_query:
+            fuzzy_match = self._match_fuzzy_romanized(state, romanized_query)
+            if fuzzy_match is not None:
+                return fuzzy_match[0], TIER_FUZZY_ROMANIZED, fuzzy_match[1]
+        return None
+
+    def _semantic_search(self, state, queries):
         """
-        Finds the most similar command in the corpus to the user's query.
-        It prioritizes exact/fuzzy matches in Tamil before falling back to semantic search.
+        Tier 3: bilingual semantic search for a list of queries.
+        All queries are encoded in one forward pass and looked up in the vector index
+        together; the embeddings are L2-normalized, so the dot product is the cosine
+        similarity. Returns a list of (data index, score) pairs.
         """
+        query_embeddings = self._encode_queries(queries)
+        with SEARCH_SECONDS.time():
+            best_scores, best_rows = state.vector_index.search(query_embeddings, k=1)
+        # Map back from the bilingual corpus to the original data index
+        return [
+            (int(state.bilingual_index_map[row]), float(score))
+            for row, score in zip(best_rows[:, 0], best_scores[:, 0])
+        ]
+
+    def _semantic_search_batched(self, items):
+        """
+        MicroBatcher callback: `items` are (snapshot, query) pairs from concurrent requests.
+        Queries are grouped by snapshot (they differ only across a reload), so each caller
+        gets a data index into the snapshot it is building its response from.
+        """
+        by_state = {}
+        for pos, (state, query) in enumerate(items):
+            by_state.setdefault(id(state), (state, []))[1].append(pos)
+        results = [None] * len(items)
+        for state, positions in by_state.values():
+            matches = self._semantic_search(state, [items[pos][1] for pos in positions])
+            for pos, match in zip(positions, matches):
+                results[pos] = match
+        return results
+
+    def _semantic_match(self, state, query, priority=PRIORITY_ROUTINE):
+        """Tier 3 for a single query, through the micro-batcher (queued by `priority`) when it is enabled."""
+        if self.semantic_batcher is None:
+            return self._semantic_search(state, [query])[0]
+        return self.semantic_batcher.submit((state, query), priority).result()
+
+    def _encode_queries(self, queries):
+        """Encodes query strings into L2-normalized float32 embeddings with the configured backend."""
+        with ENCODE_SECONDS.time():
+            return self.query_encoder.encode(queries)
+
+    def evaluate_vector_index(self, queries):
+        """
+        Validates the active vector index against exact float32 brute-force search on
+        real query strings. Returns recall@1 (1.0 when that is already the active index).
+        """
+        state = self._semantic_state()
+        if isinstance(state.vector_index, BruteForceIndex) and state.vector_index.store.precision == 'float32':
+            return 1.0
+        query_embeddings = self._encode_queries(queries)
+        return recall_at_1(state.vector_index, BruteForceIndex(state.corpus_embeddings), query_embeddings)
+
+    def classify_priority(self, query, console=None):
+        """
+        Scheduling class of a request (see scheduling.py): PRIORITY_CRITICAL when it comes
+        from an operator `console` the caller has authenticated (see app.operator_console;
+        never a client-supplied name) and for queries that the exact tiers or the query
+        cache already resolve to a safety_critical command, else PRIORITY_ROUTINE.
+        Only dictionary lookups are made, so it is cheap enough to call before queueing.
+        Pass query=None to classify by console only (e.g. bulk requests).
+        """
+        priority = self._classify_priority(query, console)
+        PRIORITY_REQUESTS.labels(priority).inc()
+        return priority
+
+    def _classify_priority(self, query, console):
+        if console is not None:
+            return PRIORITY_CRITICAL
         if not query or not query.strip():
-            return None
+            return PRIORITY_ROUTINE
+        state = self._state
+        clean_query = self.normalize_text(query)
+        script = detect_script(query)
+        idx = self._match_exact_tamil(state, clean_query) if script != SCRIPT_LATIN else None
+        if idx is None and script in (SCRIPT_LATIN, SCRIPT_MIXED):
+            idx = self._match_exact_romanized(state, romanized_key(query))
+        if idx is None:
+            cached = self.query_cache.peek((state.data_hash, clean_query))
+            idx = cached[0] if cached is not None else None
+        if idx is not None and state.data[idx].get('safety_critical'):
+            return PRIORITY_CRITICAL
+        return PRIORITY_ROUTINE
 
+    def _match(self, query, priority=PRIORITY_ROUTINE):
+        """
+        Runs the tier cascade for one query. It prioritizes exact/fuzzy matches in Tamil
+        before falling back to semantic search. The script of the query picks the lexical
+        indexes: Tamil script uses the Tamil indexes, Latin script the romanized ones, and
+        mixed queries try both. Fuzzy and semantic results are cached per normalized query,
+        and concurrent identical queries are computed once (single flight).
+        `priority` orders the query in the micro-batcher if it reaches the semantic tier.
+        Returns (snapshot, (data index, tier, score)).
+        """
+        state = self._state
         clean_query = self.normalize_text(query)
+        script = detect_script(query)
+        romanized_query = romanized_key(query) if script in (SCRIPT_LATIN, SCRIPT_MIXED) else None
+
+        # 1. Direct normalized Tamil match (Highest Priority), or romanized for Tamil typed in Latin script
+        idx, tier = None, TIER_EXACT_TAMIL
+        if script != SCRIPT_LATIN:
+            idx = self._match_exact_tamil(state, clean_query)
+        if idx is None and romanized_query:
+            idx, tier = self._match_exact_romanized(state, romanized_query), TIER_EXACT_ROMANIZED
+        if idx is not None:
+            MATCHES.labels(tier).inc()
+            logger.debug("Found direct %s match for '%s' -> ID: %s", tier, query, state.data[idx]['id'])
+            # Exact matches get the top score of the fuzzy scale
+            return state, (idx, tier, 100.0)
+
+        # Repeated order: reuse the earlier fuzzy/semantic result without re-scoring
+        cache_key = (state.data_hash, clean_query)
+        cached = self.query_cache.get(cache_key)
+        if cached is not None:
+            idx, tier, score = cached
+            MATCHES.labels(tier).inc()
+            logger.debug("Cached %s match for '%s' (score: %.2f) -> ID: %s", tier, query, score, state.data[idx]['id'])
+            return state, cached
 
-        # 1. Direct normalized Tamil match (Highest Priority)
-        if clean_query in self.tamil_to_index:
-            idx = self.tamil_to_index[clean_query]
-            best_match_command = self.data[idx].copy()
-            best_match_command['original_query'] = query
-            print(f"Result: Found direct Tamil match for '{query}' -> ID: {best_match_command['id']}")
-            return best_match_command
-
-        # 2. Fuzzy Tamil match using rapidfuzz (Second Priority)
-        # We use a high threshold to avoid incorrect matches for short/dissimilar queries.
-        choices = list(self.tamil_to_index.keys())
-        if choices:
-            # The scorer `fuzz.ratio` works well for matching whole sentences.
-            match, score, _ = process.extractOne(clean_query, choices, scorer=fuzz.ratio)
-            if score > 85: # Using a higher threshold (e.g., 85) is safer for sentence matching
-                idx = self.tamil_to_index[match]
-                best_match_command = self.data[idx].copy()
-                best_match_command['original_query'] = query
-                print(f"Result: Found fuzzy Tamil match for '{query}' (score: {score:.2f}) -> ID: {best_match_command['id']}")
-                return best_match_command
+        # Identical queries already in flight (a canned order sent by many consoles at
+        # once) wait for that computation instead of repeating it. Flights are per
+        # priority class: the leader's call is queued at its own priority, so a critical
+        # request must never wait on a routine leader.
+        if self.single_flight is None:
+            return self._match_uncached(state, query, clean_query, script, romanized_query, priority)
+        (state, match), shared = self.single_flight.do(
+            (cache_key, priority), lambda: self._match_uncached(state, query, clean_query, script, romanized_query, priority))
+        if shared:
+            MATCHES.labels(match[1]).inc()
+            COALESCED_REQUESTS.inc()
+            logger.debug("Shared the in-flight %s match for '%s'", match[1], query)
+        return state, match
+
+    def _match_uncached(self, state, query, clean_query, script, romanized_query, priority):
+        """Fuzzy and semantic tiers of `_match`, for a query the exact tiers and the cache missed."""
+        cache_key = (state.data_hash, clean_query)
+
+        # 2. Fuzzy Tamil match using rapidfuzz (Second Priority), or fuzzy romanized
+        fuzzy_match, tier = None, TIER_FUZZY_TAMIL
+        if script != SCRIPT_LATIN:
+            fuzzy_match = self._match_fuzzy_tamil(state, clean_query)
+        if fuzzy_match is None and romanized_query:
+            fuzzy_match, tier = self._match_fuzzy_romanized(state, romanized_query), TIER_FUZZY_ROMANIZED
+        if fuzzy_match is not None:
+            idx, score = fuzzy_match
+            self.query_cache.put(cache_key, (idx, tier, score))
+            MATCHES.labels(tier).inc()
+            logger.debug("Found %s match for '%s' (score: %.2f) -> ID: %s", tier, query, score, state.data[idx]['id'])
+            return state, (idx, tier, score)
 
         # 3. Fallback to bilingual semantic search (Works for English, Tamil, and mixed queries)
-        print("No exact/fuzzy Tamil match found. Falling back to bilingual semantic search...")
-        query_embedding = self.model.encode(query, convert_to_tensor=True)
-
-        # Compute cosine similarities
-        cos_scores = util.cos_sim(query_embedding, self.corpus_embeddings)[0]
-
-        # Find the best match in the bilingual corpus
-        best_match_bilingual_idx = torch.argmax(cos_scores).item()
-        
-        # Map back to the original data index
-        best_match_idx = self.bilingual_index_map[best_match_bilingual_idx]
-        
-        best_match_command = self.data[best_match_idx].copy()
-        best_match_command['original_query'] = query
-        
-        score = cos_scores[best_match_bilingual_idx].item()
-        print(f"Result: Found semantic match for '{query}' (score: {score:.2f}) -> ID: {best_match_command['id']}")
-        
-        return best_match_command
\ No newline at end of file
+        logger.debug("No exact/fuzzy Tamil match found. Falling back to bilingual semantic search...")
+        state = self._semantic_state()
+        best_match_idx, score = self._semantic_match(state, query, priority)
+        self.query_cache.put(cache_key, (best_match_idx, TIER_SEMANTIC, score))
+        MATCHES.labels(TIER_SEMANTIC).inc()
+        logger.debug("Found semantic match for '%s' (score: %.2f) -> ID: %s",
+                     query, score, state.data[best_match_idx]['id'])
+        return state, (best_match_idx, TIER_SEMANTIC, score)
+
+    def predict(self, query: str, priority=PRIORITY_ROUTINE):
+        """
+        Finds the most similar command in the corpus to the user's query (see `_match`).
+        Returns a copy of the command with the query and match metadata added, or None
+        for an empty query. `priority` (see `classify_priority`) orders the query in the
+        micro-batcher.
+        Raises ModelWarmingUp if the query needs the semantic tier before it is ready.
+        """
+        if not query or not query.strip():
+            return None
+        state, match = self._match(query, priority)
+        return self._build_response(state, match, query)
+
+    def predict_json(self, query: str, priority=PRIORITY_ROUTINE):
+        """
+        Like `predict`, but returns the response as UTF-8 JSON bytes, spliced from the
+        command's pre-serialized body without copying or re-serializing the record.
+        """
+        if not query or not query.strip():
+            return None
+        state, match = self._match(query, priority)
+        with SERIALIZE_SECONDS.time():
+            return self._build_response_json(state, match, query)
+
+    def _match_batch(self, state, queries):
+        """
+        Runs the tier cascade for a list of queries against one snapshot. Exact lookups
+        and cache hits are resolved per query, each fuzzy index scores all remaining
+        queries of its script with one `process.cdist` call, and every query left over is
+        sent through a single encode call and scored in one matrix multiply.
+        Returns (snapshot, matches): matches are (data index, tier, score) tuples, or None
+        for empty queries, and index into the returned snapshot's data.
+        """
+        matches = [None] * len(queries)
+        cache_keys = {}
+        clean_queries, romanized_queries = {}, {}
+        tamil_positions, romanized_positions = [], []
+
+        for pos, query in enumerate(queries):
+            if not query or not query.strip():
+                continue
+            clean_query = self.normalize_text(query)
+            script = detect_script(query)
+            idx, tier = None, TIER_EXACT_TAMIL
+            if script != SCRIPT_LATIN:
+                idx = self._match_exact_tamil(state, clean_query)
+            if script in (SCRIPT_LATIN, SCRIPT_MIXED):
+                romanized_queries[pos] = romanized_key(query)
+                if idx is None:
+                    idx, tier = self._match_exact_romanized(state, romanized_queries[pos]), TIER_EXACT_ROMANIZED
+            if idx is not None:
+                # Exact matches get the top score of the fuzzy scale
+                matches[pos] = (idx, tier, 100.0)
+                continue
+            cache_keys[pos] = (state.data_hash, clean_query)
+            cached = self.query_cache.get(cache_keys[pos])
+            if cached is not None:
+                matches[pos] = cached
+            elif script == SCRIPT_LATIN:
+                romanized_positions.append(pos)
+            else:
+                clean_queries[pos] = clean_query
+                tamil_positions.append(pos)
+
+        # Mixed-script queries that miss the Tamil fuzzy index try the romanized one
+        semantic_positions = []
+        for positions, tier, index, keys in (
+            (tamil_positions, TIER_FUZZY_TAMIL, state.tamil_fuzzy_index, clean_queries),
+            (romanized_positions, TIER_FUZZY_ROMANIZED, state.romanized_fuzzy_index, romanized_queries),
+        ):
+            # An empty scan would only add a near-zero sample to the histogram
+            if not positions:
+                continue
+            with FUZZY_SCAN_SECONDS.time():
+                fuzzy_matches = index.match_batch([keys[pos] for pos in positions])
+            for pos, fuzzy_match in zip(positions, fuzzy_matches):
+                if fuzzy_match is not None:
+                    idx, score = fuzzy_match
+                    matches[pos] = (idx, tier, score)
+                    self.query_cache.put(cache_keys[pos], matches[pos])
+                elif tier == TIER_FUZZY_TAMIL and pos in romanized_queries:
+                    romanized_positions.append(pos)
+                else:
+                    semantic_positions.append(pos)
+
+        if semantic_positions:
+            if state.vector_index is None:
+                # Started before the semantic tier was live: wait for it, then rerun the
+                # whole batch on the complete snapshot so every index refers to one corpus
+                self._semantic_state()
+                return self._match_batch(self._state, queries)
+            semantic_matches = self._semantic_search(state, [queries[pos] for pos in semantic_positions])
+            for pos, (idx, score) in zip(semantic_positions, semantic_matches):
+                matches[pos] = (idx, TIER_SEMANTIC, score)
+                self.query_cache.put(cache_keys[pos], matches[pos])
+
+        for match in matches:
+            if match is not None:
+                MATCHES.labels(match[1]).inc()
+        logger.debug("Batch result: %d queries, %d resolved by semantic search.", len(queries), len(semantic_positions))
+        return state, matches
+
+    def match_batch(self, queries):
+        """
+        Like `predict_batch`, but returns (record, tier, score) per query instead of a
+        response, or None for empty queries. Records are shared; do not modify them.
+        Raises ModelWarmingUp if any query needs the semantic tier before it is ready.
+        """
+        state, matches = self._match_batch(self._state, queries)
+        return [None if match is None else (state.data[match[0]], match[1], match[2]) for match in matches]
+
+    def predict_batch(self, queries):
+        """
+        Batched version of `predict`, see `_match_batch` for how each tier is batched.
+        Returns a list aligned with `queries` (None for empty queries).
+        Raises ModelWarmingUp if any query needs the semantic tier before it is ready.
+        """
+        state, matches = self._match_batch(self._state, queries)
+        return [
+            None if match is None else self._build_response(state, match, query)
+            for query, match in zip(queries, matches)
+        ]
+
+    def predict_batch_json(self, queries):
+        """Batched `predict_json`: a list of JSON bytes aligned with `queries` (None for empty queries)."""
+        state, matches = self._match_batch(self._state, queries)
+        with SERIALIZE_SECONDS.time():
+            return [
+                None if match is None else self._build_response_json(state, match, query)
+                for query, match in zip(queries, matches)
+            ]
+
+    def split_plan(self, utterance):
+        """
+        Clauses of a chained order, in order (see segmentation.split_clauses). An utterance
+        that already matches a corpus command on an exact or fuzzy tier as a whole (e.g. a
+        Tamil command that contains 'மற்றும்') is kept as one clause.
+        """
+        clauses = split_clauses(utterance, PLAN_MIN_CLAUSE_WORDS, PLAN_MAX_CLAUSES)
+        if len(clauses) > 1 and self._match_lexical(self._state, utterance) is not None:
+            clauses = [utterance.strip()]
+        PLAN_CLAUSES.observe(len(clauses))
+        return clauses
+
+    def predict_plan(self, utterance):
+        """
+        Matches every clause of a chained order ("deploy drones to Marina Beach and airdrop
+        50 kits to Ennore") and returns {'original_query': utterance, 'plan': [...]}, one
+        `predict`-style response per clause in order, or None for an empty utterance.
+        The clauses go through `_match_batch` together, so all of them that reach the
+        semantic tier share one encode call.
+        Raises ModelWarmingUp if any clause needs the semantic tier before it is ready.
+        """
+        clauses = self.split_plan(utterance) if utterance else []
+        if not clauses:
+            return None
+        state, matches = self._match_batch(self._state, clauses)
+        return {
+            'original_query': utterance,
+            'plan': [self._build_response(state, match, clause) for clause, match in zip(clauses, matches)],
+        }
+
+    def predict_plan_json(self, utterance):
+        """`predict_plan` as UTF-8 JSON bytes, built from the pre-serialized command bodies."""
+        clauses = self.split_plan(utterance) if utterance else []
+        if not clauses:
+            return None
+        state, matches = self._match_batch(self._state, clauses)
+        with SERIALIZE_SECONDS.time():
+            steps = [self._build_response_json(state, match, clause) for clause, match in zip(clauses, matches)]
+            return b''.join((b'{"original_query": ', json.dumps(utterance, ensure_ascii=False).encode('utf-8'),
+                             b', "plan": [', b', '.join(steps), b']}'))
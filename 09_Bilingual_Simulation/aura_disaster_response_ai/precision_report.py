@@ -0,0 +1,123 @@
+"""
+Compares reduced-precision corpus storage (float16, int8) against float32 on the
+shipped dataset: top-1 agreement with float32, search latency and memory.
+
+    python precision_report.py                    # shipped corpus
+    python precision_report.py --scale 200000     # also time a synthetic 200k-vector corpus
+    python precision_report.py --json report.json
+
+Agreement is measured on query variants derived from every command (the English and
+Tamil sentences, a truncated English sentence and a reworded one), so it reflects
+near-tie behaviour and not just exact self-matches.
+"""
+import argparse
+import json
+import statistics
+import time
+
+import numpy as np
+
+from nlp_model import DisasterNLP
+from quantization import PRECISIONS
+from vector_index import BruteForceIndex
+
+
+def build_queries(data):
+    """Returns query strings derived from every command in the corpus."""
+    queries = []
+    for item in data:
+        words = item['english'].rstrip('.').split()
+        queries.append(item['english'])
+        queries.append(' '.join(words[:max(3, len(words) - 3)]))
+        queries.append('Please ' + item['english'][0].lower() + item['english'][1:])
+        if item.get('tamil'):
+            queries.append(item['tamil'])
+    return queries
+
+
+def perturbed_copies(embeddings, size, noise=0.3, seed=0):
+    """Returns `size` normalized, perturbed copies of the corpus rows, in corpus order."""
+    rng = np.random.default_rng(seed)
+    rows = np.arange(size) % len(embeddings)
+    copies = embeddings[rows] + rng.standard_normal((size, embeddings.shape[1])).astype(np.float32) * (noise / np.sqrt(embeddings.shape[1]))
+    copies /= np.linalg.norm(copies, axis=1, keepdims=True)
+    return copies.astype(np.float32), rows
+
+
+def time_search(index, queries, repeats):
+    """Returns (median ms per single-query search, median ms per batched search)."""
+    single, batched = [], []
+    for _ in range(repeats):
+        for query in queries[:32]:
+            start = time.perf_counter()
+            index.search(query[None, :], k=1)
+            single.append((time.perf_counter() - start) * 1000)
+        start = time.perf_counter()
+        index.search(queries, k=1)
+        batched.append((time.perf_counter() - start) * 1000)
+    return statistics.median(single), statistics.median(batched)
+
+
+def compare(embeddings, query_embeddings, index_map, repeats):
+    """Scores every precision against float32 brute force. Returns one row per precision."""
+    reference = BruteForceIndex(embeddings, 'float32')
+    _, reference_rows = reference.search(query_embeddings, k=1)
+    rows = []
+    for precision in PRECISIONS:
+        index = BruteForceIndex(embeddings, precision)
+        _, found_rows = index.search(query_embeddings, k=1)
+        single_ms, batch_ms = time_search(index, query_embeddings, repeats)
+        rows.append({
+            'precision': precision,
+            'corpus_vectors': len(embeddings),
+            'memory_mb': round(index.store.nbytes / 2**20, 3),
+            'top1_row_agreement': float(np.mean(found_rows[:, 0] == reference_rows[:, 0])),
+            'top1_command_agreement': float(np.mean(index_map[found_rows[:, 0]] == index_map[reference_rows[:, 0]])),
+            'single_query_ms': round(single_ms, 4),
+            'batch_ms': round(batch_ms, 4),
+            'batch_size': len(query_embeddings),
+        })
+    return rows
+
+
+def print_table(title, rows):
+    print(f"\n### {title}\n")
+    print("| precision | vectors | memory (MB) | top-1 agreement (row) | top-1 agreement (command) | single query (ms) | batch (ms) |")
+    print("|---|---|---|---|---|---|---|")
+    for row in rows:
+        print(f"| {row['precision']} | {row['corpus_vectors']} | {row['memory_mb']} | "
+              f"{row['top1_row_agreement']:.4f} | {row['top1_command_agreement']:.4f} | "
+              f"{row['single_query_ms']} | {row['batch_ms']} ({row['batch_size']} queries) |")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scale', type=int, default=0,
+                        help='also time a synthetic corpus of this many vectors (perturbed copies of the real ones)')
+    parser.add_argument('--repeats', type=int, default=20, help='timing repetitions')
+    parser.add_argument('--json', help='write the report to this JSON file as well')
+    args = parser.parse_args()
+
+    nlp = DisasterNLP()
+    embeddings = np.asarray(nlp.corpus_embeddings, dtype=np.float32)
+    index_map = np.asarray(nlp.bilingual_index_map)
+    queries = build_queries(nlp.data)
+    query_embeddings = nlp._encode_queries(queries)
+
+    report = {'dataset': compare(embeddings, query_embeddings, index_map, args.repeats)}
+    print_table(f"Shipped dataset ({len(nlp.data)} commands, {len(queries)} queries)", report['dataset'])
+
+    if args.scale:
+        synthetic, source_rows = perturbed_copies(embeddings, args.scale)
+        synthetic_map = index_map[source_rows]
+        report['synthetic'] = compare(synthetic, query_embeddings, synthetic_map, args.repeats)
+        print_table(f"Synthetic corpus ({args.scale} vectors)", report['synthetic'])
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nReport written to {args.json}")
+
+
+if __name__ == '__main__':
+    main()
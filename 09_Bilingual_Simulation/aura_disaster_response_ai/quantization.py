@@ -0,0 +1,97 @@
+import numpy as np
+
+PRECISIONS = ('float32', 'float16', 'int8')
+
+# Rows converted back to float32 at a time. Small enough that the upcast block stays
+# in CPU cache, so memory traffic is paid at the compact storage width.
+_BLOCK_ROWS = 8192
+
+
+class Float32Embeddings:
+    """Full-precision storage. Wraps the (possibly memory-mapped) array without copying."""
+
+    precision = 'float32'
+
+    def __init__(self, embeddings):
+        self.matrix = embeddings
+
+    def __len__(self):
+        return len(self.matrix)
+
+    @property
+    def nbytes(self):
+        return self.matrix.nbytes
+
+    def dot(self, queries, start=0, stop=None):
+        """Inner products of `queries` (n_queries, dim) with rows start:stop, as float32."""
+        return queries @ self.matrix[start:stop].T
+
+
+class Float16Embeddings:
+    """
+    Half-precision storage: half the memory of float32. Queries are cast to float16 and
+    scored with torch's half-precision CPU matmul, which reads the compact matrix directly
+    (NumPy has no fast float16 kernels and would have to upcast the whole corpus).
+    """
+
+    precision = 'float16'
+
+    def __init__(self, embeddings):
+        import torch  # only float16 storage needs torch; keeps startup of the other tiers light
+        self.matrix = torch.from_numpy(np.asarray(embeddings, dtype=np.float16))
+
+    def __len__(self):
+        return len(self.matrix)
+
+    @property
+    def nbytes(self):
+        return self.matrix.element_size() * self.matrix.nelement()
+
+    def dot(self, queries, start=0, stop=None):
+        half_queries = self.matrix.new_tensor(np.asarray(queries, dtype=np.float16))
+        return (half_queries @ self.matrix[start:stop].T).float().numpy()
+
+
+class Int8Embeddings:
+    """
+    Symmetric int8 storage with one float32 scale per vector: a quarter of the float32
+    memory. Each row is stored as round(x / scale) with scale = max|x| / 127, and a
+    query (kept in float32) is scored as (query . codes) * scale.
+    """
+
+    precision = 'int8'
+
+    def __init__(self, embeddings):
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        max_abs = np.max(np.abs(embeddings), axis=1) if len(embeddings) else np.zeros(0, dtype=np.float32)
+        self.scales = np.maximum(max_abs, 1e-12).astype(np.float32) / 127.0
+        self.codes = np.empty(embeddings.shape, dtype=np.int8)
+        for block in range(0, len(embeddings), _BLOCK_ROWS):
+            rows = slice(block, block + _BLOCK_ROWS)
+            self.codes[rows] = np.rint(embeddings[rows] / self.scales[rows, None])
+
+    def __len__(self):
+        return len(self.codes)
+
+    @property
+    def nbytes(self):
+        return self.codes.nbytes + self.scales.nbytes
+
+    def dot(self, queries, start=0, stop=None):
+        codes, scales = self.codes[start:stop], self.scales[start:stop]
+        scores = np.empty((len(queries), len(codes)), dtype=np.float32)
+        for block in range(0, len(codes), _BLOCK_ROWS):
+            rows = slice(block, block + _BLOCK_ROWS)
+            scores[:, rows] = (queries @ codes[rows].astype(np.float32).T) * scales[rows]
+        return scores
+
+
+def quantize_embeddings(embeddings, precision='float32'):
+    """Wraps L2-normalized embeddings in the storage class for `precision`."""
+    if precision == 'float32':
+        return Float32Embeddings(embeddings)
+    if precision == 'float16':
+        return Float16Embeddings(embeddings)
+    if precision == 'int8':
+        return Int8Embeddings(embeddings)
+    raise ValueError(f"Unknown embedding precision '{precision}' (expected one of {', '.join(PRECISIONS)}).")
@@ -0,0 +1,84 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class QueryResultCache:
+    """
+    Bounded, thread-safe LRU cache with a time-to-live, used in front of `DisasterNLP.predict`.
+
+    Keys are normalized query strings and values are small match descriptors
+    (data index, tier, score), never response objects, so a hit costs one dict lookup
+    and cannot leak state between requests. A `max_size` of 0 disables the cache.
+    """
+
+    def __init__(self, max_size=1024, ttl_seconds=3600):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key):
+        """Returns the cached value for `key`, or None on a miss."""
+        if self.max_size <= 0:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value = entry
+            if self.ttl_seconds and expires_at < time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def peek(self, key):
+        """Returns the cached value for `key` or None, without counting a lookup or refreshing its recency."""
+        if self.max_size <= 0:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None or (self.ttl_seconds and entry[0] < time.monotonic()):
+            return None
+        return entry[1]
+
+    def put(self, key, value):
+        """Stores `value` under `key`, evicting the least recently used entry when full."""
+        if self.max_size <= 0:
+            return
+        expires_at = time.monotonic() + self.ttl_seconds if self.ttl_seconds else None
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """Drops every entry (e.g. after the corpus changes). Statistics are kept."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Returns a snapshot of the cache counters."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'ttl_seconds': self.ttl_seconds,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
@@ -0,0 +1,86 @@
+"""
+Priority classes for work waiting on the matching threads and the encoder, and the
+queue that orders it.
+"""
+import collections
+import threading
+import time
+
+# Priority classes, most urgent first
+PRIORITY_CRITICAL = 'critical'  # operator consoles and safety-critical commands
+PRIORITY_ROUTINE = 'routine'
+PRIORITIES = (PRIORITY_CRITICAL, PRIORITY_ROUTINE)
+
+
+class PriorityWorkQueue:
+    """
+    Thread-safe queue with one FIFO per priority class. `get` takes from the most
+    urgent non-empty class, except that an item that has waited longer than
+    `max_wait_seconds` is served first whatever its class (oldest first), so a steady
+    stream of critical work cannot starve routine work indefinitely.
+    """
+
+    def __init__(self, priorities=PRIORITIES, max_wait_seconds=0.2):
+        self.priorities = tuple(priorities)
+        self.max_wait_seconds = max_wait_seconds
+        self._queues = {priority: collections.deque() for priority in self.priorities}
+        self._not_empty = threading.Condition()
+        self._size = 0
+        self._served = collections.Counter()
+        self._aged = collections.Counter()
+
+    def put(self, item, priority=PRIORITY_ROUTINE):
+        if priority not in self._queues:
+            priority = self.priorities[-1]
+        with self._not_empty:
+            self._queues[priority].append((time.perf_counter(), item))
+            self._size += 1
+            self._not_empty.notify()
+
+    def get(self, timeout=None):
+        """Removes and returns the next item, blocking up to `timeout` seconds (None: forever). Raises TimeoutError."""
+        with self._not_empty:
+            if not self._not_empty.wait_for(lambda: self._size, timeout):
+                raise TimeoutError
+            return self._pop()
+
+    def get_nowait(self):
+        """The next item, or raises TimeoutError when the queue is empty."""
+        return self.get(timeout=0)
+
+    def _pop(self):
+        now = time.perf_counter()
+        overdue = [
+            (queue[0][0], priority) for priority, queue in self._queues.items()
+            if queue and now - queue[0][0] > self.max_wait_seconds
+        ]
+        if overdue:
+            _, priority = min(overdue)
+            if priority != self.priorities[0]:
+                self._aged[priority] += 1
+        else:
+            priority = next(priority for priority in self.priorities if self._queues[priority])
+        self._size -= 1
+        self._served[priority] += 1
+        return self._queues[priority].popleft()[1]
+
+    def qsize(self):
+        with self._not_empty:
+            return self._size
+
+    def depths(self):
+        """Items waiting in each priority class."""
+        with self._not_empty:
+            return {priority: len(queue) for priority, queue in self._queues.items()}
+
+    def stats(self):
+        """Per-class depth, items served and items served early because they had waited too long."""
+        with self._not_empty:
+            return {
+                priority: {
+                    'queued': len(self._queues[priority]),
+                    'served': self._served[priority],
+                    'aged': self._aged[priority],
+                }
+                for priority in self.priorities
+            }
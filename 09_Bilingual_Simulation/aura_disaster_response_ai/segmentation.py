@@ -0,0 +1,87 @@
+"""
+Splits a chained order ("deploy drones to Marina Beach and airdrop 50 kits to Ennore")
+into its clauses, in order, at sentence ends and at English, Tamil and romanized Tamil
+conjunctions and sequencing words.
+"""
+import re
+
+# Connectors as tuples of casefolded words, longest first so 'and then' wins over 'and'
+_ENGLISH_CONNECTORS = sorted((
+    ('and',), ('then',), ('also',), ('and', 'then'), ('and', 'also'), ('after', 'that'),
+    ('afterwards',), ('followed', 'by'), ('subsequently',),
+), key=len, reverse=True)
+# Tamil ones also mean "after"/"and" between nouns ('வெள்ளம் வடிந்த பிறகு', 'நெய்வேலி மற்றும்
+# சென்னை'), so they only split after an imperative verb (e.g. 'அனுப்பவும்').
+_TAMIL_CONNECTORS = sorted((
+    ('மற்றும்',), ('பின்னர்',), ('பிறகு',), ('அதன்', 'பிறகு'), ('அதன்பிறகு',), ('அப்புறம்',),
+    ('அடுத்து',), ('அடுத்ததாக',), ('மேலும்',),
+    ('matrum',), ('marrum',), ('pinnar',), ('piragu',), ('piraku',), ('adhan', 'piragu'),
+    ('athan', 'piragu'), ('appuram',), ('apram',), ('aduthu',), ('aduththu',), ('melum',),
+), key=len, reverse=True)
+_TAMIL_IMPERATIVE = re.compile(r'(வும்|ங்கள்|vum|ungal|ngal)$')
+
+_SENTENCE_END = re.compile(r'[.;!?।]$')
+_EDGE_PUNCTUATION = '.,;:!?।"\'()'
+_WORD = re.compile(r'\w')
+
+
+def _key(token):
+    return token.strip(_EDGE_PUNCTUATION).casefold()
+
+
+def _connector_length(tokens, i):
+    """Number of tokens of the connector starting at tokens[i], or 0."""
+    keys = tuple(_key(token) for token in tokens[i:i + 3])
+    for connector in _ENGLISH_CONNECTORS:
+        if keys[:len(connector)] == connector:
+            return len(connector)
+    if i and _TAMIL_IMPERATIVE.search(_key(tokens[i - 1])):
+        for connector in _TAMIL_CONNECTORS:
+            if keys[:len(connector)] == connector:
+                return len(connector)
+    return 0
+
+
+def _word_count(tokens):
+    return sum(1 for token in tokens if _WORD.search(token))
+
+
+def split_clauses(text, min_words=3, max_clauses=8):
+    """
+    Returns the clauses of `text` in order. A split is only kept when the clauses on both
+    sides have at least `min_words` words, so 'search and rescue' or 'between Chromepet
+    and Tambaram' stay whole; shorter pieces are joined back with their connector.
+    Clauses beyond `max_clauses` are joined into the last one. Text without a split is
+    returned as a single clause, unchanged apart from surrounding whitespace.
+    """
+    tokens = text.split()
+    pieces = []  # (connector tokens, clause tokens)
+    connector, clause = [], []
+    i = 0
+    while i < len(tokens):
+        length = _connector_length(tokens, i)
+        if length:
+            if clause:
+                pieces.append((connector, clause))
+                connector, clause = [], []
+            connector = connector + tokens[i:i + length]
+            i += length
+            continue
+        clause.append(tokens[i])
+        if _SENTENCE_END.search(tokens[i]):
+            pieces.append((connector, clause))
+            connector, clause = [], []
+        i += 1
+    if clause or connector:
+        pieces.append((connector, clause))
+
+    clauses = []
+    for connector, clause in pieces:
+        if clauses and (_word_count(clause) < min_words or _word_count(clauses[-1]) < min_words
+                        or len(clauses) == max_clauses):
+            clauses[-1] = clauses[-1] + connector + clause
+        elif clause:
+            clauses.append(list(clause))
+    if len(clauses) <= 1:
+        return [text.strip()] if text.strip() else []
+    return [' '.join(clause).strip(',;: ') for clause in clauses]
@@ -0,0 +1,44 @@
+import threading
+from concurrent.futures import Future
+
+
+class SingleFlight:
+    """
+    Collapses concurrent calls for the same key into one. The first caller for a key runs
+    the function; callers arriving while it is still running wait for it and receive the
+    same result (or exception). Nothing is kept once the call completes, so unlike a cache
+    it never serves a stale result.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.executed = 0
+        self.collapsed = 0
+
+    def do(self, key, function):
+        """Returns (function's result, shared): shared is True if another caller computed it."""
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+                self.executed += 1
+            else:
+                self.collapsed += 1
+        if not leader:
+            return future.result(), True
+        try:
+            result = function()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+        future.set_result(result)
+        return result, False
+
+    def stats(self):
+        with self._lock:
+            return {'in_flight': len(self._calls), 'executed': self.executed, 'collapsed': self.collapsed}
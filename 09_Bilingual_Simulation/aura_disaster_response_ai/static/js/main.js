@@ -33,6 +33,40 @@ document.addEventListener('DOMContentLoaded', function() {
     let pendingCommand = null, activeLayers = [];
     const logMessage = (msg, type='info') => { const e=document.createElement('div'); e.className=`log-entry log-${type}`; e.textContent=`[${new Date().toLocaleTimeString()}] ${msg}`; commandLog.prepend(e); };
 
+    // --- PUSH CHANNEL (asgi.py /ws): every console of an operation sees the same results ---
+    // Open the page as /?operation=<id>&console=<id>; without /ws (app.py, serve.py threads) commands go over HTTP.
+    const pageParams = new URLSearchParams(window.location.search);
+    const OPERATION_ID = pageParams.get('operation') || 'default';
+    const CONSOLE_ID = pageParams.get('console') || `console-${Math.random().toString(36).slice(2, 8)}`;
+    const OPERATOR_TOKEN = pageParams.get('token'); // Operator consoles only (AURA_PRIORITY_CONSOLE_TOKENS)
+    let socket = null, pushChannelSeen = false, reconnectDelayMs = 1000, nextRef = 0;
+    function connectPushChannel() {
+        const scheme = window.location.protocol === 'https:' ? 'wss' : 'ws';
+        const tokenParam = OPERATOR_TOKEN ? `&token=${encodeURIComponent(OPERATOR_TOKEN)}` : '';
+        const ws = new WebSocket(`${scheme}://${window.location.host}/ws?operation=${encodeURIComponent(OPERATION_ID)}&console=${encodeURIComponent(CONSOLE_ID)}${tokenParam}`);
+        ws.onopen = () => { socket = ws; pushChannelSeen = true; reconnectDelayMs = 1000; logMessage(`Joined operation "${OPERATION_ID}" as ${CONSOLE_ID}.`); };
+        ws.onmessage = (event) => handlePushMessage(JSON.parse(event.data));
+        ws.onclose = () => {
+            if (socket === ws) { socket = null; logMessage('Push channel lost, reconnecting...', 'critical'); }
+            if (!pushChannelSeen) return; // The server has no /ws: stay on HTTP
+            setTimeout(connectPushChannel, reconnectDelayMs);
+            reconnectDelayMs = Math.min(reconnectDelayMs * 2, 30000);
+        };
+    }
+    function handlePushMessage(message) {
+        const fromThisConsole = message.console === CONSOLE_ID;
+        if (message.type === 'result') {
+            if (!fromThisConsole) { logMessage(`${message.console} issued: "${message.result.english}"`); clearMap(); }
+            showCommandResult(message.result, fromThisConsole, message.console);
+        } else if (message.type === 'visualization') {
+            if (!fromThisConsole) { logMessage(`${message.console} confirmed: ${message.command.intent}`, 'info'); clearMap(); }
+            displayParsedOutput(message.command);
+            executeAction(message.command);
+        } else if (message.type === 'error') {
+            logMessage(`Error: ${message.error}`, 'critical');
+        }
+    }
+
     // --- NLP & ACTION HANDLING ---
     async function processCommand() {
         const text = commandInput.value.trim();
@@ -40,20 +74,31 @@ document.addEventListener('DOMContentLoaded', function() {
         logMessage(`Processing command: "${text}"`);
         parsedOutputSection.classList.add('hidden');
         clearMap();
+        if (socket && socket.readyState === WebSocket.OPEN) {
+            // The result comes back through handlePushMessage, to every console of the operation
+            socket.send(JSON.stringify({ type: 'command', text: text, ref: ++nextRef }));
+            return;
+        }
         try {
-            const response = await fetch('/process_command', { method: 'POST', headers: { 'Content-Type': 'application/json' }, body: JSON.stringify({ text: text }) });
+            const headers = { 'Content-Type': 'application/json' };
+            if (OPERATOR_TOKEN) headers['X-Operator-Token'] = OPERATOR_TOKEN;
+            const response = await fetch('/process_command', { method: 'POST', headers: headers, body: JSON.stringify({ text: text }) });
             if (!response.ok) throw new Error(`Server error: ${response.statusText}`);
-            const data = await response.json();
-            displayParsedOutput(data);
-            if (data.confirmation_required) {
-                pendingCommand = data;
-                document.getElementById('confirmation-text').textContent = `Matched command: "${data.english}". This is a safety-critical operation. Please confirm.`;
-                confirmationDialog.classList.remove('hidden');
-            } else {
-                executeAction(data);
-            }
+            showCommandResult(await response.json(), true);
         } catch (error) { logMessage(`Error: ${error.message}`, 'critical'); }
     }
+    function showCommandResult(data, fromThisConsole, sender) {
+        displayParsedOutput(data);
+        if (data.confirmation_required) {
+            // Only the console that issued a safety-critical command can confirm it
+            if (!fromThisConsole) { logMessage(`Awaiting confirmation from ${sender}.`, 'info'); return; }
+            pendingCommand = data;
+            document.getElementById('confirmation-text').textContent = `Matched command: "${data.english}". This is a safety-critical operation. Please confirm.`;
+            confirmationDialog.classList.remove('hidden');
+        } else {
+            executeAction(data);
+        }
+    }
     const displayParsedOutput = data => { outputIntent.textContent = data.intent; outputSafety.innerHTML = data.safety_critical ? '<span style="color: #e94560; font-weight: bold;">YES</span>' : 'No'; outputParams.textContent = JSON.stringify(data.parameters, null, 2); parsedOutputSection.classList.remove('hidden'); };
 
     // --- VISUALIZATION & ANIMATION ENGINE ---
@@ -173,6 +218,7 @@ document.addEventListener('DOMContentLoaded', function() {
     async function fetchAndSetExample(){try{const r=await fetch('/process_command',{method:'POST',headers:{'Content-Type':'application/json'},body:JSON.stringify({text:'get_example'})});const e=await r.json();if(e.english){exampleLink.textContent=`"${e.english}"`;exampleLink.onclick=(ev)=>{ev.preventDefault();commandInput.value=e.english;fetchAndSetExample();};}}catch(err){console.error(err);}}
     
     // --- EVENT LISTENERS ---
-    processBtn.addEventListener('click', processCommand); commandInput.addEventListener('keydown',(e)=>e.key==='Enter'&&processCommand()); confirmBtn.addEventListener('click',()=>{if(pendingCommand)executeAction(pendingCommand);confirmationDialog.classList.add('hidden');pendingCommand=null;}); cancelBtn.addEventListener('click',()=>{logMessage(`Action cancelled by operator: ${pendingCommand?.intent}`,'info');confirmationDialog.classList.add('hidden');pendingCommand=null;});
+    processBtn.addEventListener('click', processCommand); commandInput.addEventListener('keydown',(e)=>e.key==='Enter'&&processCommand()); confirmBtn.addEventListener('click',()=>{if(pendingCommand){if(socket&&socket.readyState===WebSocket.OPEN)socket.send(JSON.stringify({type:'execute',id:pendingCommand.id,ref:++nextRef}));else executeAction(pendingCommand);}confirmationDialog.classList.add('hidden');pendingCommand=null;}); cancelBtn.addEventListener('click',()=>{logMessage(`Action cancelled by operator: ${pendingCommand?.intent}`,'info');confirmationDialog.classList.add('hidden');pendingCommand=null;});
     fetchAndSetExample();
+    connectPushChannel();
 });
\ No newline at end of file
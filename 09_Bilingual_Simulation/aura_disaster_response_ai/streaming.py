@@ -0,0 +1,134 @@
+import json
+import logging
+import queue
+import threading
+
+from metrics import SERIALIZE_SECONDS
+from nlp_model import ModelWarmingUp
+
+# Markers passed from the reader thread to the matcher alongside the raw lines
+_END = object()
+_TOO_LONG = object()
+
+logger = logging.getLogger(__name__)
+
+
+def parse_line(raw):
+    """
+    Parses one line of the ingest stream. A line is either plain text, a JSON string or a
+    JSON object {"text": ..., "ref": ...} where `ref` is an optional client reference that
+    is echoed back. Returns (text, ref) or raises ValueError.
+    """
+    line = raw.decode('utf-8').strip()
+    if not line.startswith(('{', '"')):
+        return line, None
+    item = json.loads(line)
+    if isinstance(item, str):
+        return item, None
+    if not isinstance(item, dict) or not isinstance(item.get('text', ''), str):
+        raise ValueError('expected an object with a "text" string')
+    return item.get('text', ''), item.get('ref')
+
+
+def _read_lines(stream, lines, stop, max_line_bytes):
+    """Reader thread: pushes raw lines into the bounded `lines` queue until EOF or `stop`."""
+
+    def put(item):
+        # Blocks while the matcher is behind (back-pressure), but gives up once it has stopped
+        while not stop.is_set():
+            try:
+                lines.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    try:
+        while not stop.is_set():
+            line = stream.readline(max_line_bytes + 1)
+            if not line:
+                break
+            if len(line) > max_line_bytes and not line.endswith(b'\n'):
+                # Skip the rest of an oversized line instead of buffering it
+                while line and not line.endswith(b'\n'):
+                    line = stream.readline(max_line_bytes + 1)
+                line = _TOO_LONG
+            elif not line.strip():
+                continue
+            if not put(line):
+                return
+    except Exception as e:
+        logger.error("Error reading command stream: %s", e)
+    put(_END)
+
+
+def stream_results(nlp, stream, batch_size=32, max_line_bytes=8192):
+    """
+    Matches utterances read line by line from `stream` (a binary file object, e.g. a
+    chunked request body) and yields one NDJSON result line per utterance, in order.
+
+    A reader thread feeds a bounded queue, so memory stays constant however long the
+    stream is. Whatever has arrived when the matcher is free (up to `batch_size` lines)
+    is matched with one `predict_batch_json` call, so results follow their utterances
+    closely on a slow feed and are batched on a fast one.
+    """
+    lines = queue.Queue(maxsize=batch_size * 4)
+    stop = threading.Event()
+    reader = threading.Thread(target=_read_lines, args=(stream, lines, stop, max_line_bytes),
+                              name='stream-reader', daemon=True)
+    reader.start()
+    seq = 0
+    try:
+        finished = False
+        while not finished:
+            batch = [lines.get()]
+            while len(batch) < batch_size and batch[-1] is not _END:
+                try:
+                    batch.append(lines.get_nowait())
+                except queue.Empty:
+                    break
+            if batch[-1] is _END:
+                finished = True
+                batch.pop()
+
+            outputs, results, texts, positions = [], [], [], []
+            for raw in batch:
+                output = {'seq': seq}
+                seq += 1
+                try:
+                    if raw is _TOO_LONG:
+                        raise ValueError(f'line longer than {max_line_bytes} bytes')
+                    text, ref = parse_line(raw)
+                    if ref is not None:
+                        output['ref'] = ref
+                    positions.append(len(outputs))
+                    texts.append(text)
+                except ValueError as e:
+                    output['error'] = f'Could not parse line: {e}'
+                outputs.append(output)
+                results.append(None)
+
+            try:
+                bodies = nlp.predict_batch_json(texts) if texts else []
+                for pos, body in zip(positions, bodies):
+                    if body is None:
+                        outputs[pos]['error'] = 'Could not process empty command'
+                    else:
+                        results[pos] = body
+            except ModelWarmingUp as e:
+                for pos in positions:
+                    outputs[pos]['error'] = f'warming up: {e}'
+
+            # Results are pre-serialized JSON bytes and are spliced into their output line
+            with SERIALIZE_SECONDS.time():
+                lines_out = []
+                for output, body in zip(outputs, results):
+                    line = json.dumps(output, ensure_ascii=False).encode('utf-8')
+                    if body is not None:
+                        line = line[:-1] + b', "result": ' + body + b'}'
+                    lines_out.append(line + b'\n')
+                chunk = b''.join(lines_out)
+            yield chunk
+    finally:
+        # Also reached when the client disconnects: let the reader thread exit
+        stop.set()
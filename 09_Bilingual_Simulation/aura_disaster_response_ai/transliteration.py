@@ -0,0 +1,96 @@
+"""
+Romanized Tamil ("Tanglish") support: script detection, a rule-based Tamil-to-Latin
+transliteration and a phonetic folding that maps the many ways people spell Tamil in
+Latin script onto one lookup key.
+"""
+import re
+
+SCRIPT_TAMIL = 'tamil'
+SCRIPT_LATIN = 'latin'
+SCRIPT_MIXED = 'mixed'
+SCRIPT_NONE = 'none'  # digits, punctuation or other scripts only
+
+_TAMIL_LETTER = re.compile(r'[஀-௿]')
+_LATIN_LETTER = re.compile(r'[A-Za-z]')
+
+_VOWELS = {
+    'அ': 'a', 'ஆ': 'aa', 'இ': 'i', 'ஈ': 'ee', 'உ': 'u', 'ஊ': 'oo',
+    'எ': 'e', 'ஏ': 'e', 'ஐ': 'ai', 'ஒ': 'o', 'ஓ': 'o', 'ஔ': 'au', 'ஃ': 'h',
+}
+_CONSONANTS = {
+    'க': 'k', 'ங': 'ng', 'ச': 'ch', 'ஞ': 'nj', 'ட': 'd', 'ண': 'n', 'த': 'th', 'ந': 'n',
+    'ப': 'p', 'ம': 'm', 'ய': 'y', 'ர': 'r', 'ல': 'l', 'வ': 'v', 'ழ': 'zh', 'ள': 'l',
+    'ற': 'r', 'ன': 'n', 'ஜ': 'j', 'ஷ': 'sh', 'ஸ': 's', 'ஹ': 'h',
+}
+_VOWEL_SIGNS = {
+    'ா': 'aa', 'ி': 'i', 'ீ': 'ee', 'ு': 'u', 'ூ': 'oo', 'ெ': 'e', 'ே': 'e', 'ை': 'ai',
+    'ொ': 'o', 'ோ': 'o', 'ௌ': 'au', 'ௗ': 'au',
+}
+_VIRAMA = '்'
+
+# Spelling variants folded onto one form, applied in order to lowercase Latin text.
+# Tamil script does not distinguish voiced and unvoiced stops (க is k or g, ப is p or
+# b), and aspirated spellings (th, dh) or long-vowel doublings are a matter of taste.
+_FOLDS = (
+    ('ee', 'i'), ('ii', 'i'), ('oo', 'u'), ('uu', 'u'),
+    ('zh', 'l'), ('sh', 's'), ('ch', 's'), ('th', 't'), ('dh', 't'), ('kh', 'k'), ('gh', 'k'),
+    ('bh', 'p'), ('ph', 'p'), ('ng', 'n'), ('nj', 'n'), ('ny', 'n'),
+)
+_LETTER_FOLDS = str.maketrans({'g': 'k', 'c': 's', 'j': 's', 'd': 't', 'b': 'p', 'f': 'p',
+                               'q': 'k', 'w': 'v', 'z': 's', 'x': 'ks'})
+
+
+def detect_script(text):
+    """Returns SCRIPT_TAMIL, SCRIPT_LATIN or SCRIPT_MIXED by the letters in `text`, or SCRIPT_NONE."""
+    tamil = _TAMIL_LETTER.search(text) is not None
+    latin = _LATIN_LETTER.search(text) is not None
+    if tamil and latin:
+        return SCRIPT_MIXED
+    if tamil:
+        return SCRIPT_TAMIL
+    return SCRIPT_LATIN if latin else SCRIPT_NONE
+
+
+def romanize(text):
+    """
+    Transliterates the Tamil characters of `text` into Latin script the way they are
+    commonly typed (e.g. 'வெள்ளம்' -> 'vellam'). Other characters are kept as they are.
+    """
+    out = []
+    i = 0
+    while i < len(text):
+        char = text[i]
+        if char in _CONSONANTS:
+            following = text[i + 1] if i + 1 < len(text) else ''
+            out.append(_CONSONANTS[char])
+            if following == _VIRAMA:
+                i += 1
+            elif following in _VOWEL_SIGNS:
+                out.append(_VOWEL_SIGNS[following])
+                i += 1
+            else:
+                out.append('a')  # inherent vowel
+        elif char in _VOWELS:
+            out.append(_VOWELS[char])
+        elif char not in _VOWEL_SIGNS and char != _VIRAMA:
+            out.append(char)
+        i += 1
+    return ''.join(out)
+
+
+def fold_romanized(text):
+    """
+    Lookup key for romanized Tamil: lowercase letters and digits only, with spelling
+    variants folded (see _FOLDS) and repeated letters collapsed, so 'Vellam', 'velam'
+    and 'vellaam' share a key. Apply it to `romanize`d text.
+    """
+    key = re.sub(r'[\W_]+', '', text).casefold()
+    for variant, folded in _FOLDS:
+        key = key.replace(variant, folded)
+    key = key.translate(_LETTER_FOLDS)
+    return re.sub(r'(.)\1+', r'\1', key)
+
+
+def romanized_key(text):
+    """Romanizes `text` (a Tamil, Latin or mixed string) and folds it into a lookup key."""
+    return fold_romanized(romanize(text))
@@ -0,0 +1,286 @@
+import logging
+import time
+
+import numpy as np
+
+from quantization import quantize_embeddings
+
+logger = logging.getLogger(__name__)
+
+
+def _top_k(scores, k):
+    """Returns (top scores, top columns) for each row of a score matrix, best first."""
+    k = min(k, scores.shape[1])
+    if k == scores.shape[1]:
+        cols = np.argsort(-scores, axis=1)
+    else:
+        cols = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        order = np.argsort(-np.take_along_axis(scores, cols, axis=1), axis=1)
+        cols = np.take_along_axis(cols, order, axis=1)
+    return np.take_along_axis(scores, cols, axis=1), cols
+
+
+def _spherical_kmeans(sample, k, iterations, rng):
+    """Returns `k` L2-normalized centroids of the normalized rows of `sample`."""
+    centroids = sample[rng.choice(len(sample), k, replace=False)].copy()
+    for _ in range(iterations):
+        assignments = np.argmax(sample @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignments, sample)
+        counts = np.bincount(assignments, minlength=k)
+        empty = counts == 0
+        if empty.any():
+            # Re-seed empty cells with random sample points
+            sums[empty] = sample[rng.choice(len(sample), int(empty.sum()))]
+        norms = np.linalg.norm(sums, axis=1, keepdims=True)
+        centroids = sums / np.maximum(norms, 1e-12)
+    return centroids.astype(np.float32)
+
+
+class BruteForceIndex:
+    """
+    Exact inner-product search over the whole corpus.
+    The corpus embeddings are L2-normalized, so the inner product is the cosine similarity.
+    This is the default for small corpora and, in float32, the reference used to validate
+    approximate indexes and reduced-precision storage.
+    """
+
+    name = 'brute_force'
+
+    def __init__(self, embeddings, precision='float32'):
+        self.store = quantize_embeddings(embeddings, precision)
+
+    def __len__(self):
+        return len(self.store)
+
+    def search(self, queries, k=1):
+        """Returns (scores, rows), both shaped (len(queries), k)."""
+        return _top_k(self.store.dot(queries), k)
+
+
+class IVFIndex:
+    """
+    Inverted-file (IVF) approximate index in pure NumPy.
+
+    A spherical k-means coarse quantizer splits the corpus into `nlist` cells. A query
+    is compared with the cell centroids first and then only with the vectors of its
+    `nprobe` closest cells, so a search touches roughly nprobe/nlist of the corpus.
+    Vectors are stored grouped by cell so each probed cell is one contiguous slice.
+    """
+
+    name = 'ivf'
+
+    def __init__(self, embeddings, nlist=0, nprobe=8, kmeans_iterations=10, seed=0, centroids=None,
+                 precision='float32'):
+        """Passing `centroids` (e.g. from a previous index) skips k-means training."""
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        num_vectors = len(embeddings)
+        if centroids is not None:
+            nlist = len(centroids)
+        elif nlist <= 0:
+            nlist = int(4 * np.sqrt(num_vectors))
+        self.nlist = max(1, min(nlist, num_vectors))
+        self.nprobe = max(1, min(nprobe, self.nlist))
+
+        if centroids is not None and len(centroids) == self.nlist:
+            self.centroids = np.asarray(centroids, dtype=np.float32)
+        else:
+            rng = np.random.default_rng(seed)
+            self.centroids = self._train_centroids(embeddings, kmeans_iterations, rng)
+        assignments = self._assign(embeddings)
+
+        # Group the vectors by cell: cell c owns rows offsets[c]:offsets[c + 1]
+        order = np.argsort(assignments, kind='stable')
+        self.ids = order.astype(np.int64)
+        self.vectors = quantize_embeddings(embeddings[order], precision)
+        counts = np.bincount(assignments, minlength=self.nlist)
+        self.offsets = np.concatenate(([0], np.cumsum(counts)))
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _assign(self, vectors, chunk_size=8192):
+        """Returns the index of the closest centroid for every vector."""
+        assignments = np.empty(len(vectors), dtype=np.int64)
+        for start in range(0, len(vectors), chunk_size):
+            chunk = vectors[start:start + chunk_size]
+            assignments[start:start + chunk_size] = np.argmax(chunk @ self.centroids.T, axis=1)
+        return assignments
+
+    def _train_centroids(self, embeddings, iterations, rng):
+        """Spherical k-means on a sample of the corpus."""
+        sample_size = min(len(embeddings), self.nlist * 32)
+        sample = embeddings[rng.choice(len(embeddings), sample_size, replace=False)]
+        return _spherical_kmeans(sample, self.nlist, iterations, rng)
+
+    def search(self, queries, k=1):
+        """Returns (scores, rows), both shaped (len(queries), k). Rows are corpus rows."""
+        _, probes = _top_k(queries @ self.centroids.T, self.nprobe)
+        all_scores = np.full((len(queries), k), -np.inf, dtype=np.float32)
+        all_rows = np.zeros((len(queries), k), dtype=np.int64)
+
+        for qi, query in enumerate(queries):
+            slices = [(self.offsets[c], self.offsets[c + 1]) for c in probes[qi]]
+            candidate_ids = np.concatenate([self.ids[start:stop] for start, stop in slices])
+            if len(candidate_ids) == 0:
+                continue
+            candidate_scores = np.concatenate([self.vectors.dot(query[None, :], start, stop)[0] for start, stop in slices])
+            top_scores, top_cols = _top_k(candidate_scores[None, :], k)
+            found = top_scores.shape[1]
+            all_scores[qi, :found] = top_scores[0]
+            all_rows[qi, :found] = candidate_ids[top_cols[0]]
+        return all_scores, all_rows
+
+
+class IntentIndex:
+    """
+    Two-stage search that routes each query through the command intents.
+
+    Every intent gets `centroids_per_intent` centroids (spherical k-means over its own
+    sentences). A query is compared with all centroids first; an intent scores as its
+    best centroid, and only the sentences of the `top_k` best intents are scored. When
+    the best excluded intent scores within `min_margin` of the best intent, routing is
+    ambiguous and the query falls back to a full search.
+    Vectors are stored grouped by intent so each selected intent is one contiguous slice.
+    """
+
+    name = 'intent'
+
+    def __init__(self, embeddings, labels, top_k=2, centroids_per_intent=1, min_margin=0.05,
+                 kmeans_iterations=10, seed=0, precision='float32'):
+        """`labels` holds the intent of every corpus row."""
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        self.intents, assignments = np.unique(np.asarray(labels), return_inverse=True)
+        self.top_k = max(1, min(top_k, len(self.intents)))
+        self.min_margin = min_margin
+
+        # Group the vectors by intent: intent i owns rows offsets[i]:offsets[i + 1]
+        order = np.argsort(assignments, kind='stable')
+        self.ids = order.astype(np.int64)
+        self.vectors = quantize_embeddings(embeddings[order], precision)
+        counts = np.bincount(assignments, minlength=len(self.intents))
+        self.offsets = np.concatenate(([0], np.cumsum(counts)))
+
+        # Centroids are grouped by intent too: intent i owns centroids centroid_offsets[i]:[i + 1]
+        rng = np.random.default_rng(seed)
+        centroids = []
+        for i in range(len(self.intents)):
+            members = embeddings[order[self.offsets[i]:self.offsets[i + 1]]]
+            k = max(1, min(centroids_per_intent, len(members)))
+            centroids.append(_spherical_kmeans(members, k, kmeans_iterations, rng) if k > 1
+                             else members.mean(axis=0, keepdims=True))
+        self.centroid_offsets = np.concatenate(([0], np.cumsum([len(c) for c in centroids])))
+        self.centroids = np.concatenate(centroids).astype(np.float32)
+        self.centroids /= np.maximum(np.linalg.norm(self.centroids, axis=1, keepdims=True), 1e-12)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def route(self, queries):
+        """
+        Returns (intents, fallback): the `top_k` selected intent numbers per query, best
+        first, and a boolean per query that is True when it needs a full search.
+        """
+        centroid_scores = queries @ self.centroids.T
+        if len(self.centroids) == len(self.intents):
+            intent_scores = centroid_scores
+        else:
+            intent_scores = np.maximum.reduceat(centroid_scores, self.centroid_offsets[:-1], axis=1)
+        top_scores, top_intents = _top_k(intent_scores, self.top_k + 1)
+        if top_scores.shape[1] > self.top_k:
+            fallback = top_scores[:, 0] - top_scores[:, self.top_k] < self.min_margin
+        else:
+            fallback = np.zeros(len(queries), dtype=bool)
+        return top_intents[:, :self.top_k], fallback
+
+    def vectors_scored(self, queries):
+        """Number of corpus vectors (excluding centroids) each query is compared with."""
+        intents, fallback = self.route(queries)
+        sizes = np.diff(self.offsets)[intents].sum(axis=1)
+        return np.where(fallback, len(self.ids), sizes)
+
+    def search(self, queries, k=1):
+        """Returns (scores, rows), both shaped (len(queries), k). Rows are corpus rows."""
+        intents, fallback = self.route(queries)
+        all_scores = np.full((len(queries), k), -np.inf, dtype=np.float32)
+        all_rows = np.zeros((len(queries), k), dtype=np.int64)
+
+        if fallback.any():
+            full = np.flatnonzero(fallback)
+            top_scores, top_cols = _top_k(self.vectors.dot(queries[full]), k)
+            found = top_scores.shape[1]
+            all_scores[full, :found] = top_scores
+            all_rows[full, :found] = self.ids[top_cols]
+
+        for qi in np.flatnonzero(~fallback):
+            query = queries[qi]
+            slices = [(self.offsets[i], self.offsets[i + 1]) for i in intents[qi]]
+            candidate_ids = np.concatenate([self.ids[start:stop] for start, stop in slices])
+            candidate_scores = np.concatenate([self.vectors.dot(query[None, :], start, stop)[0] for start, stop in slices])
+            top_scores, top_cols = _top_k(candidate_scores[None, :], k)
+            found = top_scores.shape[1]
+            all_scores[qi, :found] = top_scores[0]
+            all_rows[qi, :found] = candidate_ids[top_cols[0]]
+        return all_scores, all_rows
+
+
+def recall_at_1(index, exact_index, queries):
+    """Fraction of queries for which `index` returns the same top-1 row as `exact_index`."""
+    if len(queries) == 0:
+        return 1.0
+    _, approx_rows = index.search(queries, k=1)
+    _, exact_rows = exact_index.search(queries, k=1)
+    return float(np.mean(approx_rows[:, 0] == exact_rows[:, 0]))
+
+
+def sample_recall_queries(embeddings, sample_size, noise=0.5, seed=0):
+    """
+    Builds synthetic validation queries by perturbing random corpus vectors.
+    Un-perturbed corpus vectors would always be found in their own cell, which
+    would overstate recall; `noise` is the expected norm of the perturbation.
+    """
+    rng = np.random.default_rng(seed)
+    sample_size = min(sample_size, len(embeddings))
+    base = np.asarray(embeddings[rng.choice(len(embeddings), sample_size, replace=False)], dtype=np.float32)
+    perturbation = rng.standard_normal(base.shape, dtype=np.float32) * np.float32(noise / np.sqrt(base.shape[1]))
+    queries = base + perturbation
+    return queries / np.linalg.norm(queries, axis=1, keepdims=True)
+
+
+def build_vector_index(embeddings, min_ann_size, nlist=0, nprobe=8, recall_sample=256, previous_index=None,
+                       precision='float32', intent_labels=None, intent_top_k=0, intent_centroids=1,
+                       intent_min_margin=0.05):
+    """
+    Chooses the search strategy for the semantic tier.
+    With `intent_top_k` > 0 (and `intent_labels` for every corpus row) the two-stage
+    IntentIndex is used whatever the corpus size. Otherwise, corpora smaller than
+    `min_ann_size` use exact brute-force search and larger ones get an IVF index. The
+    recall@1 of an approximate index against brute force is measured on synthetic
+    queries and stored on the index as `recall_at_1`. When `previous_index` is an IVF
+    index (corpus reload), its centroids are reused and only the cell assignment is
+    recomputed. `precision` selects the storage of the searched vectors (see quantization.py).
+    """
+    start = time.perf_counter()
+    if intent_top_k > 0 and intent_labels is not None:
+        index = IntentIndex(embeddings, intent_labels, top_k=intent_top_k, centroids_per_intent=intent_centroids,
+                            min_margin=intent_min_margin, precision=precision)
+        description = (f"intent index over {len(embeddings)} vectors ({len(index.intents)} intents, "
+                       f"top_k={index.top_k}, {len(index.centroids)} centroids, {precision})")
+    elif len(embeddings) < min_ann_size:
+        logger.info("Using exact brute-force search over %d corpus vectors (%s).", len(embeddings), precision)
+        return BruteForceIndex(embeddings, precision)
+    else:
+        centroids = previous_index.centroids if isinstance(previous_index, IVFIndex) else None
+        index = IVFIndex(embeddings, nlist=nlist, nprobe=nprobe, centroids=centroids, precision=precision)
+        description = f"IVF index over {len(embeddings)} vectors (nlist={index.nlist}, nprobe={index.nprobe}, {precision})"
+    build_seconds = time.perf_counter() - start
+
+    index.recall_at_1 = None
+    if recall_sample > 0:
+        queries = sample_recall_queries(embeddings, recall_sample)
+        index.recall_at_1 = recall_at_1(index, BruteForceIndex(embeddings), queries)
+        logger.info("Built %s in %.1fs; recall@1 vs exact search: %.3f",
+                    description, build_seconds, index.recall_at_1)
+    else:
+        logger.info("Built %s in %.1fs.", description, build_seconds)
+    return index